@@ -0,0 +1,89 @@
+# bench_restart.py - how long does the note server take to come back?
+#
+# Builds a file-backed store (NOTEBOOK_STORE=file:...) holding N notes, takes
+# a snapshot, writes a tail of further saves to the log, and shuts down. Then
+# times a restart: mmap the snapshot, read its directory, replay the tail.
+# For comparison it also times loading the same notes from one naive JSON
+# dump, which is what a restart costs when it is O(data).
+#
+# Usage:  python bench_restart.py [--notes 1000000] [--notebooks 1000] [--tail 10000] [--hot 10]
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from notebook_store import DurableStore
+
+parser = argparse.ArgumentParser(description="Restart time of the file-backed store.")
+parser.add_argument("--notes", type=int, default=1_000_000)
+parser.add_argument("--notebooks", type=int, default=1000)
+parser.add_argument("--tail", type=int, default=10_000, help="saves left in the log")
+parser.add_argument("--hot", type=int, default=10,
+                    help="notebooks the tail writes to (replay decodes each one it touches)")
+parser.add_argument("--fsync", default="everysec", choices=["always", "everysec", "no"])
+parser.add_argument("--dir", help="where to build it (default: a temp dir, removed after)")
+args = parser.parse_args()
+
+CYAN, GREEN, RESET = "\033[96m", "\033[92m", "\033[0m"
+WORDS = "agenda budget decision deadline review launch metric owner risk scope".split()
+rng = random.Random(1)
+path = Path(args.dir or tempfile.mkdtemp(prefix="notebooks-"))
+expires = datetime.now(timezone.utc) + timedelta(hours=1)
+handles = [f"nb_{i:06d}" for i in range(args.notebooks)]
+per_notebook = args.notes // args.notebooks
+
+
+def text() -> str:
+    return " ".join(rng.choices(WORDS, k=12))
+
+
+def timed(label: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"  {label:34} {time.perf_counter() - started:8.3f} s")
+    return result
+
+
+def build() -> None:
+    store = DurableStore(path, fsync=args.fsync, snapshot_bytes=1 << 62)
+    for handle in handles:
+        store.create(handle, handle, expires)
+        store.save_many(handle, [(f"note-{i:06d}", text()) for i in range(per_notebook)])
+    store.snapshot()
+    for i in range(args.tail):
+        store.save(rng.choice(handles[:args.hot]), f"tail-{i:06d}", text())
+    store.close()
+
+
+def naive_dump() -> Path:
+    store = DurableStore(path)
+    dump = path / "naive.json"
+    dump.write_text(json.dumps({h: store.notes(h) for h in handles}))
+    store.close()
+    return dump
+
+
+try:
+    print(f"{CYAN}{per_notebook * args.notebooks:,} notes in {args.notebooks:,} notebooks, "
+          f"{args.tail:,} more in the log, fsync={args.fsync}{RESET}")
+    timed("build + snapshot + tail", build)
+    size = sum(f.stat().st_size for f in path.glob("*"))
+    print(f"  on disk: {size / 1e6:,.1f} MB")
+
+    store = timed(f"{GREEN}restart{RESET} (mmap + replay tail)     ", lambda: DurableStore(path))
+    metrics = store.metrics()
+    print(f"  recovered {metrics['live_handles']:,} notebooks, {metrics['notes']:,} notes")
+    timed("first touch of one notebook", lambda: store.titles(handles[-1]))
+    timed("first search in it (builds index)", lambda: store.search(handles[-1], "budget risk"))
+    store.close()
+
+    dump = naive_dump()
+    timed("naive: json.load of a full dump", lambda: json.loads(dump.read_text()))
+finally:
+    if not args.dir:
+        shutil.rmtree(path)
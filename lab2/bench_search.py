@@ -0,0 +1,123 @@
+# bench_search.py - search_notes (inverted index + BM25) vs reading everything.
+#
+# Fills one notebook with N synthetic notes, then compares two ways for an
+# agent to find what it needs:
+#
+#   scan     what the server does without an index: pull every note and
+#            score each one against the query (store.notes + tokenize all).
+#   index    store.search - only the postings of the query terms are read.
+#
+# It also prints what each approach costs in MODEL CONTEXT: the size of a
+# search_notes result next to the summarize_notes prompt that ships the
+# whole notebook (tokens estimated as characters / 4).
+#
+# Run it from lab2 once note_server.py is complete (or against the solution).
+#
+# Usage:  python bench_search.py [--sizes 10000 100000] [--queries 200]
+#         NOTEBOOK_STORE=redis://127.0.0.1:6379 python bench_search.py --sizes 10000
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from fastmcp import Client
+
+import note_server
+from notebook_store import tokens
+
+parser = argparse.ArgumentParser(description="Indexed search vs full scan.")
+parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("--scan-queries", type=int, default=5,
+                    help="full scans are slow; time only this many")
+parser.add_argument("--k", type=int, default=5)
+parser.add_argument("--vocabulary", type=int, default=20_000)
+parser.add_argument("--seed", type=int, default=7)
+args = parser.parse_args()
+
+CYAN, YELLOW, GREEN, RESET = "\033[96m", "\033[93m", "\033[92m", "\033[0m"
+rng = random.Random(args.seed)
+WORDS = [f"w{i}" for i in range(args.vocabulary)]
+# Zipf-ish: a few words everywhere, most words rare - like real text.
+CUMULATIVE = list(itertools.accumulate(1 / (i + 1) for i in range(args.vocabulary)))
+
+
+def note_text() -> str:
+    return " ".join(rng.choices(WORDS, cum_weights=CUMULATIVE, k=rng.randint(40, 120)))
+
+
+def query_text() -> str:
+    # Mid-frequency words: common enough to match, rare enough to matter.
+    return " ".join(rng.choice(WORDS[50:2000]) for _ in range(rng.randint(1, 3)))
+
+
+def scan(store, handle: str, query: str, k: int) -> list[str]:
+    """Score every note from scratch - the no-index baseline."""
+    terms = set(tokens(query))
+    scores = {}
+    for title, content in store.notes(handle).items():
+        counts = Counter(tokens(f"{title} {content}"))
+        score = sum(counts[t] for t in terms)
+        if score:
+            scores[title] = score
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def percentiles(samples: list[float]) -> str:
+    q = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return f"p50 {q[49] * 1000:8.2f} ms   p95 {q[94] * 1000:8.2f} ms"
+
+
+async def bench(size: int) -> None:
+    store = note_server.store
+    handle = f"nb_bench_{size}"
+    store.create(handle, f"bench-{size}", datetime.now(timezone.utc) + timedelta(hours=1))
+
+    started = time.perf_counter()
+    for i in range(size):
+        store.save(handle, f"note-{i:06d}", note_text())
+    took = time.perf_counter() - started
+    print(f"\n{CYAN}{size:,} notes{RESET}  saved in {took:.1f}s "
+          f"({size / took:,.0f} saves/s, index kept up to date on each)")
+
+    queries = [query_text() for _ in range(args.queries)]
+    indexed = []
+    for q in queries:
+        started = time.perf_counter()
+        store.search(handle, q, args.k)
+        indexed.append(time.perf_counter() - started)
+    scanned = []
+    for q in queries[:args.scan_queries]:
+        started = time.perf_counter()
+        scan(store, handle, q, args.k)
+        scanned.append(time.perf_counter() - started)
+    print(f"  {'index':6} {percentiles(indexed)}   ({len(indexed)} queries)")
+    print(f"  {'scan':6} {percentiles(scanned)}   ({len(scanned)} queries)")
+    print(f"  {GREEN}speed-up at p50: "
+          f"{statistics.median(scanned) / statistics.median(indexed):,.0f}x{RESET}")
+
+    # What reaches the model: one search result vs the whole notebook.
+    async with Client(note_server.server) as client:
+        result = await client.call_tool("search_notes",
+                                        {"handle": handle, "query": queries[0], "k": args.k})
+        prompt = await client.get_prompt("summarize_notes", {"handle": handle})
+    searched = len(json.dumps(result.structured_content))
+    everything = len(prompt.messages[0].content.text)
+    print(f"  {YELLOW}context{RESET}  search_notes ~{searched // 4:,} tokens   "
+          f"summarize_notes ~{everything // 4:,} tokens")
+    store.delete(handle)
+
+
+async def main() -> None:
+    print(f"backend: {note_server.store.metrics().get('backend')}")
+    for size in args.sizes:
+        await bench(size)
+
+
+asyncio.run(main())
@@ -20,14 +20,35 @@
 #   bound server-side to the authenticated caller. We use secrets.token_urlsafe
 #   below; a real server would additionally key the store by verified user id.
 
+import asyncio
 import json
 import secrets
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 
 from fastmcp import FastMCP
 
+from notebook_store import (bad_item, check_batch, open_store, prefix_end, title_after,
+                            tokens)
+
+
+@asynccontextmanager
+async def lifespan(server):
+    # Expired notebooks are evicted in the background, not only when someone
+    # happens to look them up - otherwise abandoned ones would live forever.
+    reaper = asyncio.create_task(store.reaper())
+    try:
+        yield {}
+    finally:
+        reaper.cancel()
+        store.close()
+
+
 server = FastMCP(
     "NoteService",
+    lifespan=lifespan,
     instructions="Create a notebook, then save and read notes inside it.",
     cache_ttl=60,
     # Notebook contents differ per caller, so their cached representation
@@ -36,10 +57,13 @@ server = FastMCP(
 )
 
 # ─── Notebook store, keyed by explicit handle ────────────────────────
-# In production this would be Redis or a database shared by every replica.
-# The point is that it is keyed by a value the CLIENT supplies, not by a
-# connection the server happens to be holding open.
-notebooks: dict[str, dict] = {}
+# In production this is Redis or a database shared by every replica. The
+# point is that it is keyed by a value the CLIENT supplies, not by a
+# connection the server happens to be holding open. notebook_store.py holds
+# all three kinds: an in-process dict by default, the same dict persisted to
+# a log and snapshots with NOTEBOOK_STORE=file:///some/dir, or any
+# Redis-compatible server when NOTEBOOK_STORE=redis://host:port is set.
+store = open_store()
 
 HANDLE_TTL = timedelta(hours=1)
 
@@ -52,8 +76,9 @@ def _new_handle() -> str:
 
 def _get(handle: str) -> dict:
     """Resolve a handle to its notebook, rejecting unknown or expired ones."""
-    # TODO: look up the handle in `notebooks`. Raise a clear ValueError if it
-    #       is unknown, and another if it is past its "expires" time.
+    # TODO: look up the handle with store.get(). Raise a clear ValueError if
+    #       it is unknown, and another (after store.delete) if it is past its
+    #       "expires" time.
     ...
 
 
@@ -66,25 +91,148 @@ def open_notebook(name: str = "default") -> dict:
     This is the 2026-07-28 replacement for an implicit session: the server
     mints an identifier and hands it back as ordinary data.
     """
-    # TODO: mint a handle, store the notebook with its name, empty notes, and
-    #       an expiry, then return the handle as ordinary data.
+    # TODO: mint a handle, store.create() the notebook with its name and an
+    #       expiry, then return the handle as ordinary data.
     ...
 
 
 @server.tool
 def save_note(handle: str, title: str, content: str) -> dict:
     """Save a note into the notebook identified by `handle`."""
-    # TODO: resolve the handle, store the note, report the new total
+    # TODO: resolve the handle, store.save() the note, report the new total
     ...
 
 
 @server.tool
 def list_notes(handle: str) -> dict:
     """List the titles of every note in the notebook identified by `handle`."""
-    # TODO: resolve the handle, return the notebook name, sorted titles, count
+    # TODO: resolve the handle, return the notebook name, store.titles()
+    #       (already in title order - no need to sort), count
     ...
 
 
+# Importing 1,000 notes with save_note is 1,000 full MCP round trips. The
+# batch tools carry many notes per call instead: every item succeeds or
+# fails on its own, and the store is written once for the whole batch.
+# The limit and the per-item check live in notebook_store.py (check_batch,
+# bad_item), shared with every other server that takes batches.
+
+@server.tool
+def save_notes(handle: str, notes: list[dict]) -> dict:
+    """Save many notes in one call. Each item is {"title": ..., "content": ...}.
+
+    Every item reports its own status; a bad item does not stop the rest.
+    """
+    nb = _get(handle)
+    check_batch(notes, "notes")
+    results, good = [], []
+    for item in notes:
+        problem = bad_item(item)
+        if problem:
+            results.append({"title": item.get("title"), "status": "error", "error": problem})
+        else:
+            results.append({"title": item["title"], "status": "saved"})
+            good.append((item["title"], item["content"]))
+    total = store.save_many(handle, good) if good else nb["count"]
+    return {"handle": handle, "saved": len(good), "failed": len(notes) - len(good),
+            "total_notes": total, "results": results}
+
+
+@server.tool
+def get_notes(handle: str, titles: list[str]) -> dict:
+    """Read many notes in one call; each title reports found or not_found."""
+    nb = _get(handle)
+    check_batch(titles, "titles")
+    contents = store.note_many(handle, titles) if titles else []
+    return {
+        "notebook": nb["name"],
+        "notes": [{"title": t, "status": "found", "content": c} if c is not None
+                  else {"title": t, "status": "not_found"}
+                  for t, c in zip(titles, contents)],
+    }
+
+
+# A notebook with thousands of notes should not be listed in one go. These
+# page through the store's sorted title index instead: each call returns at
+# most `limit` titles plus a "next" cursor to pass back as `after`.
+
+MAX_PAGE = 500
+
+
+def _title_page(handle: str, start: str, stop: str | None, limit: int) -> dict:
+    nb = _get(handle)
+    limit = max(1, min(limit, MAX_PAGE))
+    # Ask for one extra title to learn whether there is another page.
+    titles = store.title_range(handle, start, stop, limit + 1)
+    more = len(titles) > limit
+    titles = titles[:limit]
+    return {
+        "notebook": nb["name"],
+        "titles": titles,
+        "next": titles[-1] if more else None,
+    }
+
+
+@server.tool
+def list_notes_page(handle: str, limit: int = 50, after: str = "") -> dict:
+    """List up to `limit` note titles in title order, starting after `after`.
+
+    Pass the returned "next" back as `after` for the following page.
+    """
+    return _title_page(handle, title_after(after) if after else "", None, limit)
+
+
+@server.tool
+def find_notes(handle: str, prefix: str = "", start: str = "", stop: str = "",
+               limit: int = 50, after: str = "") -> dict:
+    """Find note titles that begin with `prefix` and/or fall in [start, stop).
+
+    Results are in title order and paged like list_notes_page.
+    """
+    lo, hi = max(start, prefix), stop or None
+    if prefix:
+        end = prefix_end(prefix)
+        hi = end if hi is None or (end is not None and end < hi) else hi
+    if after:
+        lo = max(lo, title_after(after))
+    return _title_page(handle, lo, hi, limit)
+
+
+# Finding the right note should not mean shipping the whole notebook into
+# the model's context. search_notes ranks notes with the store's inverted
+# index and returns titles plus a short snippet each; the agent then reads
+# only the notes it actually needs.
+
+SNIPPET = 160
+
+
+def _snippet(content: str, terms: set[str]) -> str:
+    """A short window of `content` around the first query term it contains."""
+    lower = content.lower()
+    at = min((i for i in (lower.find(t) for t in terms) if i >= 0), default=0)
+    start = max(0, at - SNIPPET // 4)
+    end = start + SNIPPET
+    return ("..." if start else "") + content[start:end] + ("..." if end < len(content) else "")
+
+
+@server.tool
+def search_notes(handle: str, query: str, k: int = 5) -> dict:
+    """Find the `k` notes most relevant to `query`, best first.
+
+    Returns titles and snippets, not whole notes - read the ones you need
+    through resource://note/{handle}/{title}.
+    """
+    nb = _get(handle)
+    terms = set(tokens(query))
+    hits = store.search(handle, query, max(1, min(k, MAX_PAGE)))
+    return {
+        "notebook": nb["name"],
+        "query": query,
+        "results": [{"title": h["title"], "score": h["score"],
+                     "snippet": _snippet(h["content"], terms)} for h in hits],
+    }
+
+
 # ─── Static resource ────────────────────────────────────────────────
 # A fixed URI that always returns the same shape. Note the exact rule:
 # 2026-07-28 forbids list results from varying *per connection*, but they MAY
@@ -92,14 +240,38 @@ def list_notes(handle: str) -> dict:
 # tools a caller's scopes permit is explicitly allowed, because credentials are
 # per-request input rather than connection state. This lab has no auth, so ours
 # is simply the same for everyone.
+#
+# With thousands of notebooks one giant listing would not scale, so the
+# catalog is paged: each page names the URI of the next one, and its etag
+# changes only when something on that page does.
+
+def _catalog_json(cursor: str | None) -> str:
+    page = store.catalog_page(cursor)
+    if page["next"]:
+        page["next"] = f"resource://catalog/page/{page['next']}"
+    return json.dumps(page, indent=2)
+
 
 @server.resource("resource://catalog")
 def notes_catalog() -> str:
     """Catalog of open notebooks and how many notes each holds."""
-    # TODO: return JSON listing each open notebook's handle, name, note count
+    # TODO: return the first page of the catalog - each open notebook's
+    #       handle, name, note count - by calling _catalog_json(None)
     ...
 
 
+@server.resource("resource://catalog/page/{cursor}")
+def notes_catalog_page(cursor: str) -> str:
+    """A later page of the catalog - follow "next" from the page before."""
+    return _catalog_json(cursor)
+
+
+@server.resource("resource://store/metrics")
+def store_metrics() -> str:
+    """Live handles, bytes held and evictions in the notebook store."""
+    return json.dumps(store.metrics(), indent=2)
+
+
 # ─── Resource template (dynamic URI) ────────────────────────────────
 # The handle travels in the URI itself, which is the resource-side equivalent
 # of passing it as a tool argument: explicit, visible, and stateless.
@@ -107,7 +279,7 @@ def notes_catalog() -> str:
 @server.resource("resource://note/{handle}/{title}")
 def get_note(handle: str, title: str) -> str:
     """Read one note out of one notebook."""
-    # TODO: resolve the handle, then return the one note - raising if the
+    # TODO: resolve the handle, then return store.note() - raising if the
     #       title is not present
     ...
 
@@ -118,9 +290,98 @@ def get_note(handle: str, title: str) -> str:
 def summarize_notes(handle: str) -> str:
     """Package every note in a notebook into an LLM-ready summary prompt."""
     # TODO: resolve the handle and build one prompt string from every note
+    #       in store.notes()
     ...
 
 
+# summarize_notes has no upper bound: a big notebook becomes one huge string
+# and a prompt no model can fit. The budgeted variant keeps the most recent
+# (or, given a query, the most relevant) notes that fit in `max_chars` /
+# `max_tokens`. The prompt is joined once from a generator of pieces, and
+# the finished text is cached under the notebook's version, so asking again
+# costs one handle lookup until the next save changes the version.
+
+CHARS_PER_TOKEN = 4          # a rough, model-agnostic estimate
+DEFAULT_CHARS = 16000        # the budget when the caller names neither limit
+RELEVANT_NOTES = 100         # search hits considered in "relevant" mode
+PROMPT_CACHE_SIZE = 256
+FOOTER = 60                  # room kept for the "more notes" line
+
+_prompts: OrderedDict[tuple, str] = OrderedDict()
+_prompts_lock = threading.Lock()
+
+
+def _by_recency(handle: str):
+    """(title, content) pairs, newest first, fetched a page at a time."""
+    offset = 0
+    while batch := store.newest(handle, offset):
+        yield from batch
+        offset += len(batch)
+
+
+def _within(notes, count: int, budget: int):
+    """Yield prompt pieces, stopping before they would exceed `budget` chars.
+
+    `count` is how many candidate notes `notes` yields in total.
+    """
+    head = "Summarize the following notes into three bullet points, then list any action items.\n\n"
+    yield head
+    left, shown = budget - len(head) - FOOTER, 0
+    for title, content in notes:
+        piece = f"## {title}\n{content}\n\n"
+        if len(piece) > left:
+            if left > len(title) + 40:
+                # Room for a useful part of this note: cut it, then stop.
+                yield piece[:left - 4] + "...\n"
+                shown += 1
+            break
+        yield piece
+        left -= len(piece)
+        shown += 1
+    if shown < count:
+        yield f"({count - shown} more notes did not fit in the budget.)\n"
+
+
+@server.prompt("summarize_notes_budgeted")
+def summarize_notes_budgeted(handle: str, max_chars: int = 0, max_tokens: int = 0,
+                             prefer: str = "recent", query: str = "") -> str:
+    """Like summarize_notes, but only as many notes as fit the budget.
+
+    The budget is `max_chars`, or `max_tokens` (about 4 characters each), or
+    the smaller of the two if both are given; with neither, 16000 characters.
+    prefer="recent" keeps the newest notes; prefer="relevant" keeps the
+    notes that best match `query`.
+    """
+    nb = _get(handle)
+    if prefer not in ("recent", "relevant"):
+        raise ValueError("prefer must be 'recent' or 'relevant'")
+    if prefer == "relevant" and not query.strip():
+        raise ValueError("prefer='relevant' needs a query")
+    limits = [n for n in (max_chars, max_tokens * CHARS_PER_TOKEN) if n > 0]
+    budget = min(limits) if limits else DEFAULT_CHARS
+    key = (handle, nb["version"], budget, prefer, query)
+    with _prompts_lock:
+        if key in _prompts:
+            _prompts.move_to_end(key)
+            return _prompts[key]
+    if not nb["count"]:
+        return "There are no notes to summarize yet."
+    if prefer == "relevant":
+        # Only the matches are candidates: notes that did not match the query
+        # must not be reported as ones that did not fit.
+        notes = [(h["title"], h["content"])
+                 for h in store.search(handle, query, RELEVANT_NOTES)]
+        count = len(notes)
+    else:
+        notes, count = _by_recency(handle), nb["count"]
+    prompt = "".join(_within(notes, count, budget))
+    with _prompts_lock:
+        _prompts[key] = prompt
+        while len(_prompts) > PROMPT_CACHE_SIZE:
+            _prompts.popitem(last=False)
+    return prompt
+
+
 # ─── Entry point ─────────────────────────────────────────────────────
 
 if __name__ == "__main__":
@@ -0,0 +1,1327 @@
+"""
+notebook_store.py - where the note server's notebooks actually live.
+
+Nothing in here is MCP. note_server.py decides WHAT a handle means; this
+module decides WHERE the state behind it is kept. It ships complete so the
+server can stay focused on tools, resources and prompts.
+
+Three interchangeable backends, picked by the NOTEBOOK_STORE environment
+variable:
+
+  memory                    (default) a dict in this process. Fine for one
+                            server; wrong behind a load balancer, because
+                            every replica gets its own dict. Expired
+                            notebooks are reaped in the background, and
+                            NOTEBOOK_MAX_NOTEBOOKS / NOTEBOOK_MAX_NOTES
+                            cap it, evicting least recently used first.
+  file:///path/to/dir       the same dict, made to survive restarts: every
+                            change goes to an append-only log, compacted now
+                            and then into a snapshot. NOTEBOOK_FSYNC picks
+                            always / everysec (default) / no.
+  redis://host:port[/db]    any Redis-compatible server, shared by every
+                            replica. Each notebook is ONE hash whose key
+                            carries a server-side TTL, so expiry needs no
+                            "expires" field and no cleanup code here.
+
+The networked store keeps a small pool of open connections and pipelines
+multi-key operations, so reading a catalog page is one round trip rather
+than one per notebook.
+
+The catalog is paged. Reading it never walks every notebook: a page is a
+bounded slice found from an opaque cursor, and carries an ETag that changes
+only when something on that page does.
+
+Titles are kept in order as notes are saved, so listing them never sorts,
+and a page, prefix or range of titles costs O(log n + k) for k results.
+
+Every notebook also has an inverted index (term -> the notes using it, and
+how often), updated on each save, so `search` scores only the notes that
+share a term with the query - BM25, the classic search-engine ranking -
+instead of reading the whole notebook.
+
+No Redis handy? This file doubles as a tiny RESP stand-in that speaks just
+enough of the protocol for the store:
+
+  python notebook_store.py [port]          # default 6379
+  NOTEBOOK_STORE=redis://127.0.0.1:6379 python note_server.py
+"""
+
+import asyncio
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import queue
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+class NotebookStore:
+    """What note_server.py needs from a notebook backend.
+
+    A notebook is a name, an expiry and a mapping of title -> content.
+    `get` returns only the small part ({"name", "expires", "count",
+    "version"}) so that resolving a handle never drags a whole notebook
+    across the network. "version" goes up on every save, so anything derived
+    from a notebook can be cached until it changes.
+    """
+
+    def create(self, handle: str, name: str, expires: datetime) -> None:
+        raise NotImplementedError
+
+    def get(self, handle: str) -> dict | None:
+        """Return {"name", "expires", "count", "version"}, or None if unknown."""
+        raise NotImplementedError
+
+    def delete(self, handle: str) -> None:
+        raise NotImplementedError
+
+    def save(self, handle: str, title: str, content: str) -> int:
+        """Store one note and return the notebook's new note count."""
+        return self.save_many(handle, [(title, content)])
+
+    def save_many(self, handle: str, notes: list[tuple[str, str]]) -> int:
+        """Store a non-empty batch of (title, content) notes in one update.
+
+        Returns the notebook's new note count.
+        """
+        raise NotImplementedError
+
+    def titles(self, handle: str) -> list[str]:
+        """Every title, in title order."""
+        raise NotImplementedError
+
+    def title_range(self, handle: str, start: str = "", stop: str | None = None,
+                    limit: int = 100) -> list[str]:
+        """Up to `limit` titles t with start <= t < stop, in title order."""
+        raise NotImplementedError
+
+    def note(self, handle: str, title: str) -> str | None:
+        return self.note_many(handle, [title])[0]
+
+    def note_many(self, handle: str, titles: list[str]) -> list[str | None]:
+        """The content of each title, or None where there is no such note."""
+        raise NotImplementedError
+
+    def notes(self, handle: str) -> dict[str, str]:
+        raise NotImplementedError
+
+    def newest(self, handle: str, offset: int = 0, limit: int = 50) -> list[tuple[str, str]]:
+        """(title, content) pairs, most recently saved first, from `offset`."""
+        raise NotImplementedError
+
+    def search(self, handle: str, query: str, k: int = 10) -> list[dict]:
+        """The `k` best {"title", "score", "content"} matches, best first."""
+        raise NotImplementedError
+
+    def catalog_page(self, cursor: str | None = None) -> dict:
+        """One bounded page of {"handle", "name", "notes"} entries.
+
+        Returns {"notebooks": [...], "next": cursor or None, "etag": str}.
+        Pass `next` back to get the following page.
+        """
+        raise NotImplementedError
+
+    async def reaper(self) -> None:
+        """Background expiry, for backends that need it. Run as a task."""
+
+    def close(self) -> None:
+        """Flush anything still buffered. Call once, at shutdown."""
+
+    def metrics(self) -> dict:
+        return {}
+
+
+def _gone(handle: str) -> ValueError:
+    return ValueError(f"Notebook handle {handle} has expired. Open a new one.")
+
+
+# ─── Batch input ────────────────────────────────────────────────────
+# Every server that takes batches (note_server.py, lab5's memory_server.py)
+# checks them here, so they share one limit and one set of error messages.
+
+MAX_BATCH = 1000
+
+
+def check_batch(items: list, what: str) -> None:
+    """Refuse a batch of more than MAX_BATCH `what` (notes, titles)."""
+    if len(items) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} {what} per call, got {len(items)}")
+
+
+def bad_item(item: dict) -> str | None:
+    """Why one batch item cannot be saved, or None if it is fine."""
+    if not isinstance(item.get("title"), str):
+        return "'title' must be a string"
+    if not isinstance(item.get("content"), str):
+        return "'content' must be a string"
+    return None
+
+
+# ─── In-process store ───────────────────────────────────────────────
+
+def _size(*texts: str) -> int:
+    return sum(len(t.encode()) for t in texts)
+
+
+# ─── Search ─────────────────────────────────────────────────────────
+
+WORD = re.compile(r"\w+")
+
+
+def tokens(text: str) -> list[str]:
+    return WORD.findall(text.lower())
+
+
+def _terms(title: str, content: str) -> Counter:
+    """Term frequencies for one note. The title counts as part of the text."""
+    return Counter(tokens(f"{title} {content}"))
+
+
+def _bm25(postings: list[dict[str, int]], lengths: dict[str, int], n: int,
+          total: int, k: int, k1: float = 1.2, b: float = 0.75) -> list[tuple[float, str]]:
+    """Okapi BM25 over one postings dict (title -> term count) per query term.
+
+    Only notes that appear in some posting are touched, so the cost follows
+    how common the query terms are, not how big the notebook is.
+    """
+    avg = total / n if n else 1.0
+    scores: dict[str, float] = {}
+    for posting in postings:
+        if not posting:
+            continue
+        idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+        for title, tf in posting.items():
+            norm = k1 * (1 - b + b * lengths[title] / avg)
+            scores[title] = scores.get(title, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return heapq.nlargest(k, ((score, title) for title, score in scores.items()))
+
+
+def title_after(title: str) -> str:
+    """The smallest string that sorts after `title`: a start for "after"."""
+    return title + "\0"
+
+
+def prefix_end(prefix: str) -> str | None:
+    """The smallest string that sorts after every string starting with `prefix`."""
+    for i in range(len(prefix) - 1, -1, -1):
+        if ord(prefix[i]) < sys.maxunicode:
+            return prefix[:i] + chr(ord(prefix[i]) + 1)
+    return None
+
+
+class MemoryStore(NotebookStore):
+    """Notebooks in a dict. Per-process, so per-REPLICA.
+
+    Expiry does not wait for someone to look a handle up: every notebook's
+    expiry goes into a min-heap, and `reaper()` pops whatever is due, so an
+    abandoned notebook costs O(log n) to evict no matter how many there are.
+    Optional caps on notebooks and notes evict the least recently used
+    notebook first. Sync tools run in FastMCP's thread pool while the reaper
+    runs on the event loop, hence the lock.
+    """
+
+    def __init__(self, max_notebooks: int = 0, max_notes: int = 0, page_size: int = 100):
+        self.notebooks: OrderedDict[str, dict] = OrderedDict()   # LRU order
+        self.expiry: list[tuple[float, str]] = []                # min-heap
+        # Catalog pages: the n-th notebook ever created lives on page
+        # n // page_size for its whole life. Pages only shrink as notebooks
+        # go, so a page stays bounded and is kept up to date in place.
+        self.page_size = page_size
+        self.created = 0
+        self.pages: dict[int, dict[str, None]] = {}     # page -> handles
+        self.page_ids: list[int] = []                   # sorted live pages
+        self.page_versions: dict[int, int] = {}
+        self.max_notebooks = max_notebooks
+        self.max_notes = max_notes
+        self.note_count = 0
+        self.bytes = 0
+        self.evictions = {"expired": 0, "lru": 0}
+        self.lock = threading.RLock()
+
+    def create(self, handle, name, expires):
+        with self.lock:
+            self._place(handle, {"name": name, "notes": {}, "titles": [],
+                                 "expires": expires, "bytes": _size(handle, name),
+                                 "index": {}, "lengths": {}, "length": 0, "version": 0})
+            self._enforce_caps(keep=handle)
+
+    def _place(self, handle: str, nb: dict) -> None:
+        """Add a built notebook: catalog page, LRU position, expiry, totals."""
+        page = self.created // self.page_size
+        self.created += 1
+        if page not in self.pages:
+            self.pages[page] = {}
+            self.page_ids.append(page)
+        self.pages[page][handle] = None
+        self._page_changed(page)
+        nb["page"] = page
+        self.notebooks[handle] = nb
+        self.bytes += nb["bytes"]
+        self.note_count += self._count(nb)
+        heapq.heappush(self.expiry, (nb["expires"].timestamp(), handle))
+
+    @staticmethod
+    def _count(nb: dict) -> int:
+        return len(nb["notes"])
+
+    def get(self, handle):
+        with self.lock:
+            nb = self._touch(handle)
+            if nb is None:
+                return None
+            return {"name": nb["name"], "expires": nb["expires"],
+                    "count": len(nb["notes"]), "version": nb["version"]}
+
+    def delete(self, handle):
+        with self.lock:
+            self._drop(handle)
+
+    def _touch(self, handle) -> dict | None:
+        nb = self.notebooks.get(handle)
+        if nb is not None:
+            self.notebooks.move_to_end(handle)
+        return nb
+
+    def _drop(self, handle) -> bool:
+        nb = self.notebooks.pop(handle, None)
+        if nb is None:
+            return False
+        self.note_count -= self._count(nb)
+        self.bytes -= nb["bytes"]
+        page = nb["page"]
+        del self.pages[page][handle]
+        self._page_changed(page)
+        if not self.pages[page]:
+            del self.pages[page], self.page_versions[page]
+            self.page_ids.pop(bisect.bisect_left(self.page_ids, page))
+        # Its heap entry stays behind; reap() skips entries with no notebook.
+        return True
+
+    def _notebook(self, handle) -> dict:
+        nb = self._touch(handle)
+        if nb is None:
+            raise _gone(handle)
+        return nb
+
+    def save_many(self, handle, notes):
+        with self.lock:
+            nb = self._touch(handle)
+            if nb is None:
+                raise _gone(handle)
+            for title, content in notes:
+                self._put(nb, title, content)
+            nb["version"] += 1
+            self._enforce_caps(keep=handle)
+            return len(nb["notes"])
+
+    def _put(self, nb: dict, title: str, content: str) -> None:
+        # Popping and re-inserting keeps "notes" in save order, oldest first.
+        old = nb["notes"].pop(title, None)
+        delta = _size(title, content) - (0 if old is None else _size(title, old))
+        nb["notes"][title] = content
+        nb["bytes"] += delta
+        self.bytes += delta
+        self._reindex(nb, title, old, content)
+        if old is None:
+            # One binary search and one insert keep the index sorted.
+            bisect.insort(nb["titles"], title)
+            self.note_count += 1
+            self._page_changed(nb["page"])
+
+    @staticmethod
+    def _reindex(nb: dict, title: str, old: str | None, new: str) -> None:
+        """Swap one note's postings: drop the old text's terms, add the new."""
+        index, lengths = nb["index"], nb["lengths"]
+        if index is None:
+            return          # not built yet; search() builds it when first needed
+        if old is not None:
+            for term in _terms(title, old):
+                posting = index[term]
+                del posting[title]
+                if not posting:
+                    del index[term]
+            nb["length"] -= lengths[title]
+        counts = _terms(title, new)
+        for term, tf in counts.items():
+            index.setdefault(term, {})[title] = tf
+        lengths[title] = sum(counts.values())
+        nb["length"] += lengths[title]
+
+    def titles(self, handle):
+        with self.lock:
+            return list(self._notebook(handle)["titles"])
+
+    def title_range(self, handle, start="", stop=None, limit=100):
+        with self.lock:
+            titles = self._notebook(handle)["titles"]
+            lo = bisect.bisect_left(titles, start)
+            hi = len(titles) if stop is None else bisect.bisect_left(titles, stop, lo)
+            return titles[lo:min(hi, lo + limit)]
+
+    def note_many(self, handle, titles):
+        with self.lock:
+            notes = self._notebook(handle)["notes"]
+            return [notes.get(t) for t in titles]
+
+    def notes(self, handle):
+        with self.lock:
+            return dict(self._notebook(handle)["notes"])
+
+    def newest(self, handle, offset=0, limit=50):
+        with self.lock:
+            notes = self._notebook(handle)["notes"]
+            return [(t, notes[t]) for t in itertools.islice(reversed(notes), offset,
+                                                            offset + limit)]
+
+    def search(self, handle, query, k=10):
+        terms = set(tokens(query))
+        with self.lock:
+            nb = self._notebook(handle)
+            if nb["index"] is None:
+                nb["index"], nb["lengths"], nb["length"] = {}, {}, 0
+                for title, content in nb["notes"].items():
+                    self._reindex(nb, title, None, content)
+            hits = _bm25([nb["index"].get(t, {}) for t in terms], nb["lengths"],
+                         len(nb["lengths"]), nb["length"], k)
+            return [{"title": t, "score": round(s, 4), "content": nb["notes"][t]}
+                    for s, t in hits]
+
+    def catalog_page(self, cursor=None):
+        with self.lock:
+            try:
+                i = 0 if cursor is None else bisect.bisect_left(self.page_ids, int(cursor))
+            except ValueError:
+                raise ValueError(f"Unknown catalog cursor {cursor!r}") from None
+            if i >= len(self.page_ids):
+                return {"notebooks": [], "next": None, "etag": '"end"'}
+            page = self.page_ids[i]
+            entries = [{"handle": h, "name": nb["name"], "notes": self._count(nb)}
+                       for h in self.pages[page] for nb in (self.notebooks[h],)]
+            nxt = str(self.page_ids[i + 1]) if i + 1 < len(self.page_ids) else None
+            return {"notebooks": entries, "next": nxt,
+                    "etag": f'"{page}.{self.page_versions[page]}"'}
+
+    def _page_changed(self, page: int) -> None:
+        self.page_versions[page] = self.page_versions.get(page, 0) + 1
+
+    def _enforce_caps(self, keep: str) -> None:
+        """Evict least recently used notebooks (never `keep`) until under caps."""
+        while ((self.max_notebooks and len(self.notebooks) > self.max_notebooks)
+               or (self.max_notes and self.note_count > self.max_notes)):
+            oldest = next(iter(self.notebooks))
+            if oldest == keep:
+                break
+            self._drop(oldest)
+            self.evictions["lru"] += 1
+
+    def reap(self, now: float | None = None) -> int:
+        """Evict every notebook whose expiry has passed; return how many."""
+        now = time.time() if now is None else now
+        reaped = 0
+        with self.lock:
+            while self.expiry and self.expiry[0][0] <= now:
+                _, handle = heapq.heappop(self.expiry)
+                if self._drop(handle):
+                    reaped += 1
+            self.evictions["expired"] += reaped
+        return reaped
+
+    async def reaper(self, interval: float = 30.0) -> None:
+        """Reap forever: wake at the next expiry, but at least every `interval`."""
+        while True:
+            self.reap()
+            with self.lock:
+                due = self.expiry[0][0] - time.time() if self.expiry else interval
+            await asyncio.sleep(min(max(due, 0.05), interval))
+
+    def metrics(self):
+        with self.lock:
+            return {"backend": "memory", "live_handles": len(self.notebooks),
+                    "notes": self.note_count, "bytes_held": self.bytes,
+                    "evictions": dict(self.evictions), "expiry_index": len(self.expiry),
+                    "max_notebooks": self.max_notebooks, "max_notes": self.max_notes}
+
+
+# ─── Durable in-process store ───────────────────────────────────────
+# Log records and snapshot blocks are compact JSON. Each log record is framed
+# with its length and a CRC, so a record torn by a crash is detected and cut
+# off at recovery instead of poisoning everything after it.
+
+_FRAME = struct.Struct("<II")           # payload length, crc32
+_SNAP_MAGIC = b"NBSNAP1\n"
+_SNAP_TAIL = struct.Struct("<QQ")       # directory offset, directory length
+
+
+def _json(value) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _frame(record: list) -> bytes:
+    payload = _json(record)
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _records(data: bytes):
+    """Yield (record, end offset) for every intact record, stopping at a torn one."""
+    pos = 0
+    while pos + _FRAME.size <= len(data):
+        size, crc = _FRAME.unpack_from(data, pos)
+        start = pos + _FRAME.size
+        payload = data[start:start + size]
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            return
+        pos = start + size
+        yield json.loads(payload), pos
+
+
+class _LogWriter:
+    """Appends records to the log from ONE background thread.
+
+    Callers only enqueue, so nothing ever writes or fsyncs on the event loop.
+    The thread takes everything queued since its last pass, writes it at
+    once and fsyncs once for the lot - group commit - so a burst of saves
+    shares one fsync. `fsync` is the policy Redis made familiar: "always"
+    (append() hands back an Event set once the record is on disk),
+    "everysec", or "no" (leave it to the OS).
+    """
+
+    def __init__(self, path: Path, fsync: str):
+        self.fsync = fsync
+        self.file = open(path, "ab")
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.dirty = False
+        self.synced = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="notebook-log", daemon=True)
+        self.thread.start()
+
+    def append(self, record: bytes) -> threading.Event | None:
+        done = threading.Event() if self.fsync == "always" else None
+        self.queue.put((record, done))
+        return done
+
+    def barrier(self) -> threading.Event | None:
+        """An Event for "everything appended so far is on disk" (fsync=always)."""
+        return self.append(b"")
+
+    def rotate(self, path: Path) -> None:
+        """Carry on in a new file. Records queued before this stay in the old one."""
+        self.queue.put((path, None))
+
+    def close(self) -> None:
+        self.queue.put((None, None))
+        self.thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self.queue.get(timeout=1.0)]
+            except queue.Empty:
+                self._sync()
+                continue
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiting = []
+            for item, done in batch:
+                if item is None:
+                    self._sync(force=True)
+                    self.file.close()
+                    for event in waiting:
+                        event.set()
+                    return
+                if isinstance(item, Path):
+                    self._sync(force=True)
+                    self.file.close()
+                    self.file = open(item, "ab")
+                elif item:
+                    self.file.write(item)
+                    self.dirty = True
+                if done is not None:
+                    waiting.append(done)
+            self._sync(force=self.fsync == "always")
+            for event in waiting:
+                event.set()
+
+    def _sync(self, force: bool = False) -> None:
+        if not self.dirty:
+            return
+        self.file.flush()
+        if force or (self.fsync == "everysec" and time.monotonic() - self.synced >= 1.0):
+            os.fsync(self.file.fileno())
+            self.synced = time.monotonic()
+            self.dirty = False
+        elif self.fsync == "no":
+            self.dirty = False
+
+
+class DurableStore(MemoryStore):
+    """A MemoryStore that survives restarts: append-only log plus snapshots.
+
+    Every change is appended to wal.{generation}.log as it happens. Once the
+    log has grown by `snapshot_bytes`, a background thread writes a compacted
+    snapshot.bin of the whole store, starts the next log generation and
+    deletes the logs the snapshot now covers.
+
+    Startup does not parse the snapshot. It is mmapped and only its directory
+    is read, so every notebook comes back "cold" - name, expiry and counts,
+    plus where its notes sit in the file - and its notes are decoded the
+    first time it is touched. Then only the log written since the snapshot
+    is replayed. Search indexes are rebuilt on first search, not at startup.
+    """
+
+    def __init__(self, path: str | Path, fsync: str = "everysec",
+                 snapshot_bytes: int = 64 << 20, **caps):
+        if fsync not in ("always", "everysec", "no"):
+            raise ValueError(f"Unknown fsync policy {fsync!r}: use always, everysec or no")
+        super().__init__(**caps)
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.snapshot_bytes = snapshot_bytes
+        self.logged = 0             # log bytes written since the last snapshot
+        self.compacting = False
+        self.log: _LogWriter | None = None          # None: recovering, don't log
+        self.generation = self._recover()
+        self.log = _LogWriter(self._log_path(self.generation), fsync)
+
+    def _log_path(self, generation: int) -> Path:
+        return self.path / f"wal.{generation:08d}.log"
+
+    # Writes: apply in memory, then log - under the lock, so the log order is
+    # the order the changes happened. Waiting for the disk happens outside it.
+
+    def create(self, handle, name, expires):
+        with self.lock:
+            super().create(handle, name, expires)
+            done = self._append(["c", handle, name, expires.timestamp()])
+        self._wait(done)
+
+    def save_many(self, handle, notes):
+        with self.lock:
+            count = super().save_many(handle, notes)
+            done = self._append(["s", handle, notes])
+        self._wait(done)
+        return count
+
+    def delete(self, handle):
+        with self.lock:
+            super().delete(handle)
+            done = self.log.barrier()
+        self._wait(done)
+
+    def _drop(self, handle):
+        # Deletes, LRU evictions and expiry all end up here.
+        dropped = super()._drop(handle)
+        if dropped:
+            self._append(["d", handle])
+        return dropped
+
+    def _append(self, record: list) -> threading.Event | None:
+        if self.log is None:
+            return None
+        data = _frame(record)
+        self.logged += len(data)
+        if self.logged >= self.snapshot_bytes and not self.compacting:
+            self.compacting = True
+            threading.Thread(target=self.snapshot, name="notebook-snapshot",
+                             daemon=True).start()
+        return self.log.append(data)
+
+    @staticmethod
+    def _wait(done: threading.Event | None) -> None:
+        if done is not None:
+            done.wait()
+
+    # Cold notebooks: loaded from the snapshot, not yet decoded.
+
+    @staticmethod
+    def _count(nb):
+        return nb["count"] if nb["notes"] is None else len(nb["notes"])
+
+    def _touch(self, handle):
+        nb = super()._touch(handle)
+        if nb is not None and nb["notes"] is None:
+            mm, offset, length = nb.pop("cold")
+            nb["notes"] = json.loads(mm[offset:offset + length])
+            nb["titles"] = sorted(nb["notes"])
+            del nb["count"]
+        return nb
+
+    # Snapshots and recovery.
+
+    def snapshot(self) -> None:
+        """Write a compacted snapshot and start a new log generation."""
+        try:
+            with self.lock:
+                self.generation += 1
+                generation = self.generation
+                self.log.rotate(self._log_path(generation))
+                self.logged = 0
+                # A consistent view, cheap to take under the lock: cold
+                # notebooks are byte ranges of the old snapshot, warm ones a
+                # shallow copy of their notes.
+                view = [(h, nb["name"], nb["expires"].timestamp(), nb["version"],
+                         self._count(nb), nb["bytes"], nb.get("cold") or dict(nb["notes"]))
+                        for h, nb in self.notebooks.items()]
+            self._write_snapshot(generation, view)
+            for log in self.path.glob("wal.*.log"):
+                if int(log.name.split(".")[1]) < generation:
+                    log.unlink()
+        finally:
+            with self.lock:
+                self.compacting = False
+
+    def _write_snapshot(self, generation: int, view: list) -> None:
+        tmp, directory = self.path / "snapshot.tmp", []
+        with open(tmp, "wb") as f:
+            f.write(_SNAP_MAGIC)
+            offset = len(_SNAP_MAGIC)
+            for handle, name, expires, version, count, size, notes in view:
+                if isinstance(notes, tuple):
+                    mm, start, length = notes
+                    block = mm[start:start + length]
+                else:
+                    block = _json(notes)
+                f.write(block)
+                directory.append([handle, name, expires, version, count, size,
+                                  offset, len(block)])
+                offset += len(block)
+            body = _json({"generation": generation, "notebooks": directory})
+            f.write(body + _SNAP_TAIL.pack(offset, len(body)) + _SNAP_MAGIC)
+            f.flush()
+            os.fsync(f.fileno())
+        # Atomic: a crash leaves either the old snapshot or the new one.
+        os.replace(tmp, self.path / "snapshot.bin")
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _recover(self) -> int:
+        generation = 0
+        snapshot = self.path / "snapshot.bin"
+        if snapshot.exists():
+            generation = self._load_snapshot(snapshot)
+        for log in sorted(self.path.glob("wal.*.log")):
+            number = int(log.name.split(".")[1])
+            if number < generation:
+                log.unlink()        # already in the snapshot
+                continue
+            generation = number
+            data, end = log.read_bytes(), 0
+            for record, end in _records(data):
+                self._apply(record)
+            self.logged += end
+            if end < len(data):
+                # A write torn by a crash. Drop it so new records follow
+                # the last intact one.
+                with open(log, "r+b") as f:
+                    f.truncate(end)
+        return generation
+
+    def _load_snapshot(self, path: Path) -> int:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        tail = len(mm) - len(_SNAP_MAGIC) - _SNAP_TAIL.size
+        if mm[:len(_SNAP_MAGIC)] != _SNAP_MAGIC or mm[-len(_SNAP_MAGIC):] != _SNAP_MAGIC:
+            raise ValueError(f"{path} is not a notebook snapshot")
+        offset, length = _SNAP_TAIL.unpack_from(mm, tail)
+        directory = json.loads(mm[offset:offset + length])
+        now = time.time()
+        for handle, name, expires, version, count, size, start, length in directory["notebooks"]:
+            if expires <= now:
+                continue
+            self._place(handle, {"name": name, "notes": None, "titles": None,
+                                 "expires": datetime.fromtimestamp(expires, timezone.utc),
+                                 "bytes": size, "index": None, "lengths": None,
+                                 "length": 0, "version": version, "count": count,
+                                 "cold": (mm, start, length)})
+        return directory["generation"]
+
+    def _apply(self, record: list) -> None:
+        op, handle, *args = record
+        if op == "c":
+            super().create(handle, args[0], datetime.fromtimestamp(args[1], timezone.utc))
+        elif op == "s" and handle in self.notebooks:
+            super().save_many(handle, args[0])
+        elif op == "d":
+            super().delete(handle)
+
+    def close(self):
+        self.log.close()
+
+    def metrics(self):
+        return super().metrics() | {"backend": "file", "generation": self.generation,
+                                    "log_bytes": self.logged, "fsync": self.log.fsync}
+
+
+# ─── RESP (Redis protocol) client ───────────────────────────────────
+
+class RespError(Exception):
+    """An error reply from the server."""
+
+
+def _encode(*args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+
+class RespConnection:
+    """One socket. `pipeline` writes N commands at once, then reads N replies."""
+
+    def __init__(self, host: str, port: int, timeout: float = 5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def pipeline(self, *commands: tuple) -> list:
+        self.sock.sendall(b"".join(_encode(*c) for c in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline(args)[0]
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("RESP server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self.reader.read(size + 2)[:-2]
+            return data.decode()
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise ConnectionError(f"unexpected RESP reply {line!r}")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class ConnectionPool:
+    """Reuse up to `size` open connections across threads.
+
+    FastMCP runs sync tools in a thread pool, so several tool calls can need
+    a connection at the same moment; each borrows one and gives it back.
+    """
+
+    def __init__(self, host: str, port: int, db: int = 0, password: str | None = None,
+                 size: int = 16):
+        self.host, self.port, self.db, self.password = host, port, db, password
+        self.idle: queue.LifoQueue[RespConnection] = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def _open(self) -> RespConnection:
+        conn = RespConnection(self.host, self.port)
+        if self.password:
+            conn.execute("AUTH", self.password)
+        if self.db:
+            conn.execute("SELECT", self.db)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self.slots:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            healthy = False
+            try:
+                yield conn
+                healthy = True
+            except RespError:
+                healthy = True      # an error reply leaves the socket in sync
+                raise
+            finally:
+                # A broken socket must not go back into the pool.
+                if healthy:
+                    self.idle.put(conn)
+                else:
+                    conn.close()
+
+
+class RedisStore(NotebookStore):
+    """Notebooks in a Redis-compatible server, shared by every replica.
+
+    Key nb:{handle} is a hash: field "meta:name" holds the notebook name and
+    each note is a field "note:{title}". The key's own TTL is the expiry.
+    Key titles:{handle} is the title index: a sorted set with every score 0,
+    which Redis keeps in lexical order, carrying the same TTL.
+
+    The search index is one hash per term, terms:{handle}:{term}, mapping
+    title -> "{count} {note length}", plus lens:{handle} holding the total
+    length and the notebook version, and vocab:{handle} naming every term
+    the notebook has used, so deleting it can delete its term keys in the
+    same round trip. Key recent:{handle} is a sorted set of
+    titles scored by save time. All of them carry the notebook's TTL too, so
+    they expire with it.
+
+    `metrics` reads counters instead of scanning the keyspace. stats:expiry
+    scores every handle by its expiry time; stats:notes and stats:bytes hold
+    each notebook's note count and size, and stats:totals their sums. Create,
+    save and delete keep them current, and `metrics` retires notebooks whose
+    TTL ran out since the last call.
+
+    The catalog pages over its own index, catalog: every handle with score 0,
+    so ZRANGEBYLEX hands back a page in O(log n + page) and a handle is a
+    cursor that stays put when other notebooks come and go.
+    """
+
+    NAME = "meta:name"
+    NOTE = "note:"
+    EXPIRY, NOTES, BYTES, TOTALS = "stats:expiry", "stats:notes", "stats:bytes", "stats:totals"
+    CATALOG = "catalog"
+
+    def __init__(self, url: str, pool_size: int = 16):
+        parts = urlsplit(url)
+        self.pool = ConnectionPool(
+            parts.hostname or "127.0.0.1", parts.port or 6379,
+            db=int(parts.path.strip("/") or 0), password=parts.password,
+            size=pool_size,
+        )
+
+    @staticmethod
+    def key(handle: str) -> str:
+        return f"nb:{handle}"
+
+    @staticmethod
+    def index(handle: str) -> str:
+        return f"titles:{handle}"
+
+    @staticmethod
+    def posting(handle: str, term: str) -> str:
+        return f"terms:{handle}:{term}"
+
+    @staticmethod
+    def lengths(handle: str) -> str:
+        return f"lens:{handle}"
+
+    @staticmethod
+    def recent(handle: str) -> str:
+        return f"recent:{handle}"
+
+    @staticmethod
+    def vocab(handle: str) -> str:
+        return f"vocab:{handle}"
+
+    def _run(self, *commands: tuple) -> list:
+        with self.pool.connection() as conn:
+            return conn.pipeline(*commands)
+
+    def create(self, handle, name, expires):
+        k, at = self.key(handle), int(expires.timestamp() * 1000)
+        self._run(("HSET", k, self.NAME, name), ("PEXPIREAT", k, at),
+                  ("ZADD", self.EXPIRY, at, handle), ("ZADD", self.CATALOG, 0, handle),
+                  ("HINCRBY", self.BYTES, handle, _size(handle, name)),
+                  ("HINCRBY", self.TOTALS, "bytes", _size(handle, name)))
+
+    def get(self, handle):
+        k = self.key(handle)
+        name, size, ttl, version = self._run(("HGET", k, self.NAME), ("HLEN", k), ("PTTL", k),
+                                             ("HGET", self.lengths(handle), "version"))
+        if name is None or ttl < 0:
+            return None
+        expires = datetime.now(timezone.utc) + timedelta(milliseconds=ttl)
+        return {"name": name, "expires": expires, "count": size - 1,
+                "version": int(version or 0)}
+
+    def delete(self, handle):
+        vocab = self.vocab(handle)
+        terms = self._run(("HKEYS", vocab))[0]
+        self._run(("DEL", self.key(handle), self.index(handle), self.lengths(handle),
+                   self.recent(handle), vocab, *[self.posting(handle, t) for t in terms]))
+        self._forget([handle])
+
+    def save_many(self, handle, notes):
+        k, ix, lens = self.key(handle), self.index(handle), self.lengths(handle)
+        recent = self.recent(handle)
+        batch = dict(notes)         # a title saved twice: the last one wins
+        # Round trip 1: the old texts (to unindex them) and the remaining TTL.
+        olds, ttl = self._run(("HMGET", k, *[self.NOTE + t for t in batch]), ("PTTL", k))
+        if ttl < 0:
+            raise _gone(handle)
+        # Round trip 2: every note, title and posting in the batch, at once.
+        now = time.time()
+        commands = [("HSET", k, *[x for t, c in batch.items() for x in (self.NOTE + t, c)]),
+                    ("HLEN", k), ("PTTL", k),
+                    ("ZADD", ix, *[x for t in batch for x in (0, t)]),
+                    ("ZADD", recent, *[x for i, t in enumerate(batch) for x in (now + i * 1e-6, t)]),
+                    ("HINCRBY", lens, "version", 1)]
+        vocab = self.vocab(handle)
+        touched = {ix, recent, lens, vocab}
+        growth = 0
+        used = set()
+        added = sum(old is None for old in olds)
+        grew = sum(_size(t, c) - (0 if old is None else _size(t, old))
+                   for (t, c), old in zip(batch.items(), olds))
+        commands += [("HINCRBY", self.NOTES, handle, added), ("HINCRBY", self.BYTES, handle, grew),
+                     ("HINCRBY", self.TOTALS, "notes", added),
+                     ("HINCRBY", self.TOTALS, "bytes", grew)]
+        for (title, content), old in zip(batch.items(), olds):
+            new = _terms(title, content)
+            length = sum(new.values())
+            stale = _terms(title, old) if old is not None else Counter()
+            growth += length - sum(stale.values())
+            for term in stale.keys() - new.keys():
+                commands.append(("HDEL", self.posting(handle, term), title))
+            for term, tf in new.items():
+                commands.append(("HSET", self.posting(handle, term), title, f"{tf} {length}"))
+                touched.add(self.posting(handle, term))
+            used.update(new)
+        commands.append(("HINCRBY", lens, "total", growth))
+        if used:
+            commands.append(("HSET", vocab, *[x for term in used for x in (term, 1)]))
+        commands += [("PEXPIRE", key, ttl) for key in touched]
+        _, size, ttl = self._run(*commands)[:3]
+        if ttl == -1:
+            # The notebook expired between lookup and write, so HSET just
+            # created a fresh key with no TTL. Remove it again.
+            self._run(("DEL", k, *touched))
+            self._forget([handle])
+            raise _gone(handle)
+        return size - 1
+
+    def titles(self, handle):
+        return self._run(("ZRANGEBYLEX", self.index(handle), "-", "+"))[0]
+
+    def title_range(self, handle, start="", stop=None, limit=100):
+        return self._run(("ZRANGEBYLEX", self.index(handle), "[" + start,
+                          "+" if stop is None else "(" + stop, "LIMIT", 0, limit))[0]
+
+    def note_many(self, handle, titles):
+        if not titles:
+            return []
+        return self._run(("HMGET", self.key(handle), *[self.NOTE + t for t in titles]))[0]
+
+    def notes(self, handle):
+        flat = self._run(("HGETALL", self.key(handle)))[0]
+        n = len(self.NOTE)
+        return {flat[i][n:]: flat[i + 1] for i in range(0, len(flat), 2)
+                if flat[i].startswith(self.NOTE)}
+
+    def newest(self, handle, offset=0, limit=50):
+        titles = self._run(("ZREVRANGE", self.recent(handle), offset, offset + limit - 1))[0]
+        if not titles:
+            return []
+        contents = self._run(("HMGET", self.key(handle), *[self.NOTE + t for t in titles]))[0]
+        return [(t, c) for t, c in zip(titles, contents) if c is not None]
+
+    def search(self, handle, query, k=10):
+        terms = sorted(set(tokens(query)))
+        key = self.key(handle)
+        *flat, size, total = self._run(*[("HGETALL", self.posting(handle, t)) for t in terms],
+                                       ("HLEN", key), ("HGET", self.lengths(handle), "total"))
+        postings, lengths = [], {}
+        for pairs in flat:
+            posting = {}
+            for title, value in zip(pairs[::2], pairs[1::2]):
+                tf, length = value.split()
+                posting[title] = int(tf)
+                lengths[title] = int(length)
+            postings.append(posting)
+        hits = _bm25(postings, lengths, size - 1, int(total or 0), k)
+        if not hits:
+            return []
+        contents = self._run(("HMGET", key, *[self.NOTE + t for _, t in hits]))[0]
+        return [{"title": t, "score": round(s, 4), "content": c}
+                for (s, t), c in zip(hits, contents) if c is not None]
+
+    def _forget(self, handles: list[str]) -> None:
+        """Take deleted or expired notebooks out of the counters.
+
+        Every replica may try; only the one whose HDEL removes a notebook's
+        size subtracts it from the totals, so nothing is subtracted twice.
+        """
+        if not handles:
+            return
+        notes, sizes, *removed = self._run(
+            ("HMGET", self.NOTES, *handles), ("HMGET", self.BYTES, *handles),
+            *[("HDEL", self.BYTES, h) for h in handles], ("ZREM", self.EXPIRY, *handles))
+        mine = [i for i, n in enumerate(removed[:-1]) if n]
+        self._run(("HDEL", self.NOTES, *handles), ("ZREM", self.CATALOG, *handles),
+                  ("HINCRBY", self.TOTALS, "notes", -sum(int(notes[i] or 0) for i in mine)),
+                  ("HINCRBY", self.TOTALS, "bytes", -sum(int(sizes[i] or 0) for i in mine)))
+
+    def _retire(self, limit: int = 1000) -> int:
+        """Forget up to `limit` notebooks whose TTL ran out. Returns now, in ms."""
+        now = int(time.time() * 1000)
+        self._forget(self._run(("ZRANGEBYSCORE", self.EXPIRY, "-inf", now,
+                                "LIMIT", 0, limit))[0])
+        return now
+
+    def metrics(self):
+        # Expiry and eviction happen inside the server (key TTLs, maxmemory);
+        # notebooks that expired since last time leave the counters here.
+        # O(log n) plus that, however many notebooks are live.
+        now = self._retire()
+        live, (notes, size) = self._run(("ZCOUNT", self.EXPIRY, f"({now}", "+inf"),
+                                        ("HMGET", self.TOTALS, "notes", "bytes"))
+        return {"backend": "redis", "live_handles": live,
+                "notes": int(notes or 0), "bytes_held": int(size or 0)}
+
+    def catalog_page(self, cursor=None, page_size: int = 100):
+        # The cursor is the first handle of the page. One extra handle is
+        # fetched to learn where the next page starts.
+        if cursor is not None and not cursor:
+            raise ValueError(f"Unknown catalog cursor {cursor!r}")
+        self._retire()
+        handles = self._run(("ZRANGEBYLEX", self.CATALOG, "[" + cursor if cursor else "-",
+                             "+", "LIMIT", 0, page_size + 1))[0]
+        handles, more = handles[:page_size], handles[page_size:]
+        entries = []
+        if handles:
+            # Two commands per notebook, ONE round trip for the whole page.
+            replies = self._run(*[c for h in handles for k in (self.key(h),)
+                                  for c in (("HGET", k, self.NAME), ("HLEN", k))])
+            entries = [{"handle": h, "name": name, "notes": size - 1}
+                       for h, name, size in zip(handles, replies[::2], replies[1::2])
+                       if name is not None]
+        digest = hashlib.sha1(json.dumps(entries).encode()).hexdigest()[:16]
+        return {"notebooks": entries, "next": more[0] if more else None,
+                "etag": f'"{digest}"'}
+
+
+def open_store(url: str | None = None) -> NotebookStore:
+    """Build the store named by `url` or $NOTEBOOK_STORE (default: memory)."""
+    url = url or os.getenv("NOTEBOOK_STORE", "memory")
+    if url == "memory":
+        return MemoryStore(max_notebooks=int(os.getenv("NOTEBOOK_MAX_NOTEBOOKS", 0)),
+                           max_notes=int(os.getenv("NOTEBOOK_MAX_NOTES", 0)))
+    if url.startswith("file:"):
+        return DurableStore(urlsplit(url).path or ".",
+                            fsync=os.getenv("NOTEBOOK_FSYNC", "everysec"),
+                            snapshot_bytes=int(os.getenv("NOTEBOOK_SNAPSHOT_BYTES", 64 << 20)),
+                            max_notebooks=int(os.getenv("NOTEBOOK_MAX_NOTEBOOKS", 0)),
+                            max_notes=int(os.getenv("NOTEBOOK_MAX_NOTES", 0)))
+    if url.startswith("redis://"):
+        return RedisStore(url)
+    raise ValueError(f"Unknown NOTEBOOK_STORE {url!r}: "
+                     "use 'memory', file:///dir or redis://host:port")
+
+
+# ─── A tiny RESP server, for running without Redis ──────────────────
+# Only the handful of commands RedisStore sends, with lazy expiry. Good for a
+# laptop and for tests; not a database.
+
+class _ZSet:
+    """A sorted set: member -> score, plus (score, member) pairs kept in order."""
+
+    def __init__(self):
+        self.scores: dict[str, float] = {}
+        self.order: list[tuple[float, str]] = []
+
+    def add(self, score: float, member: str) -> bool:
+        old = self.scores.get(member)
+        if old == score:
+            return False
+        if old is not None:
+            self.order.pop(bisect.bisect_left(self.order, (old, member)))
+        self.scores[member] = score
+        bisect.insort(self.order, (score, member))
+        return old is None
+
+    def remove(self, member: str) -> bool:
+        old = self.scores.pop(member, None)
+        if old is None:
+            return False
+        self.order.pop(bisect.bisect_left(self.order, (old, member)))
+        return True
+
+    def between(self, lo: str, hi: str) -> list[str]:
+        """Members scored within [lo, hi]; a leading "(" makes a bound exclusive."""
+        start = (bisect.bisect_right if lo[0] == "(" else bisect.bisect_left)(
+            self.order, float(lo.lstrip("(")), key=lambda pair: pair[0])
+        end = (bisect.bisect_left if hi[0] == "(" else bisect.bisect_right)(
+            self.order, float(hi.lstrip("(")), key=lambda pair: pair[0])
+        return [m for _, m in self.order[start:end]]
+
+
+class MiniResp:
+    def __init__(self):
+        self.data: dict[str, dict[str, str] | _ZSet] = {}   # hashes, zsets
+        self.expiry: dict[str, float] = {}      # key -> unix ms
+
+    def _live(self, key: str) -> dict | None:
+        at = self.expiry.get(key)
+        if at is not None and at <= time.time() * 1000:
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return self.data.get(key)
+
+    def run(self, cmd: str, *a: str):
+        if cmd in ("PING", "SELECT", "AUTH"):
+            return "PONG" if cmd == "PING" else "OK"
+        if cmd == "HSET":
+            h = self._live(a[0])
+            if h is None:
+                h = self.data[a[0]] = {}
+            added = sum(f not in h for f in a[1::2])
+            h.update(zip(a[1::2], a[2::2]))
+            return added
+        if cmd == "HGET":
+            return (self._live(a[0]) or {}).get(a[1])
+        if cmd == "HMGET":
+            h = self._live(a[0]) or {}
+            return [h.get(f) for f in a[1:]]
+        if cmd == "HLEN":
+            return len(self._live(a[0]) or {})
+        if cmd == "HKEYS":
+            return list(self._live(a[0]) or {})
+        if cmd == "HGETALL":
+            return [x for kv in (self._live(a[0]) or {}).items() for x in kv]
+        if cmd == "HINCRBY":
+            h = self._live(a[0])
+            if h is None:
+                h = self.data[a[0]] = {}
+            h[a[1]] = str(int(h.get(a[1], 0)) + int(a[2]))
+            return int(h[a[1]])
+        if cmd == "HDEL":
+            h = self._live(a[0]) or {}
+            removed = sum(h.pop(f, None) is not None for f in a[1:])
+            if not h:
+                # Like Redis, a hash whose last field goes goes with it.
+                self.data.pop(a[0], None)
+                self.expiry.pop(a[0], None)
+            return removed
+        if cmd in ("DEL", "EXISTS"):
+            n = sum(self._live(k) is not None for k in a)
+            if cmd == "DEL":
+                for k in a:
+                    self.data.pop(k, None)
+                    self.expiry.pop(k, None)
+            return n
+        if cmd in ("PEXPIRE", "PEXPIREAT"):
+            if self._live(a[0]) is None:
+                return 0
+            self.expiry[a[0]] = int(a[1]) + (time.time() * 1000 if cmd == "PEXPIRE" else 0)
+            return 1
+        if cmd == "PTTL":
+            if self._live(a[0]) is None:
+                return -2
+            at = self.expiry.get(a[0])
+            return -1 if at is None else max(0, int(at - time.time() * 1000))
+        if cmd == "ZADD":
+            z = self._live(a[0])
+            if z is None:
+                z = self.data[a[0]] = _ZSet()
+            return sum(z.add(float(score), member) for score, member in zip(a[1::2], a[2::2]))
+        if cmd == "ZREM":
+            z = self._live(a[0]) or _ZSet()
+            return sum(z.remove(m) for m in a[1:])
+        if cmd in ("ZCOUNT", "ZRANGEBYSCORE"):
+            found = (self._live(a[0]) or _ZSet()).between(a[1], a[2])
+            if cmd == "ZCOUNT":
+                return len(found)
+            if len(a) > 5 and a[3].upper() == "LIMIT":
+                found = found[int(a[4]):int(a[4]) + int(a[5])]
+            return found
+        if cmd == "ZRANGEBYLEX":
+            # Only meaningful when every score is equal, as Redis requires.
+            order = (self._live(a[0]) or _ZSet()).order
+            score = order[0][0] if order else 0.0
+
+            def bound(spec, end):
+                if spec in ("-", "+"):
+                    return 0 if spec == "-" else len(order)
+                side = bisect.bisect_left if (spec[0] == "[") != end else bisect.bisect_right
+                return side(order, (score, spec[1:]))
+
+            lo, hi = bound(a[1], False), bound(a[2], True)
+            if len(a) > 5 and a[3].upper() == "LIMIT":
+                lo += int(a[4])
+                hi = min(hi, lo + int(a[5]))
+            return [m for _, m in order[lo:hi]]
+        if cmd == "ZREVRANGE":
+            order = (self._live(a[0]) or _ZSet()).order
+            n, start, stop = len(order), int(a[1]), int(a[2])
+            stop = n - 1 if stop < 0 else min(stop, n - 1)
+            return [m for _, m in reversed(order[max(n - 1 - stop, 0):max(n - start, 0)])]
+        raise RespError(f"ERR unknown command '{cmd}'")
+
+
+def _reply(value) -> bytes:
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_reply(v) for v in value)
+    data = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+async def serve(port: int = 6379, host: str = "127.0.0.1") -> asyncio.AbstractServer:
+    """Start the stand-in RESP server on the running loop and return it."""
+    db = MiniResp()
+
+    async def client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                argc = int(line[1:-2])
+                args = []
+                for _ in range(argc):
+                    size = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(size + 2))[:-2].decode())
+                try:
+                    result = db.run(args[0].upper(), *args[1:])
+                except RespError as exc:
+                    result = exc
+                except (IndexError, ValueError):
+                    result = RespError(f"ERR bad arguments for '{args[0]}'")
+                writer.write(_reply(result))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(client, host, port)
+
+
+if __name__ == "__main__":
+    PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+
+    async def main():
+        server = await serve(PORT)
+        print(f"\033[92m[store] RESP stand-in on redis://127.0.0.1:{PORT}\033[0m")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
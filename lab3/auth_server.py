@@ -15,19 +15,49 @@
 #   * The metadata advertises `client_id_metadata_document_supported`, since
 #     2026-07-28 deprecates Dynamic Client Registration in favor of CIMD.
 #
+# Tokens are signed with an ASYMMETRIC key (RS256 by default, or EdDSA /
+# Ed25519 via TOKEN_ALG). Only this server holds the private half; the public
+# halves are published at /.well-known/jwks.json, each labelled with a "kid".
+# A resource server needs no shared secret - it fetches that document - so
+# any number of replicas can verify tokens independently.
+#
 # NOTE: This is a teaching stand-in, not a production authorization server.
-# It uses a symmetric HS256 key shared with the MCP server so the lab can run
-# entirely offline. Real deployments use asymmetric keys published via JWKS.
+# Keys are generated at startup and live only in memory.
+#
+# Introspection is built for gateways that check many tokens: results are
+# memoized per token, /introspect/batch answers N tokens in one round trip,
+# and every answer carries Cache-Control so callers can reuse it for as long
+# as it stays true - the token's remaining lifetime.
+#
+# Issuance is built for throughput: client secrets are stored only as salted
+# hashes and checked in constant time, signing runs on a thread pool instead
+# of the event loop, /metrics exposes Prometheus counters and latency
+# histograms, and `--workers N` runs several uvicorn workers that share one
+# key ring through AUTH_KEYS_FILE.
 
-from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import uvicorn
-from fastapi import Body, Depends, FastAPI, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
-from jose import JWTError, jwt
+from fastapi import Body, FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import PlainTextResponse
+from joserfc import jwk, jws, jwt
+from joserfc.errors import JoseError
+from joserfc.jws import JWSRegistry
+
+from metrics import Counter, Histogram, render
 
-SECRET_KEY = "mcp-lab-secret"                       # shared with the MCP server
-ALGORITHM = "HS256"
+TOKEN_ALG = os.environ.get("TOKEN_ALG", "RS256")   # RS256 | EdDSA | Ed25519
 ISSUER = "http://127.0.0.1:9000"                    # this server's issuer identity
 
 # 1) AUDIENCE is now the MCP server's canonical resource URI, not a made-up
@@ -36,28 +66,189 @@ RESOURCE = "http://127.0.0.1:8000/mcp"
 
 EXPIRES_IN = 3600
 
-# Fake "client registry" so we don't need users or a database.
-_fake_clients = {
-    "demo-client": {
-        "client_secret": "demopass",
-        "scopes": ["calc:add"],
-    }
+MAX_BATCH = 1000            # tokens per /introspect/batch call
+INTROSPECT_CACHE = 100_000  # memoized introspection results (LRU)
+INACTIVE_TTL = 60           # how long a negative answer may be reused
+MAX_SECRET = 256            # longer client secrets are refused before hashing
+SIGNING_THREADS = int(os.environ.get("SIGNING_THREADS", "4"))
+# /rotate needs "Authorization: Bearer $AUTH_ADMIN_TOKEN"; with no admin token
+# set it only answers loopback callers. Rotating faster than resource servers
+# refresh the JWKS (secure_server.py: every 300 s) would sign with keys they
+# have not seen yet, so rotations closer together than this are refused.
+ADMIN_TOKEN = os.environ.get("AUTH_ADMIN_TOKEN", "")
+ROTATE_MIN_INTERVAL = float(os.environ.get("ROTATE_MIN_INTERVAL", "300"))
+
+
+def _hash_secret(secret: str, salt: bytes) -> bytes:
+    # Client secrets are long random strings issued by this server, not
+    # passwords a person chose, so one salted SHA-256 is enough - and its
+    # cost is fixed. A password KDF (bcrypt, scrypt) is deliberately slow and
+    # would cap issuance at a handful of tokens per second per core.
+    return hmac.new(salt, secret.encode(), hashlib.sha256).digest()
+
+
+def _client(salt: str, secret_hash: str, scopes: list[str]) -> dict:
+    # Everything /token needs is computed once, here, not per request.
+    return {"salt": bytes.fromhex(salt), "secret_hash": bytes.fromhex(secret_hash),
+            "scopes": scopes, "scope": " ".join(scopes)}
+
+
+# Fake "client registry" so we don't need users or a database. Only a salted
+# hash of each secret is kept (demo-client's secret is "demopass").
+_clients = {
+    "demo-client": _client("41d50251b5ec4eb75e095aba494e9577",
+                           "6aa2c625cada34ec51706aed8f863cb235ae31c05c7320a639ecc4152fd5181a",
+                           ["calc:add"]),
 }
+# Checked against when the client id is unknown, so the response time does
+# not reveal which client ids exist.
+_nobody = _client(os.urandom(16).hex(), os.urandom(32).hex(), [])
+
+
+def _authenticate(client_id: str, secret: str) -> dict | None:
+    if len(secret) > MAX_SECRET:
+        return None
+    client = _clients.get(client_id)
+    record = client or _nobody
+    matches = hmac.compare_digest(_hash_secret(secret, record["salt"]), record["secret_hash"])
+    return client if matches and client is not None else None
+
+
+class KeyRing:
+    """Signing keys with kid-based rotation.
+
+    Three kinds of key are published in the JWKS at any moment:
 
+      current   signs every new token
+      next      published but not used yet, so resource servers refreshing
+                in the background already hold it when rotation happens
+      retired   no longer signs, still published until every token it
+                signed has expired (EXPIRES_IN after retirement)
+
+    `rotate()` moves next -> current -> retired and creates a new next.
+
+    With a `path`, the ring is kept in that file (private keys included, mode
+    0600) so every uvicorn worker signs with and publishes the same keys. A
+    worker notices another one's rotation within a second.
+    """
+
+    def __init__(self, alg: str, path: str | None = None):
+        self.alg, self.path = alg, path
+        self.version, self.checked_at = None, 0.0
+        if path and os.path.exists(path):
+            self._load()
+        else:
+            self.current, self.next = self._generate(), self._generate()
+            self.retired: dict[str, tuple[jwk.Key, float]] = {}
+            if path:
+                self.save()
+
+    def _generate(self) -> jwk.Key:
+        params = {"alg": self.alg, "use": "sig"}
+        if self.alg == "RS256":
+            return jwk.RSAKey.generate_key(2048, parameters=params, auto_kid=True)
+        if self.alg in ("EdDSA", "Ed25519"):
+            return jwk.OKPKey.generate_key("Ed25519", parameters=params, auto_kid=True)
+        raise ValueError(f"unsupported TOKEN_ALG {self.alg!r}")
+
+    def save(self) -> None:
+        ring = {"alg": self.alg,
+                "current": self.current.as_dict(private=True),
+                "next": self.next.as_dict(private=True),
+                "retired": [[key.as_dict(private=True), until]
+                            for key, until in self.retired.values()]}
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, temp = tempfile.mkstemp(dir=folder)       # created 0600
+        with os.fdopen(fd, "w") as f:
+            json.dump(ring, f)
+        os.replace(temp, self.path)                   # readers never see half a file
+        self.version = os.stat(self.path).st_mtime_ns
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            ring = json.load(f)
+        self.version = os.stat(self.path).st_mtime_ns
+        retired = {}
+        for data, until in ring["retired"]:
+            key = jwk.import_key(data)
+            retired[key.kid] = (key, until)
+        self.alg = ring["alg"]
+        self.current, self.next, self.retired = (
+            jwk.import_key(ring["current"]), jwk.import_key(ring["next"]), retired)
+
+    def _sync(self) -> None:
+        if self.path is None or time.monotonic() - self.checked_at < 1.0:
+            return
+        self.checked_at = time.monotonic()
+        if os.stat(self.path).st_mtime_ns != self.version:
+            self._load()
+
+    def signing(self) -> jwk.Key:
+        self._sync()
+        return self.current
+
+    def rotated_at(self) -> float:
+        """When the last rotation happened (0 if never), across every worker."""
+        self._sync()
+        return max((until - EXPIRES_IN for _, until in self.retired.values()), default=0.0)
+
+    def rotate(self) -> None:
+        self.checked_at = 0.0
+        self._sync()
+        now = time.time()
+        self.retired = {kid: kept for kid, kept in self.retired.items() if kept[1] > now}
+        self.retired[self.current.kid] = (self.current, now + EXPIRES_IN)
+        self.current, self.next = self.next, self._generate()
+        if self.path:
+            self.save()
+
+    def find(self, kid: str | None) -> jwk.Key | None:
+        self._sync()
+        for key in (self.current, self.next):
+            if key.kid == kid:
+                return key
+        kept = self.retired.get(kid)
+        return kept[0] if kept and kept[1] > time.time() else None
+
+    def jwks(self) -> dict:
+        self._sync()
+        now = time.time()
+        keys = [self.current, self.next]
+        keys += [key for key, until in self.retired.values() if until > now]
+        return {"keys": [key.as_dict(private=False) for key in keys]}
+
+
+keys = KeyRing(TOKEN_ALG, os.environ.get("AUTH_KEYS_FILE"))
 app = FastAPI(title="MCP Lab - Authorization Server")
 
+# Signing is the expensive part of issuance. It runs here, off the event
+# loop, so a burst of /token calls cannot stall every other request.
+_signer = ThreadPoolExecutor(SIGNING_THREADS, thread_name_prefix="sign")
+
+TOKENS = Counter("auth_tokens_total", "Token requests by outcome.", label="result")
+ISSUE_SECONDS = Histogram("auth_token_issue_seconds", "Time to answer a successful /token.",
+                          buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+SIGN_SECONDS = Histogram("auth_token_sign_seconds", "Time spent signing one token.",
+                         buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+
 
 def _create_access_token(sub: str, scopes: list[str], audience: str) -> str:
-    now = datetime.now(timezone.utc)
+    now = int(time.time())
     payload = {
         "sub": sub,
         "scope": " ".join(scopes),
         "aud": audience,      # 2) audience binding - the heart of RFC 8707
         "iss": ISSUER,        # 3) issuer - the MCP server verifies this too
         "iat": now,
-        "exp": now + timedelta(seconds=EXPIRES_IN),
+        "exp": now + EXPIRES_IN,
     }
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    # The kid header tells a verifier which published key to check against.
+    key = keys.signing()
+    header = {"alg": keys.alg, "kid": key.kid, "typ": "at+jwt"}
+    started = time.perf_counter()
+    signed = jwt.encode(header, payload, key, algorithms=[keys.alg])
+    SIGN_SECONDS.observe(time.perf_counter() - started)
+    return signed
 
 
 # 4) RFC 8414 authorization server metadata.
@@ -69,6 +260,8 @@ def as_metadata():
         "issuer": ISSUER,
         "token_endpoint": f"{ISSUER}/token",
         "introspection_endpoint": f"{ISSUER}/introspect",
+        "introspection_batch_endpoint": f"{ISSUER}/introspect/batch",
+        "jwks_uri": f"{ISSUER}/.well-known/jwks.json",
         "grant_types_supported": ["client_credentials", "authorization_code"],
         "token_endpoint_auth_methods_supported": ["client_secret_post", "none"],
         # PKCE: clients MUST verify S256 is offered or refuse to proceed.
@@ -85,45 +278,99 @@ def as_metadata():
     }
 
 
+# 5) The public keys, one per kid. Resource servers cache this document and
+#    re-fetch it in the background; it never contains a private key.
+@app.get("/.well-known/jwks.json")
+def jwks():
+    return keys.jwks()
+
+
+_rotating = threading.Lock()   # one check-then-rotate at a time per worker
+
+
+def _is_admin(request: Request) -> bool:
+    if ADMIN_TOKEN:
+        sent = request.headers.get("Authorization", "")
+        return hmac.compare_digest(sent.encode(), f"Bearer {ADMIN_TOKEN}".encode())
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1")
+
+
+@app.post("/rotate")
+def rotate(request: Request):
+    """Start signing with the pre-published next key. Admin only, rate limited."""
+    if not _is_admin(request):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    with _rotating:
+        wait = keys.rotated_at() + ROTATE_MIN_INTERVAL - time.time()
+        if wait > 0:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail="Rotated too recently",
+                                headers={"Retry-After": str(int(wait) + 1)})
+        keys.rotate()
+    return {"current": keys.current.kid, "next": keys.next.kid,
+            "retired": sorted(keys.retired)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of the issuance metrics."""
+    return PlainTextResponse(render(TOKENS, ISSUE_SECONDS, SIGN_SECONDS),
+                             media_type="text/plain; version=0.0.4")
+
+
 @app.post("/token")
-def token(form: OAuth2PasswordRequestForm = Depends(), resource: str | None = None):
+async def token(request: Request, resource: str | None = None):
     """
     Simplified grant: client_id + secret -> {access_token, expires_in}.
 
-    5) `resource` is the RFC 8707 Resource Indicator. A 2026-07-28 client MUST
+    The form is read directly rather than through a pydantic form model:
+    that validation cost as much CPU as signing the token. Credentials may
+    be sent as client_id/client_secret (RFC 6749 client_secret_post) or as
+    the username/password pair the lab's curl commands use.
+
+    6) `resource` is the RFC 8707 Resource Indicator. A 2026-07-28 client MUST
        send it on BOTH the authorization request and the token request. We honor
        it by minting a token whose audience is that resource, so the token can
        only be spent at the MCP server it was requested for.
     """
-    client = _fake_clients.get(form.username)
-    if not client or client["client_secret"] != form.password:
+    started = time.perf_counter()
+    form = await request.form()
+    client_id = str(form.get("client_id") or form.get("username") or "")
+    client = _authenticate(client_id, str(form.get("client_secret") or form.get("password") or ""))
+    if client is None:
+        TOKENS.inc("invalid_client")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid client credentials",
         )
 
     audience = resource or RESOURCE
-    access_token = _create_access_token(form.username, client["scopes"], audience)
+    access_token = await asyncio.get_running_loop().run_in_executor(
+        _signer, _create_access_token, client_id, client["scopes"], audience)
+    TOKENS.inc("issued")
+    ISSUE_SECONDS.observe(time.perf_counter() - started)
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "expires_in": EXPIRES_IN,
-        "scope": " ".join(client["scopes"]),
+        "scope": client["scope"],
     }
 
 
-@app.post("/introspect")
-def introspect(token: str = Body(..., embed=True)):
-    """RFC 7662-style introspection, so you can inspect a token in the lab."""
+def _check(token: str) -> dict:
+    """Verify one token from scratch and describe it, RFC 7662 style."""
     try:
-        payload = jwt.decode(
-            token,
-            SECRET_KEY,
-            algorithms=[ALGORITHM],
-            audience=RESOURCE,
-            issuer=ISSUER,
-        )
-    except JWTError as exc:
+        key = keys.find(jws.extract_compact(token.encode()).headers().get("kid"))
+        if key is None:
+            return {"active": False, "error": "unknown kid"}
+        payload = jwt.decode(token, key, algorithms=[keys.alg],
+                             registry=JWSRegistry(algorithms=[keys.alg])).claims
+        jwt.JWTClaimsRegistry(
+            iss={"essential": True, "value": ISSUER},
+            aud={"essential": True, "value": RESOURCE},
+            exp={"essential": True},
+        ).validate(payload)
+    except (JoseError, ValueError) as exc:
         return {"active": False, "error": str(exc)}
 
     return {
@@ -136,5 +383,80 @@ def introspect(token: str = Body(..., embed=True)):
     }
 
 
+# 7) Introspection results are memoized: a token's answer cannot change
+#    before it expires (nothing here revokes tokens), so the signature check
+#    runs once per token, not once per question. Keyed by a hash of the
+#    token; an entry lives until exp, or INACTIVE_TTL for a negative answer.
+_introspected: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+_introspected_lock = threading.Lock()       # sync endpoints run in a threadpool
+
+
+def _introspect(token: str, now: float) -> tuple[dict, float]:
+    """(answer, seconds it stays valid) for one token, memoized."""
+    key = hashlib.sha256(token.encode()).digest()
+    with _introspected_lock:
+        entry = _introspected.get(key)
+        if entry is not None and entry[0] > now:
+            _introspected.move_to_end(key)
+            return entry[1], entry[0] - now
+    result = _check(token)
+    until = result["exp"] if result["active"] else now + INACTIVE_TTL
+    with _introspected_lock:
+        _introspected[key] = (until, result)
+        if len(_introspected) > INTROSPECT_CACHE:
+            _introspected.popitem(last=False)
+    return result, until - now
+
+
+def _cache_control(response: Response, fresh_for: float) -> None:
+    # private: an answer about one caller's token is not for shared caches.
+    response.headers["Cache-Control"] = f"private, max-age={max(0, int(fresh_for))}"
+
+
+@app.post("/introspect")
+def introspect(response: Response, token: str = Body(..., embed=True)):
+    """RFC 7662-style introspection, so you can inspect a token in the lab."""
+    result, fresh_for = _introspect(token, time.time())
+    _cache_control(response, fresh_for)
+    return result
+
+
+@app.post("/introspect/batch")
+def introspect_batch(response: Response, tokens: list[str] = Body(..., embed=True)):
+    """
+    N tokens in, N answers out, in the same order - one round trip instead of N.
+
+    The response may be reused only as long as its shortest-lived answer.
+    """
+    if len(tokens) > MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"at most {MAX_BATCH} tokens per batch",
+        )
+    now = time.time()
+    answers = [_introspect(token, now) for token in tokens]
+    _cache_control(response, min((fresh for _, fresh in answers), default=0))
+    return {"results": [result for result, _ in answers]}
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=9000)
+    parser = argparse.ArgumentParser(description="MCP lab authorization server.")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    if args.workers == 1:
+        uvicorn.run(app, host="0.0.0.0", port=args.port)
+    else:
+        # Workers are separate processes. Put the key ring in a file first so
+        # they all load the same keys instead of each generating its own.
+        folder = None
+        if keys.path is None:
+            folder = tempfile.mkdtemp(prefix="mcp-lab-keys-")
+            keys.path = os.path.join(folder, "keys.json")
+            keys.save()
+            os.environ["AUTH_KEYS_FILE"] = keys.path
+        try:
+            uvicorn.run("auth_server:app", host="0.0.0.0", port=args.port, workers=args.workers)
+        finally:
+            if folder:
+                shutil.rmtree(folder)     # private keys do not outlive the server
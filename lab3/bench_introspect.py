@@ -0,0 +1,85 @@
+# bench_introspect.py - introspections/sec, one token per call vs batched.
+#
+# Serves auth_server.py's app in this process, mints a pool of tokens, then
+# asks about them over real HTTP in four ways:
+#
+#   single  cold   POST /introspect per token, memo cleared first
+#   single  warm   the same again - every answer now comes from the memo
+#   batch   cold   POST /introspect/batch with --batch tokens per call
+#   batch   warm   the same again
+#
+# "cold" pays for the signature check on every token; "warm" shows what is
+# left once it is memoized - mostly HTTP round trips, which is what batching
+# removes.
+#
+# Usage:  python bench_introspect.py [--tokens 5000] [--batch 100] [--concurrency 16]
+
+import argparse
+import asyncio
+import time
+
+import uvicorn
+from aiohttp import ClientSession, TCPConnector
+
+import auth_server
+
+parser = argparse.ArgumentParser(description="Single vs batch token introspection.")
+parser.add_argument("--tokens", type=int, default=5000)
+parser.add_argument("--batch", type=int, default=100)
+parser.add_argument("--concurrency", type=int, default=16)
+args = parser.parse_args()
+
+CYAN, GREEN, RESET = "\033[96m", "\033[92m", "\033[0m"
+PORT = 8920
+URL = f"http://127.0.0.1:{PORT}"
+
+
+async def run(http: ClientSession, path: str, bodies: list[dict]) -> tuple[float, list[dict]]:
+    """POST every body, `concurrency` at a time; return (seconds, every answer)."""
+    answers, pending = [], iter(bodies)
+
+    async def worker() -> None:
+        for body in pending:
+            async with http.post(URL + path, json=body, raise_for_status=True) as r:
+                data = await r.json()
+            answers.extend(data["results"] if "results" in data else [data])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return time.perf_counter() - started, answers
+
+
+async def main() -> None:
+    server = uvicorn.Server(uvicorn.Config(auth_server.app, host="127.0.0.1", port=PORT,
+                                           log_level="error"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    tokens = [auth_server._create_access_token(f"client-{i}", ["calc:add"], auth_server.RESOURCE)
+              for i in range(args.tokens)]
+    single = [{"token": t} for t in tokens]
+    batches = [{"tokens": tokens[i:i + args.batch]} for i in range(0, len(tokens), args.batch)]
+    print(f"{CYAN}{args.tokens:,} tokens ({auth_server.keys.alg}), "
+          f"batch {args.batch}, concurrency {args.concurrency}{RESET}")
+
+    rates = {}
+    try:
+        async with ClientSession(connector=TCPConnector(limit=args.concurrency)) as http:
+            for name, path, bodies in (("single", "/introspect", single),
+                                       ("batch", "/introspect/batch", batches)):
+                auth_server._introspected.clear()
+                for phase in ("cold", "warm"):
+                    took, answers = await run(http, path, bodies)
+                    assert len(answers) == args.tokens and all(a["active"] for a in answers)
+                    rates[name, phase] = args.tokens / took
+                    print(f"  {name:6} {phase}  {rates[name, phase]:10,.0f} introspections/s   "
+                          f"({len(bodies):,} calls)")
+    finally:
+        server.should_exit = True
+        await serving
+    print(f"  {GREEN}batch vs single: {rates['batch', 'cold'] / rates['single', 'cold']:.0f}x cold, "
+          f"{rates['batch', 'warm'] / rates['single', 'warm']:.0f}x warm{RESET}")
+
+
+asyncio.run(main())
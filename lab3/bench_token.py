@@ -0,0 +1,104 @@
+# bench_token.py - how many tokens per second can auth_server.py issue?
+#
+# Starts auth_server.py once per worker count (uvicorn --workers N behind a
+# single port), fires concurrent client-credentials requests at /token, and
+# prints issuances/sec with p50/p99 latency. Then it scrapes /metrics to show
+# what the server measured about itself: signing time vs whole-request time.
+#
+# Issuance is CPU-bound (one signature per token), so workers only help when
+# there are cores to put them on - compare the rows against `nproc`.
+#
+# Usage:  python bench_token.py [--workers 1 2 4] [--requests 5000] [--concurrency 64]
+#         TOKEN_ALG=EdDSA python bench_token.py
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession, TCPConnector
+
+parser = argparse.ArgumentParser(description="Token issuance throughput per worker count.")
+parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+parser.add_argument("--requests", type=int, default=5000)
+parser.add_argument("--concurrency", type=int, default=64)
+args = parser.parse_args()
+
+PORT = 8930
+URL = f"http://127.0.0.1:{PORT}"
+SERVER = Path(__file__).with_name("auth_server.py")
+FORM = {"username": "demo-client", "password": "demopass"}
+CYAN, YELLOW, RESET = "\033[96m", "\033[93m", "\033[0m"
+
+
+async def wait_for(url: str) -> None:
+    async with ClientSession() as s:
+        for _ in range(200):
+            try:
+                async with s.get(url) as r:
+                    if r.status == 200:
+                        return
+            except OSError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} never came up")
+
+
+def histogram_mean(exposition: str, name: str) -> float:
+    """Average of one histogram, summed over every worker that answered."""
+    total = count = 0.0
+    for line in exposition.splitlines():
+        if line.startswith(f"{name}_sum"):
+            total += float(line.rsplit(" ", 1)[1])
+        elif line.startswith(f"{name}_count"):
+            count += float(line.rsplit(" ", 1)[1])
+    return total / count if count else 0.0
+
+
+async def run(workers: int) -> None:
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, str(SERVER), "--port", str(PORT), "--workers", str(workers),
+        cwd=SERVER.parent, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await wait_for(f"{URL}/.well-known/jwks.json")
+        latencies: list[float] = []
+        remaining = iter(range(args.requests))
+
+        async def worker(s: ClientSession) -> None:
+            for _ in remaining:
+                started = time.perf_counter()
+                async with s.post(f"{URL}/token", data=FORM, raise_for_status=True) as r:
+                    await r.read()
+                latencies.append(time.perf_counter() - started)
+
+        async with ClientSession(connector=TCPConnector(limit=args.concurrency)) as s:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(s) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - t0
+            async with s.get(f"{URL}/metrics") as r:
+                exposition = await r.text()
+
+        q = statistics.quantiles(latencies, n=100)
+        print(f"  {workers} worker{'s' if workers > 1 else ' '}  "
+              f"{len(latencies) / elapsed:8,.0f} tokens/s   "
+              f"p50 {q[49] * 1000:6.1f}  p99 {q[98] * 1000:6.1f} ms   "
+              f"{YELLOW}server: sign {histogram_mean(exposition, 'auth_token_sign_seconds') * 1000:.2f} ms, "
+              f"request {histogram_mean(exposition, 'auth_token_issue_seconds') * 1000:.2f} ms{RESET}")
+    finally:
+        server.terminate()
+        await server.wait()
+
+
+async def main() -> None:
+    print(f"{CYAN}{args.requests:,} /token requests, concurrency {args.concurrency}, "
+          f"{os.environ.get('TOKEN_ALG', 'RS256')}, {os.cpu_count()} CPUs{RESET}")
+    for workers in args.workers:
+        await run(workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
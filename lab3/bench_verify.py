@@ -0,0 +1,124 @@
+# bench_verify.py - what does re-verifying every bearer token cost?
+#
+# Two measurements, each with FastMCP's plain JWTVerifier and with
+# token_cache.py's CachingJWTVerifier:
+#
+#   verify only   load_access_token() in a tight loop - the CPU per request
+#                 that the cache takes away.
+#   end to end    the secure calculator served over real HTTP, hit with
+#                 concurrent tools/list requests - what that CPU is worth
+#                 once the rest of the request path is included.
+#
+# Tokens are RS256, minted here with a throwaway key pair, for a handful of
+# clients that each reuse their token, as real clients do.
+#
+# Usage:  python bench_verify.py [--tokens 50] [--verifies 20000] [--requests 3000]
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import uvicorn
+from aiohttp import ClientSession, TCPConnector
+from joserfc import jwk, jwt
+from pydantic import AnyHttpUrl
+
+from fastmcp import FastMCP
+from fastmcp.server.auth import JWTVerifier, RemoteAuthProvider
+
+from secure_server import ISSUER, RESOURCE
+from token_cache import CachingJWTVerifier
+
+parser = argparse.ArgumentParser(description="Bearer verification with and without a cache.")
+parser.add_argument("--tokens", type=int, default=50, help="distinct clients/tokens")
+parser.add_argument("--verifies", type=int, default=20_000)
+parser.add_argument("--requests", type=int, default=3000)
+parser.add_argument("--concurrency", type=int, default=32)
+args = parser.parse_args()
+
+CYAN, GREEN, RESET = "\033[96m", "\033[92m", "\033[0m"
+PORT = 8810
+KEY = jwk.RSAKey.generate_key(2048)
+BODY = {"jsonrpc": "2.0", "id": 1, "method": "tools/list",
+        "params": {"_meta": {"io.modelcontextprotocol/protocolVersion": "2026-07-28",
+                             "io.modelcontextprotocol/clientCapabilities": {}}}}
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream",
+           "MCP-Protocol-Version": "2026-07-28", "Mcp-Method": "tools/list"}
+
+
+def mint(client: str) -> str:
+    now = int(time.time())
+    return jwt.encode({"alg": "RS256"}, {"sub": client, "scope": "calc:add", "aud": RESOURCE,
+                                         "iss": ISSUER, "iat": now, "exp": now + 3600}, KEY)
+
+
+def make_verifier(cached: bool) -> JWTVerifier:
+    kind = CachingJWTVerifier if cached else JWTVerifier
+    return kind(public_key=KEY.as_pem(private=False).decode(), algorithm="RS256", issuer=ISSUER,
+                audience=RESOURCE, required_scopes=["calc:add"])
+
+
+async def verify_only(cached: bool, tokens: list[str]) -> float:
+    verifier = make_verifier(cached)
+    started = time.perf_counter()
+    for i in range(args.verifies):
+        assert await verifier.load_access_token(tokens[i % len(tokens)]) is not None
+    return args.verifies / (time.perf_counter() - started)
+
+
+async def end_to_end(cached: bool, tokens: list[str]) -> tuple[float, list[float]]:
+    mcp = FastMCP("Secure Calc", auth=RemoteAuthProvider(
+        token_verifier=make_verifier(cached), authorization_servers=[AnyHttpUrl(ISSUER)],
+        base_url=f"http://127.0.0.1:{PORT}", resource_name="bench"))
+
+    @mcp.tool
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    server = uvicorn.Server(uvicorn.Config(mcp.http_app(path="/mcp"), host="127.0.0.1",
+                                           port=PORT, log_level="error"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    latencies: list[float] = []
+    remaining = iter(range(args.requests))
+    try:
+        async with ClientSession(connector=TCPConnector(limit=args.concurrency)) as http:
+            async def worker() -> None:
+                for i in remaining:
+                    headers = dict(HEADERS, Authorization=f"Bearer {tokens[i % len(tokens)]}")
+                    started = time.perf_counter()
+                    async with http.post(f"http://127.0.0.1:{PORT}/mcp", json=BODY,
+                                         headers=headers, raise_for_status=True) as r:
+                        await r.read()
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            took = time.perf_counter() - started
+    finally:
+        server.should_exit = True
+        await serving
+    return args.requests / took, latencies
+
+
+async def main() -> None:
+    tokens = [mint(f"client-{i}") for i in range(args.tokens)]
+    print(f"{CYAN}verify only{RESET} - {args.verifies:,} verifications, {args.tokens} tokens")
+    rates = {}
+    for cached in (False, True):
+        rates[cached] = await verify_only(cached, tokens)
+        print(f"  {'cached' if cached else 'plain':7} {rates[cached]:12,.0f} verifications/s")
+    print(f"  {GREEN}{rates[True] / rates[False]:.0f}x{RESET}")
+
+    print(f"\n{CYAN}end to end{RESET} - {args.requests:,} tools/list over HTTP, "
+          f"concurrency {args.concurrency}")
+    for cached in (False, True):
+        rate, latencies = await end_to_end(cached, tokens)
+        q = statistics.quantiles(latencies, n=100)
+        print(f"  {'cached' if cached else 'plain':7} {rate:8,.0f} req/s   "
+              f"p50 {q[49] * 1000:6.1f} ms   p99 {q[98] * 1000:6.1f} ms")
+
+
+asyncio.run(main())
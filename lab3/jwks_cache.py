@@ -0,0 +1,174 @@
+"""
+jwks_cache.py - the authorization server's public keys, held in memory.
+
+With asymmetric tokens the resource server holds no secret at all: it
+verifies with the PUBLIC keys the authorization server publishes at
+/.well-known/jwks.json. Any number of replicas can do that independently.
+The catch is that a naive verifier fetches that document while a request
+waits. This module keeps it off the request path:
+
+  background refresh   the key set is re-fetched every `refresh_every`
+                       seconds, so keys the authorization server publishes
+                       ahead of use are already here when the first token
+                       signed with them arrives
+  single-flight        a token with an unknown kid triggers ONE fetch, which
+                       every concurrent request for that kid waits on
+  rate limit           unknown kids force a fetch at most once per
+                       `min_fetch_interval`, so a flood of made-up kids cannot
+                       turn into a flood of requests to the authorization
+                       server
+  stale on error       a failed fetch keeps the keys we already have
+
+JWKSVerifier plugs the cache into CachingJWTVerifier. It accepts RS256,
+ES256, EdDSA and Ed25519 (RFC 9864's fully-specified name for EdDSA over
+Ed25519), chosen per key: a token's "alg" header must equal the "alg" its
+key was published with, so an attacker cannot pick the algorithm.
+It ships complete so secure_server.py can stay focused on the protocol.
+"""
+
+import asyncio
+import logging
+import time
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+from joserfc import jwk, jwt
+from joserfc.errors import JoseError
+from joserfc.jws import JWSRegistry
+
+from fastmcp.server.auth import AccessToken
+from fastmcp.utilities.auth import decode_jwt_header
+
+from token_cache import CachingJWTVerifier
+
+ALGORITHMS = ("RS256", "ES256", "EdDSA", "Ed25519")
+log = logging.getLogger(__name__)
+
+
+class JWKSCache:
+    """kid -> public key, fetched from `uri` and kept fresh in the background.
+
+    Use as `async with cache:` around the server's lifetime to run the
+    refresh loop; `key(kid)` is what verifiers call.
+    """
+
+    def __init__(self, uri: str, *, refresh_every: float = 300.0,
+                 min_fetch_interval: float = 10.0, timeout: float = 5.0,
+                 algorithms: tuple[str, ...] = ALGORITHMS):
+        self.uri = uri
+        self.refresh_every = refresh_every
+        self.min_fetch_interval = min_fetch_interval
+        self.timeout = timeout
+        self.algorithms = algorithms
+        self.keys: dict[str, jwk.Key] = {}
+        self.fetched_at = 0.0
+        self.forced_at = -min_fetch_interval
+        self.stats = {"fetches": 0, "fetch_errors": 0, "unknown_kid": 0, "waited": 0}
+        self._inflight: asyncio.Task | None = None
+        self._refresher: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "JWKSCache":
+        await self.refresh()        # warm before the first request, if we can
+        self._refresher = asyncio.create_task(self._refresh_loop())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._refresher.cancel()
+
+    async def key(self, kid: str | None) -> jwk.Key | None:
+        """The key for `kid`. Only an unknown kid can wait on the network."""
+        if kid in self.keys:
+            return self.keys[kid]
+        self.stats["unknown_kid"] += 1
+        if self._inflight is not None:
+            await self.refresh()
+        elif time.monotonic() - self.forced_at >= self.min_fetch_interval:
+            self.forced_at = time.monotonic()
+            await self.refresh()
+        return self.keys.get(kid)
+
+    async def refresh(self) -> None:
+        """Fetch the key set; callers arriving mid-fetch share that fetch."""
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(lambda _: setattr(self, "_inflight", None))
+        else:
+            self.stats["waited"] += 1
+        await asyncio.shield(self._inflight)
+
+    def load(self, document: dict) -> None:
+        """Replace the key set with the usable keys in a JWKS document.
+
+        A document that is not a JWKS at all raises ValueError and leaves the
+        current key set alone.
+        """
+        if not isinstance(document, dict) or not isinstance(document.get("keys", []), list):
+            raise ValueError("not a JWKS document: expected an object with a \"keys\" array")
+        keys = {}
+        for data in document.get("keys", []):
+            if not isinstance(data, dict):
+                continue            # not a JWK
+            if data.get("alg") not in self.algorithms or not data.get("kid"):
+                continue            # symmetric, unlabelled or unsupported: never used
+            try:
+                keys[data["kid"]] = jwk.import_key(data)
+            except (JoseError, ValueError, TypeError) as exc:
+                log.warning("skipping JWKS key %r: %s", data.get("kid"), exc)
+        self.keys = keys
+
+    async def _fetch(self) -> None:
+        self.fetched_at = time.monotonic()
+        self.stats["fetches"] += 1
+        try:
+            async with ClientSession(timeout=ClientTimeout(total=self.timeout)) as http:
+                async with http.get(self.uri, raise_for_status=True) as r:
+                    self.load(await r.json())
+        except (ClientError, asyncio.TimeoutError, ValueError) as exc:
+            self.stats["fetch_errors"] += 1
+            log.warning("JWKS fetch from %s failed, keeping %d cached keys: %s",
+                        self.uri, len(self.keys), exc)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_every)
+            await self.refresh()
+
+    def metrics(self) -> dict:
+        return dict(self.stats, kids=sorted(self.keys),
+                    age=round(time.monotonic() - self.fetched_at, 1))
+
+
+class JWKSVerifier(CachingJWTVerifier):
+    """CachingJWTVerifier whose keys come from a JWKSCache, selected by kid.
+
+    Takes every CachingJWTVerifier argument except the key settings. Issuer,
+    audience, expiry and scopes are checked as before; a verified token is
+    cached the same way.
+    """
+
+    def __init__(self, jwks: JWKSCache, **kwargs):
+        # JWTVerifier insists on a key source; ours is `jwks`, not its own fetcher.
+        super().__init__(jwks_uri=jwks.uri, algorithm="RS256", **kwargs)
+        self.jwks = jwks
+
+    async def _verify(self, token: str) -> AccessToken | None:
+        try:
+            header = decode_jwt_header(token)
+            key = await self.jwks.key(header.get("kid"))
+            alg = header.get("alg")
+            if key is None or alg != key.get("alg"):
+                return None
+            claims = jwt.decode(token, key, algorithms=[alg],
+                                registry=JWSRegistry(algorithms=[alg])).claims
+            jwt.JWTClaimsRegistry(
+                iss={"essential": True, "value": self.issuer},
+                aud={"essential": True, "value": self.audience},
+                exp={"essential": True},
+            ).validate(claims)
+        except (JoseError, ValueError, TypeError, KeyError):
+            return None
+        scopes = self._extract_scopes(claims)
+        if not set(self.required_scopes or ()).issubset(scopes):
+            return None
+        return AccessToken(token=token, client_id=str(claims.get("client_id") or claims.get("sub")),
+                           scopes=scopes, expires_at=int(claims["exp"]),
+                           subject=claims.get("sub"), claims=claims)
@@ -0,0 +1,75 @@
+"""
+metrics.py - just enough of Prometheus for auth_server.py's /metrics.
+
+Counters and histograms, rendered in the Prometheus text exposition format
+(version 0.0.4), so any Prometheus or compatible scraper can collect them.
+There is no client library to install: the format is a few lines of text.
+It ships complete so auth_server.py can stay focused on the protocol.
+
+Values live in the process that recorded them. When auth_server.py runs
+several uvicorn workers, a scrape sees whichever worker answered it; every
+series carries a `pid` label so they are never confused with each other.
+"""
+
+import bisect
+import os
+import threading
+
+PID = str(os.getpid())
+
+
+def _labels(pairs: dict[str, str]) -> str:
+    pairs = dict(pairs, pid=PID)
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(pairs.items())) + "}"
+
+
+class Counter:
+    """A monotonically increasing count, optionally split by one label."""
+
+    def __init__(self, name: str, help: str, label: str | None = None):
+        self.name, self.help, self.label = name, help, label
+        self.values: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: str = "", amount: float = 1.0) -> None:
+        with self._lock:
+            self.values[value] = self.values.get(value, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for value, count in sorted(self.values.items()):
+            labels = _labels({self.label: value} if self.label else {})
+            lines.append(f"{self.name}{labels} {count:g}")
+        return lines
+
+
+class Histogram:
+    """Observations counted into cumulative `le` buckets, plus sum and count."""
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...]):
+        self.name, self.help = name, help
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)      # the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.sum += seconds
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        running = 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running += count
+            lines.append(f"{self.name}_bucket{_labels({'le': bound})} {running}")
+        lines.append(f"{self.name}_sum{_labels({})} {total:.6f}")
+        lines.append(f"{self.name}_count{_labels({})} {running}")
+        return lines
+
+
+def render(*metrics) -> str:
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
@@ -6,6 +6,9 @@
 #   3. Read the authorization server metadata (RFC 8414)
 #   4. Get a token, binding it to this resource with the RFC 8707 `resource` param
 #   5. Call the tool with the token
+#   6. Do it again the way a long-running agent should: token_manager.py walks
+#      steps 1-4 once, caches the result and refreshes the token before it
+#      expires, so repeated calls cost no auth round trips at all.
 #
 # In production you would let FastMCP's built-in OAuth client handle all of this
 # (Client(url, auth="oauth")). We do it by hand here so you can see each hop.
@@ -17,6 +20,8 @@ import httpx
 
 from fastmcp import Client
 
+from token_manager import TokenManager
+
 MCP_ENDPOINT = "http://127.0.0.1:8000/mcp"   # canonical: no trailing slash
 
 
@@ -105,6 +110,15 @@ async def main() -> None:
             # FastMCP 4 returns a CallToolResult, not a bare list.
             print("    7 + 5 =", result.data)
 
+    # --- Step 6: the same chain, behind a reusable token manager -------------
+    # Any number of calls, concurrent or not: one discovery, one token.
+    manager = TokenManager("demo-client", "demopass", scope="calc:add")
+    async with Client(MCP_ENDPOINT, auth=manager) as c:
+        results = await asyncio.gather(*(c.call_tool("add", {"a": i, "b": i}) for i in range(20)))
+        print(f"\n[6] 20 calls through TokenManager -> {[r.data for r in results][:5]} ...")
+        stats = manager.metrics()
+        print(f"    discoveries = {stats['discoveries']}, token requests = {stats['token_requests']}")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
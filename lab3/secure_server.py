@@ -13,17 +13,31 @@
 #     minted for someone else is the "confused deputy" the spec warns about.
 #   * There is no session to protect anymore - 2026-07-28 removed Mcp-Session-Id,
 #     so every request is authorized on its own, from its own Authorization header.
+#
+# Verifying on every request is the rule, but re-doing the same crypto for
+# the same token thousands of times a minute is waste. token_cache.py keeps
+# the result per token (see step 2).
+#
+# There is no shared secret: tokens are signed with the authorization
+# server's private key and verified with the public keys it publishes as a
+# JWKS. jwks_cache.py keeps those keys in memory and fresh in the
+# background, so verifying never waits on the network for a known key.
+
+from contextlib import asynccontextmanager
 
 import uvicorn
 from pydantic import AnyHttpUrl
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 from fastmcp import FastMCP
-from fastmcp.server.auth import JWTVerifier, RemoteAuthProvider
+from fastmcp.server.auth import RemoteAuthProvider
+
+from jwks_cache import JWKSCache, JWKSVerifier
 
 # --- Must match auth_server.py -------------------------------------------
-SECRET_KEY = "mcp-lab-secret"
-ALGORITHM = "HS256"
 ISSUER = "http://127.0.0.1:9000"
+JWKS_URI = f"{ISSUER}/.well-known/jwks.json"
 
 # 1) Our canonical resource URI (RFC 8707). Tokens MUST carry this as their
 #    audience. Canonical form: lowercase scheme/host, no trailing slash,
@@ -35,12 +49,19 @@ BASE_URL = "http://127.0.0.1:8000"
 # 2) The token verifier. `audience` is what enforces RFC 8707: a token whose
 #    "aud" claim is not our resource URI is rejected, even if it is otherwise
 #    perfectly valid and signed by a server we trust.
-verifier = JWTVerifier(
-    public_key=SECRET_KEY,          # HS256 shared secret (lab only)
-    algorithm=ALGORITHM,
+#    The signature is checked against the published key named by the token's
+#    "kid"; the token's "alg" must be the one that key was published with.
+#    Verified tokens go into an LRU, each kept until min(exp, cache_ttl). A
+#    cache hit skips the crypto, never the rules: a token only gets in by
+#    passing them once.
+jwks = JWKSCache(JWKS_URI, refresh_every=300, min_fetch_interval=10)
+verifier = JWKSVerifier(
+    jwks,
     issuer=ISSUER,
     audience=RESOURCE,
     required_scopes=["calc:add"],
+    cache_size=10_000,
+    cache_ttl=300,
 )
 
 # 3) RemoteAuthProvider publishes RFC 9728 Protected Resource Metadata at
@@ -54,7 +75,15 @@ auth = RemoteAuthProvider(
     resource_name="MCP Lab Secure Calculator",
 )
 
-mcp = FastMCP("Secure Calc", auth=auth)
+
+@asynccontextmanager
+async def lifespan(server):
+    # Fetch the keys once before serving, then keep them fresh in the background.
+    async with jwks:
+        yield {}
+
+
+mcp = FastMCP("Secure Calc", auth=auth, lifespan=lifespan)
 
 
 # 4) The tool itself is unremarkable. That is the point: authorization is a
@@ -65,8 +94,33 @@ def add(a: int, b: int) -> int:
     return a + b
 
 
+# 5) Revocation has to beat the cache. Posting a token here puts it on the
+#    verifier's revoked list until it expires, so it is refused at once even
+#    though its signature is still valid. Knowing the token is the only
+#    credential needed - anyone holding it could spend it anyway. A token
+#    that does not verify (forged, expired, another issuer) is refused with
+#    400 and never stored, so junk cannot grow the list.
+@mcp.custom_route("/revoke", methods=["POST"])
+async def revoke(request: Request) -> JSONResponse:
+    form = await request.form()
+    token = form.get("token")
+    if not token or not isinstance(token, str):
+        return JSONResponse({"error": "invalid_request"}, status_code=400)
+    try:
+        if not await verifier.revoke(token):
+            return JSONResponse({"error": "invalid_token"}, status_code=400)
+    except OverflowError:
+        return JSONResponse({"error": "temporarily_unavailable"}, status_code=503)
+    return JSONResponse({"revoked": True})
+
+
+@mcp.custom_route("/auth/cache", methods=["GET"])
+async def cache_stats(request: Request) -> JSONResponse:
+    return JSONResponse(dict(verifier.metrics(), jwks=jwks.metrics()))
+
+
 if __name__ == "__main__":
-    # 5) http_app() builds the Starlette app including the well-known
+    # 6) http_app() builds the Starlette app including the well-known
     #    discovery routes contributed by the auth provider.
     app = mcp.http_app(path="/mcp")
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,92 @@
+# test_token_algs.py - the whole lab3 flow, once per signing algorithm.
+#
+# Starts auth_server.py with each TOKEN_ALG it supports and secure_server.py
+# in front of it, then does what a client does: discovery, a token bound to
+# the resource, a tool call. A verifier that cannot use the published keys
+# fails here with a 401 instead of in the lab. Then the token is revoked:
+# junk posted to /revoke is refused, the real token is refused from then on.
+#
+# Needs ports 8000 and 9000 free.
+# Usage:  python -m pytest test_token_algs.py     (or just: python test_token_algs.py)
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from aiohttp import ClientSession
+
+from fastmcp import Client
+
+from token_manager import TokenManager, resource_of
+
+HERE = Path(__file__).parent
+MCP_ENDPOINT = "http://127.0.0.1:8000/mcp"
+REVOKE = "http://127.0.0.1:8000/revoke"
+
+
+async def wait_for(url: str) -> None:
+    async with ClientSession() as s:
+        for _ in range(300):
+            try:
+                async with s.get(url):
+                    return
+            except OSError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} never came up")
+
+
+async def flow(alg: str) -> None:
+    env = dict(os.environ, TOKEN_ALG=alg)
+    auth = await asyncio.create_subprocess_exec(
+        sys.executable, str(HERE / "auth_server.py"), cwd=HERE, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+    secure = None
+    try:
+        await wait_for("http://127.0.0.1:9000/.well-known/jwks.json")
+        secure = await asyncio.create_subprocess_exec(
+            sys.executable, str(HERE / "secure_server.py"), cwd=HERE, env=env,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        await wait_for("http://127.0.0.1:8000/auth/cache")
+
+        manager = TokenManager("demo-client", "demopass")
+        async with Client(MCP_ENDPOINT, auth=manager) as client:
+            result = await client.call_tool("add", {"a": 2, "b": 3})
+        assert result.data == 5, result
+
+        async with ClientSession() as s:
+            async with s.get("http://127.0.0.1:8000/auth/cache") as r:
+                stats = await r.json()
+            assert stats["jwks"]["kids"], f"{alg}: no usable keys in {stats}"
+
+            token = await manager.token(resource_of(MCP_ENDPOINT))
+            async with s.post(REVOKE, data={"token": "not.a.token"}) as r:
+                assert r.status == 400, f"{alg}: junk revoked ({r.status})"
+            async with s.post(REVOKE, data={"token": token}) as r:
+                assert r.status == 200, f"{alg}: revoke failed ({r.status})"
+            async with s.post(MCP_ENDPOINT, json={}, headers={"Authorization": f"Bearer {token}"}) as r:
+                assert r.status == 401, f"{alg}: revoked token accepted ({r.status})"
+            async with s.get("http://127.0.0.1:8000/auth/cache") as r:
+                assert (await r.json())["revoked_cached"] == 1
+    finally:
+        for proc in filter(None, (secure, auth)):
+            proc.terminate()
+            await proc.wait()
+
+
+def test_rs256():
+    asyncio.run(flow("RS256"))
+
+
+def test_eddsa():
+    asyncio.run(flow("EdDSA"))
+
+
+def test_ed25519():
+    asyncio.run(flow("Ed25519"))
+
+
+if __name__ == "__main__":
+    for alg in ("RS256", "EdDSA", "Ed25519"):
+        asyncio.run(flow(alg))
+        print(f"{alg}: ok")
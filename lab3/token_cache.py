@@ -0,0 +1,147 @@
+"""
+token_cache.py - remember which bearer tokens secure_server.py has verified.
+
+Nothing in here changes WHAT is checked. Signature, issuer, audience, expiry
+and scopes are still verified by FastMCP's JWTVerifier, exactly as before.
+The cache remembers the RESULT of that work, so a client that sends the same
+token a thousand times a minute pays for one verification, not a thousand.
+It ships complete so secure_server.py can stay focused on the protocol.
+
+This does not make the server stateful in the spec's sense. Every request
+is still authorized from its own Authorization header. The cache is keyed by
+a hash of the exact token string, and an entry never outlives the token:
+it expires at min(exp, now + cache_ttl).
+
+Two negative caches sit in front of it:
+
+  rejected   tokens that just failed verification, for a few seconds, so a
+             client retrying a bad token cannot make us redo the crypto
+  revoked    tokens someone revoked (see `revoke`), until their own expiry.
+             A revoked token is refused even though its signature is valid.
+             Only a token that passes verification can be listed, so the
+             list holds real tokens, each until its verified exp - never
+             junk, never forever - and it is capped at `revoked_size`.
+"""
+
+import hashlib
+import heapq
+import time
+from collections import OrderedDict
+
+from fastmcp.server.auth import AccessToken, JWTVerifier
+
+
+def token_key(token: str) -> bytes:
+    """Cache key for a token. The raw token is never kept as a key."""
+    return hashlib.sha256(token.encode()).digest()
+
+
+class CachingJWTVerifier(JWTVerifier):
+    """JWTVerifier with a bounded LRU of verified tokens.
+
+    Takes every JWTVerifier argument, plus:
+
+      cache_size    how many verified tokens to remember (LRU beyond that)
+      cache_ttl     longest an entry lives, in seconds, even if exp is later
+      failure_ttl   how long a token that failed verification stays refused
+      revoked_size  most tokens the revoked list holds at once
+      revoke_ttl    how long a revoked token with no exp claim stays refused
+
+    FastMCP calls verifiers on the event loop, one request at a time, so the
+    dicts below need no lock.
+    """
+
+    def __init__(self, *, cache_size: int = 10_000, cache_ttl: float = 300.0,
+                 failure_ttl: float = 10.0, revoked_size: int = 100_000,
+                 revoke_ttl: float = 86_400.0, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.failure_ttl = failure_ttl
+        self.revoked_size = revoked_size
+        self.revoke_ttl = revoke_ttl
+        self.verified: OrderedDict[bytes, tuple[float, AccessToken]] = OrderedDict()
+        self.rejected: OrderedDict[bytes, float] = OrderedDict()
+        self.revoked: dict[bytes, float] = {}
+        self.revoked_expiry: list[tuple[float, bytes]] = []   # heap, soonest first
+        self.stats = {"hits": 0, "misses": 0, "rejected": 0, "revoked": 0}
+
+    async def load_access_token(self, token: str) -> AccessToken | None:
+        key, now = token_key(token), time.time()
+        if self._refused(key, now):
+            return None
+        entry = self.verified.get(key)
+        if entry is not None:
+            until, access = entry
+            if until > now:
+                self.verified.move_to_end(key)
+                self.stats["hits"] += 1
+                return access
+            del self.verified[key]
+        self.stats["misses"] += 1
+        access = await self._verify(token)
+        if access is None:
+            self._remember(self.rejected, key, now + self.failure_ttl)
+        else:
+            until = now + self.cache_ttl
+            if access.expires_at is not None:
+                until = min(until, access.expires_at)
+            self._remember(self.verified, key, (until, access))
+        return access
+
+    async def _verify(self, token: str) -> AccessToken | None:
+        """The full, uncached check. Subclasses change where keys come from."""
+        return await super().load_access_token(token)
+
+    def _refused(self, key: bytes, now: float) -> bool:
+        for cache, stat in ((self.revoked, "revoked"), (self.rejected, "rejected")):
+            until = cache.get(key)
+            if until is not None:
+                if until > now:
+                    self.stats[stat] += 1
+                    return True
+                del cache[key]
+        return False
+
+    def _remember(self, cache: OrderedDict, key: bytes, value) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    async def revoke(self, token: str) -> bool:
+        """The negative-cache hook: refuse `token` from now until it expires.
+
+        Call it from whatever learns about revocations - an admin endpoint, a
+        message from the authorization server. Returns False, listing
+        nothing, for a token that does not verify: one we would refuse anyway.
+        The revoked list is not an LRU, so cache pressure can never quietly
+        un-revoke a token; when it is full, OverflowError is raised instead.
+        """
+        key, now = token_key(token), time.time()
+        if self.revoked.get(key, 0) > now:
+            return True
+        access = await self.load_access_token(token)
+        if access is None:
+            return False
+        self._purge_revoked(now)
+        if len(self.revoked) >= self.revoked_size:
+            raise OverflowError(f"revoked list is full ({self.revoked_size} tokens)")
+        until = access.expires_at if access.expires_at is not None else now + self.revoke_ttl
+        self.verified.pop(key, None)
+        self.revoked[key] = until
+        heapq.heappush(self.revoked_expiry, (until, key))
+        return True
+
+    def _purge_revoked(self, now: float) -> None:
+        """Drop revoked tokens past their expiry - only those, soonest first."""
+        heap = self.revoked_expiry
+        while heap and heap[0][0] <= now:
+            until, key = heapq.heappop(heap)
+            if self.revoked.get(key) == until:
+                del self.revoked[key]
+
+    def metrics(self) -> dict:
+        return dict(self.stats, verified=len(self.verified), rejected_cached=len(self.rejected),
+                    revoked_cached=len(self.revoked), cache_size=self.cache_size,
+                    cache_ttl=self.cache_ttl)
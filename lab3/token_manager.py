@@ -0,0 +1,176 @@
+"""
+token_manager.py - secure_client.py's discovery chain, done once and kept.
+
+secure_client.py walks every hop by hand so you can see them: 401 probe,
+Protected Resource Metadata, authorization server metadata, token request.
+A long-running agent cannot pay those round trips - plus a failed call - each
+time a token expires. TokenManager does the same walk, then remembers:
+
+  discovery   per resource: where its token endpoint is, for `discovery_ttl`
+              seconds. Only a token request is needed after that.
+  tokens      per resource, refreshed BEFORE they expire. Once a token is
+              within `refresh_margin` of expiry, the next call starts a
+              refresh in the background and keeps using the still-valid
+              token. A call only waits when there is no valid token at all.
+  one flight  however many calls need a token at the same moment, one
+              request goes to the authorization server; the rest share it.
+
+It is an httpx2.Auth, so it plugs straight into FastMCP:
+
+    async with Client(MCP_ENDPOINT, auth=TokenManager("demo-client", "demopass")) as c:
+        ...
+
+In steady state a call adds no auth round trips at all - just a header. A
+401 anyway (token revoked, keys rotated) drops the token, fetches a fresh
+one and retries the request once.
+
+It ships complete so secure_client.py can stay focused on the protocol.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx2
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Held:
+    token: str
+    expires_at: float       # time.monotonic() clock
+    refresh_at: float
+
+
+def resource_of(url: httpx2.URL | str) -> str:
+    """The canonical resource URI a request URL belongs to (RFC 8707)."""
+    parts = urlsplit(str(url))
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+
+def challenge_param(challenge: str, name: str) -> str | None:
+    """One quoted parameter of a WWW-Authenticate challenge."""
+    match = re.search(rf'\b{name}="([^"]*)"', challenge)
+    return match.group(1) if match else None
+
+
+class TokenManager(httpx2.Auth):
+    """Client-credentials tokens for any number of MCP servers, cached."""
+
+    requires_request_body = True    # buffer the body so a 401 can be retried
+
+    def __init__(self, client_id: str, client_secret: str, *, scope: str | None = None,
+                 discovery_ttl: float = 3600.0, refresh_margin: float = 60.0,
+                 timeout: float = 10.0):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.discovery_ttl = discovery_ttl
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.discovered: dict[str, tuple[float, str]] = {}     # resource -> (until, token endpoint)
+        self.tokens: dict[str, _Held] = {}
+        self.stats = {"calls": 0, "discoveries": 0, "token_requests": 0,
+                      "background_refreshes": 0, "waited": 0, "retried_401": 0}
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    async def async_auth_flow(self, request: httpx2.Request):
+        resource = resource_of(request.url)
+        self.stats["calls"] += 1
+        sent = await self.token(resource)
+        request.headers["Authorization"] = f"Bearer {sent}"
+        response = yield request
+        if response.status_code == 401:
+            self.stats["retried_401"] += 1
+            held = self.tokens.get(resource)
+            if held is not None and held.token == sent:    # not already replaced
+                del self.tokens[resource]
+            request.headers["Authorization"] = f"Bearer {await self.token(resource)}"
+            yield request
+
+    def sync_auth_flow(self, request):
+        raise RuntimeError("TokenManager is async-only; use it with an async client")
+
+    async def token(self, resource: str) -> str:
+        """A valid access token for `resource`, fetching one only if we must."""
+        held, now = self.tokens.get(resource), time.monotonic()
+        if held is not None and now < held.expires_at:
+            if now >= held.refresh_at and resource not in self._refreshing:
+                self.stats["background_refreshes"] += 1
+                self._refresh(resource)
+            return held.token
+        return await asyncio.shield(self._refresh(resource))
+
+    def _refresh(self, resource: str) -> asyncio.Task:
+        task = self._refreshing.get(resource)
+        if task is not None:
+            self.stats["waited"] += 1
+            return task
+        task = asyncio.create_task(self._fetch_token(resource))
+        self._refreshing[resource] = task
+
+        def done(finished: asyncio.Task) -> None:
+            self._refreshing.pop(resource, None)
+            if not finished.cancelled() and finished.exception() is not None:
+                log.warning("token refresh for %s failed: %s", resource, finished.exception())
+
+        task.add_done_callback(done)
+        return task
+
+    async def _fetch_token(self, resource: str) -> str:
+        async with httpx2.AsyncClient(timeout=self.timeout) as http:
+            endpoint = await self._token_endpoint(http, resource)
+            form = {"grant_type": "client_credentials", "client_id": self.client_id,
+                    "client_secret": self.client_secret}
+            if self.scope:
+                form["scope"] = self.scope
+            started = time.monotonic()
+            self.stats["token_requests"] += 1
+            # RFC 8707: bind the token to this resource and nothing else.
+            response = await http.post(endpoint, params={"resource": resource}, data=form)
+            response.raise_for_status()
+        body = response.json()
+        lifetime = float(body.get("expires_in", 3600))
+        margin = min(self.refresh_margin, lifetime / 2)
+        self.tokens[resource] = _Held(body["access_token"], started + lifetime,
+                                      started + lifetime - margin)
+        return body["access_token"]
+
+    async def _token_endpoint(self, http: httpx2.AsyncClient, resource: str) -> str:
+        cached = self.discovered.get(resource)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        self.stats["discoveries"] += 1
+        prm = await self._resource_metadata(http, resource)
+        if resource_of(prm["resource"]) != resource:
+            raise ValueError(f"metadata is for {prm['resource']}, not {resource}")
+        issuer = str(prm["authorization_servers"][0]).rstrip("/")
+        response = await http.get(f"{issuer}/.well-known/oauth-authorization-server")
+        response.raise_for_status()
+        meta = response.json()
+        if meta["issuer"].rstrip("/") != issuer:
+            raise ValueError("Issuer mismatch - possible mix-up attack")
+        self.discovered[resource] = (time.monotonic() + self.discovery_ttl, meta["token_endpoint"])
+        return meta["token_endpoint"]
+
+    async def _resource_metadata(self, http: httpx2.AsyncClient, resource: str) -> dict:
+        # RFC 9728 puts the document at a well-known URL derived from the
+        # resource, so try that first and skip the 401 probe when it works.
+        parts = urlsplit(resource)
+        response = await http.get(
+            f"{parts.scheme}://{parts.netloc}/.well-known/oauth-protected-resource{parts.path}")
+        if response.status_code != 200:
+            probe = await http.post(resource, json={})
+            url = challenge_param(probe.headers.get("www-authenticate", ""), "resource_metadata")
+            if url is None:
+                raise ValueError(f"{resource} named no resource_metadata in its challenge")
+            response = await http.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def metrics(self) -> dict:
+        return dict(self.stats, resources=len(self.tokens))
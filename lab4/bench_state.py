@@ -0,0 +1,95 @@
+# bench_state.py - what requestState costs per MRTR round, by size.
+#
+# For tool context of roughly 1, 10 and 100 KB of JSON, times each step one
+# round trip pays, with and without state_codec.py:
+#
+#   encode   tool context -> requestState string   (json.dumps vs encode_state)
+#   seal     the framework wraps it in its claims envelope and encrypts it
+#            (RequestStateSecurity's AES-256-GCM codec, the one the servers use)
+#   unseal   verify + decrypt the echoed token, parse the envelope
+#   decode   requestState string -> tool context    (json.loads vs decode_state)
+#
+# and the size of the sealed token - the bytes the client uploads again on
+# every retry. The context is itinerary-like records: repeated keys, some
+# free text, some random ids - compressible, but not trivially.
+#
+# Usage:  python bench_state.py [--sizes 1 10 100] [--rounds 2000]
+
+import argparse
+import json
+import os
+import random
+import time
+
+from mcp.server.request_state import AESGCMRequestStateCodec
+
+from state_codec import decode_state, encode_state, zstandard
+
+parser = argparse.ArgumentParser(description="requestState cost per round.")
+parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="KB of JSON")
+parser.add_argument("--rounds", type=int, default=2000)
+parser.add_argument("--seed", type=int, default=7)
+args = parser.parse_args()
+
+CYAN, GREEN, RESET = "\033[96m", "\033[92m", "\033[0m"
+rng = random.Random(args.seed)
+CITIES = ["paris", "tokyo", "london", "lisbon", "osaka", "boston", "lima", "oslo"]
+WORDS = "window aisle vegetarian late arrival lounge upgrade baggage connection".split()
+codec = AESGCMRequestStateCodec([os.urandom(32)])
+
+
+def context(kb: int) -> dict:
+    legs = []
+    while len(json.dumps(legs)) < kb * 1024:
+        legs.append({"id": f"{rng.getrandbits(48):012x}", "from": rng.choice(CITIES),
+                     "to": rng.choice(CITIES), "flight": f"AF{rng.randint(1, 999):03d}",
+                     "price": round(rng.uniform(80, 900), 2),
+                     "note": " ".join(rng.choices(WORDS, k=rng.randint(3, 8)))})
+    return {"dest": "paris", "offered": ["AF017 08:15", "DL262 17:40"], "legs": legs}
+
+
+def seal(state: str) -> str:
+    # The framework's envelope around the tool's string, then AES-256-GCM.
+    now = time.time()
+    envelope = {"v": 1, "iat": now, "exp": now + 600, "m": "tools/call", "t": "book_trip",
+                "a": "x" * 22, "s": state, "aud": "TripBooker"}
+    return codec.seal(json.dumps(envelope, separators=(",", ":")).encode())
+
+
+def unseal(token: str) -> str:
+    return json.loads(codec.unseal(token))["s"]
+
+
+def per_round(fn, value, rounds: int) -> tuple[float, object]:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        out = fn(value)
+    return (time.perf_counter() - started) / rounds * 1e6, out
+
+
+def main() -> None:
+    print(f"{CYAN}{args.rounds} rounds per step, compression: "
+          f"{'zstd' if zstandard else 'zlib'}{RESET}")
+    print(f"{'size':>6} {'codec':8} {'encode':>9} {'seal':>9} {'unseal':>9} "
+          f"{'decode':>9} {'total':>9}   {'sealed token':>13}")
+    for kb in args.sizes:
+        value = context(kb)
+        rounds = max(50, args.rounds // kb)
+        totals = {}
+        for name, enc, dec in (("json", lambda v: json.dumps(v, separators=(",", ":")), json.loads),
+                               ("compact", encode_state, decode_state)):
+            t_enc, state = per_round(enc, value, rounds)
+            t_seal, token = per_round(seal, state, rounds)
+            t_unseal, echoed = per_round(unseal, token, rounds)
+            t_dec, back = per_round(dec, echoed, rounds)
+            assert back == value
+            totals[name] = (t_enc + t_seal + t_unseal + t_dec, len(token))
+            print(f"{kb:>4}KB {name:8} {t_enc:8.1f}µ {t_seal:8.1f}µ {t_unseal:8.1f}µ "
+                  f"{t_dec:8.1f}µ {totals[name][0]:8.1f}µ   {len(token):>11,} B")
+        (t_json, b_json), (t_compact, b_compact) = totals["json"], totals["compact"]
+        print(f"       {GREEN}compact: {b_json / b_compact:.1f}x smaller on the wire, "
+              f"{t_json / t_compact:.2f}x the speed per round{RESET}")
+
+
+if __name__ == "__main__":
+    main()
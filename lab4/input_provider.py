@@ -0,0 +1,117 @@
+"""
+input_provider.py - answers for trip_client.py's elicitation handler,
+without ever blocking the event loop.
+
+Calling input() inside an async handler freezes the whole client while a
+human types: every other in-flight call, every keep-alive, waits with it.
+And FastMCP asks for all of a round's inputs at once - concurrently - so a
+handler that blocks turns that back into one-at-a-time.
+
+Two providers, one interface - `await provider.ask(message, field, options)`
+returns the answer as text, or None to decline:
+
+  TerminalInput   a human at the keyboard. One background thread reads
+                  stdin into a queue; questions take turns at the terminal
+                  (a keyboard can only answer one at a time) while the event
+                  loop keeps running everything else.
+  ScriptedInput   a fixed answer per field, returned immediately - for tests,
+                  demos and load generators that drive many calls at once.
+
+make_handler(provider) turns either one into an elicitation_handler:
+
+    Client(URL, elicitation_handler=make_handler(TerminalInput()))
+
+It ships complete so trip_client.py can stay focused on the protocol.
+"""
+
+import asyncio
+import sys
+import threading
+from typing import Protocol
+
+from fastmcp.client.elicitation import ElicitResult
+
+
+class InputProvider(Protocol):
+    async def ask(self, message: str, field: str, options: list[str] | None) -> str | None:
+        """The answer for `field`, as typed. None declines."""
+        ...
+
+
+class TerminalInput:
+    """Questions answered at the terminal, one at a time, never blocking the loop."""
+
+    def __init__(self, stream=sys.stdin):
+        self.stream = stream
+        self._lines: asyncio.Queue[str | None] | None = None
+        self._turn = asyncio.Lock()
+
+    def _start(self) -> asyncio.Queue:
+        if self._lines is None:
+            loop, lines = asyncio.get_running_loop(), asyncio.Queue()
+
+            def read() -> None:             # the only code that touches stdin
+                for line in self.stream:
+                    loop.call_soon_threadsafe(lines.put_nowait, line.rstrip("\n"))
+                loop.call_soon_threadsafe(lines.put_nowait, None)      # EOF
+
+            threading.Thread(target=read, name="stdin-reader", daemon=True).start()
+            self._lines = lines
+        return self._lines
+
+    async def ask(self, message: str, field: str, options: list[str] | None) -> str | None:
+        lines = self._start()
+        async with self._turn:
+            print(f"\n  [server is asking] {message}")
+            if options:
+                for i, opt in enumerate(options, 1):
+                    print(f"    {i}. {opt}")
+            print("  Choose a number: " if options else f"  {field}: ", end="", flush=True)
+            line = await lines.get()
+        if line is None:                    # stdin closed: nobody left to answer
+            lines.put_nowait(None)
+            return None
+        return line.strip()
+
+
+class ScriptedInput:
+    """The same answer every time a field is asked for. Missing fields decline."""
+
+    def __init__(self, answers: dict[str, str]):
+        self.answers = answers
+        self.asked = 0
+
+    async def ask(self, message: str, field: str, options: list[str] | None) -> str | None:
+        self.asked += 1
+        return self.answers.get(field)
+
+
+def make_handler(provider: InputProvider):
+    """An elicitation_handler that asks `provider` for each input."""
+
+    async def elicitation_handler(message, response_type, params, context):
+        schema = getattr(params, "requested_schema", None) or {}
+        props = schema.get("properties", {})
+        field = next(iter(props), None)
+        if field is None:
+            return {}
+
+        options = props[field].get("enum")
+        answer = await provider.ask(message, field, options)
+        if answer is None:
+            return ElicitResult(action="decline")
+        if options:
+            # A number picks from the list; the option itself is fine too.
+            if answer in options:
+                return {field: answer}
+            try:
+                index = int(answer) - 1
+                if index < 0:
+                    raise IndexError(index)
+                return {field: options[index]}
+            except (ValueError, IndexError):
+                print("  Invalid choice - declining.")
+                return ElicitResult(action="decline")
+        return {field: answer}
+
+    return elicitation_handler
@@ -0,0 +1,129 @@
+"""
+state_codec.py - pack a tool's MRTR context into a small requestState.
+
+Everything a tool needs on the retry rides in requestState, and the client
+echoes it back on EVERY round. So its size is paid twice per round trip,
+plus the framework's sealing work over all of it. This module turns a
+JSON-able value into the shortest string that still round-trips:
+
+    state = encode_state({"dest": "paris", "offered": [...]})
+    ...
+    context = decode_state(ctx.request_state)
+
+Integrity is NOT this module's job. FastMCP seals whatever string the tool
+returns (RequestStateSecurity: encrypted and authenticated) and hands the
+tool back only plaintext it minted itself. This module is about size.
+
+Layout, before base64url:
+
+    byte  0      format version (1)
+    byte  1      compression: 0 none, 1 zlib, 2 zstd
+    bytes 2-5    length of the JSON once decompressed, uint32 big-endian
+    bytes 6-     compact UTF-8 JSON, compressed as byte 1 says
+
+Values whose JSON is shorter than `compress_above` bytes are stored as-is -
+compressing a few hundred bytes costs more than it saves. Larger ones use
+zstd when it is installed (`pip install zstandard`), else zlib, and keep the
+result only if it is actually smaller.
+
+`max_bytes` caps the decompressed JSON, in both directions: encode refuses
+to build oversized state, and decode checks the declared length before
+inflating anything, then inflates at most that much - a corrupted or hostile
+blob cannot expand into a memory problem.
+
+One caution: compressing secrets together with user-supplied text can leak
+hints about the secrets through the compressed size. Keep secrets out of
+requestState - it is for context, not credentials.
+"""
+
+import base64
+import json
+import struct
+import zlib
+from typing import Any
+
+try:
+    import zstandard
+except ImportError:                 # optional: zlib is always available
+    zstandard = None
+
+VERSION = 1
+RAW, ZLIB, ZSTD = 0, 1, 2
+COMPRESS_ABOVE = 512                # bytes of JSON
+MAX_STATE = 128 * 1024              # bytes of JSON, after decompression
+_HEADER = struct.Struct(">BBI")
+
+
+class StateTooLarge(ValueError):
+    """The state is over the size cap."""
+
+
+class BadState(ValueError):
+    """The string is not state this codec produced."""
+
+
+def _compress(data: bytes) -> tuple[int, bytes]:
+    if zstandard is not None:
+        return ZSTD, zstandard.ZstdCompressor(level=3).compress(data)
+    return ZLIB, zlib.compress(data, 3)     # past 3, bytes saved cost too much CPU
+
+
+def _decompress(method: int, body: bytes, size: int) -> bytes:
+    if method == RAW:
+        return body
+    if method == ZLIB:
+        inflater = zlib.decompressobj()
+        data = inflater.decompress(body, size + 1)     # never more than promised
+        if not inflater.eof:
+            raise BadState("zlib stream longer than its declared size")
+        return data
+    if method == ZSTD:
+        if zstandard is None:
+            raise BadState("zstd state but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(body, max_output_size=size)
+    raise BadState(f"unknown compression {method}")
+
+
+def encode_state(value: Any, *, compress_above: int = COMPRESS_ABOVE,
+                 max_bytes: int = MAX_STATE) -> str:
+    """`value` as a compact requestState string. None encodes to ""."""
+    if value is None:
+        return ""
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    if len(data) > max_bytes:
+        raise StateTooLarge(f"state is {len(data)} bytes, the cap is {max_bytes}")
+    method, body = RAW, data
+    if len(data) >= compress_above:
+        packed_method, packed = _compress(data)
+        if len(packed) < len(data):
+            method, body = packed_method, packed
+    blob = _HEADER.pack(VERSION, method, len(data)) + body
+    return base64.urlsafe_b64encode(blob).rstrip(b"=").decode()
+
+
+def decode_state(text: str, *, max_bytes: int = MAX_STATE) -> Any:
+    """Reverse `encode_state`. "" decodes to None."""
+    if not text:
+        return None
+    try:
+        blob = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+    except ValueError as exc:
+        raise BadState("not base64url") from exc
+    if len(blob) < _HEADER.size:
+        raise BadState("truncated")
+    version, method, size = _HEADER.unpack_from(blob)
+    if version != VERSION:
+        raise BadState(f"unknown state version {version}")
+    if size > max_bytes:
+        raise StateTooLarge(f"state declares {size} bytes, the cap is {max_bytes}")
+    try:
+        data = _decompress(method, blob[_HEADER.size:], size)
+    except zlib.error as exc:
+        raise BadState("corrupt zlib stream") from exc
+    except BadState:
+        raise
+    except Exception as exc:                         # zstandard's own error types
+        raise BadState("corrupt zstd stream") from exc
+    if len(data) != size:
+        raise BadState("length does not match the header")
+    return json.loads(data)
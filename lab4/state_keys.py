@@ -0,0 +1,61 @@
+"""
+state_keys.py - the requestState key ring, read from the environment.
+
+RequestStateSecurity(keys=[...]) takes a RING, not a key: keys[0] seals,
+every key unseals. Each sealed token carries a short fingerprint of the key
+that sealed it, and the codec builds one cipher context per key up front - so
+unsealing is a dictionary lookup plus one decryption, never "try each key in
+turn". A ring of five costs a retry exactly what a ring of one does.
+
+    REQUEST_STATE_KEYS="new-secret,old-secret"    # first one seals
+
+Rotating a fleet without dropping a single in-flight retry is three rollouts,
+each finished on every replica before the next begins:
+
+    1.  old,new     new is accepted everywhere, nothing seals with it yet
+    2.  new,old     new seals; state sealed under old still verifies
+    3.  new         once the state TTL (600 s by default) has passed
+
+Skip step 1 and a retry sealed by an updated replica can land on one that
+has never heard of the new key. A single REQUEST_STATE_KEY still works - it is
+a ring of one.
+
+It ships complete so trip_server.py can stay focused on the protocol.
+"""
+
+import hashlib
+import os
+
+LAB_DEFAULT = "lab-demo-key-not-for-production!!"
+MIN_KEY = 32                        # bytes, what RequestStateSecurity demands
+
+
+def state_keys(environ=os.environ) -> list[bytes]:
+    """The ring, sealing key first. Falls back to the shared lab key."""
+    if environ.get("REQUEST_STATE_KEYS"):
+        ring = [k.strip() for k in environ["REQUEST_STATE_KEYS"].split(",") if k.strip()]
+    else:
+        ring = [environ.get("REQUEST_STATE_KEY", LAB_DEFAULT)]
+    keys = [k.encode() for k in ring]
+    for i, key in enumerate(keys):
+        if len(key) < MIN_KEY:
+            raise ValueError(f"REQUEST_STATE_KEYS entry {i} is {len(key)} bytes; "
+                             f"need {MIN_KEY}+ (python -c \"import secrets; print(secrets.token_hex(32))\")")
+    if len(set(keys)) != len(keys):
+        raise ValueError("REQUEST_STATE_KEYS lists the same key twice")
+    return keys
+
+
+def fingerprint(key: bytes) -> str:
+    """A short, non-secret name for a key - compare it across replicas."""
+    return hashlib.sha256(b"lab/request-state-key:" + key).hexdigest()[:8]
+
+
+def describe(keys: list[bytes]) -> str:
+    """'seals a1b2c3d4, also accepts 9f8e7d6c' - for startup banners."""
+    text = f"seals {fingerprint(keys[0])}"
+    if keys[1:]:
+        text += f", also accepts {', '.join(fingerprint(k) for k in keys[1:])}"
+    if keys == [LAB_DEFAULT.encode()]:
+        text += " (shared lab default)"
+    return text
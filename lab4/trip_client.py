@@ -8,49 +8,49 @@
 #
 # The same handler also answers server-pushed elicitations on legacy
 # connections, so one handler covers both protocol eras.
+#
+# The handler must not block. Reading the terminal with input() inside an
+# async function would freeze the event loop - and with it every other call
+# in flight - while a human types. input_provider.py reads stdin on a
+# background thread instead, and FastMCP asks for all of a round's inputs
+# concurrently, so one client can drive many MRTR calls at once:
+#
+#   python trip_client.py                 # you answer at the keyboard
+#   python trip_client.py --parallel 20   # 20 bookings at once, scripted answers
 
+import argparse
 import asyncio
+import time
 
 from fastmcp import Client
-from fastmcp.client.elicitation import ElicitResult
-
-SERVER_URL = "http://127.0.0.1:8000/mcp"
-
 
-async def elicitation_handler(message, response_type, params, context):
-    """Called once for each input the server asks for.
+from input_provider import ScriptedInput, TerminalInput, make_handler
 
-    In a real host this is where you would render UI and wait for the user.
-    Here we read from the terminal so you can watch the round trips happen.
-
-    Return a dict to accept, or ElicitResult(action="decline") to refuse.
-    The spec requires servers to handle a refusal gracefully - a user is
-    always allowed to say no.
-    """
-    print(f"\n  [server is asking] {message}")
-
-    schema = getattr(params, "requested_schema", None) or {}
-    props = schema.get("properties", {})
-    field = next(iter(props), None)
-    if field is None:
-        return {}
-
-    options = props[field].get("enum")
-    if options:
-        for i, opt in enumerate(options, 1):
-            print(f"    {i}. {opt}")
-        raw = input("  Choose a number: ").strip()
-        try:
-            return {field: options[int(raw) - 1]}
-        except (ValueError, IndexError):
-            print("  Invalid choice - declining.")
-            return ElicitResult(action="decline")
+SERVER_URL = "http://127.0.0.1:8000/mcp"
 
-    return {field: input(f"  {field}: ").strip()}
 
+async def main(parallel: int):
+    if parallel:
+        # No human in the loop: every traveler is Ada, every flight the first.
+        answers = ScriptedInput({"name": "Ada", "choice": "1"})
+        async with Client(SERVER_URL, elicitation_handler=make_handler(answers)) as client:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(
+                client.call_tool("book_trip", {"destination": ["Paris", "Tokyo", "London"][i % 3]})
+                for i in range(parallel)))
+            elapsed = time.perf_counter() - started
+        for result in results:
+            print(" ", result.data or result.content[0].text)
+        print(f"\n{parallel} bookings, {answers.asked} inputs answered, in {elapsed:.2f}s "
+              "- all of them in flight together on one client.")
+        return
 
-async def main():
-    async with Client(SERVER_URL, elicitation_handler=elicitation_handler) as client:
+    # A real host renders UI here and waits for the user. We read the
+    # terminal so you can watch the round trips happen. An invalid choice
+    # declines - the spec requires servers to handle a refusal gracefully,
+    # because a user is always allowed to say no.
+    handler = make_handler(TerminalInput())
+    async with Client(SERVER_URL, elicitation_handler=handler) as client:
         print("Negotiated protocol version:", client.protocol_version)
         print("\nCalling book_trip('Paris')...")
         print("Watch the server log: you will see MORE THAN ONE POST for this")
@@ -62,4 +62,7 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Book a trip over MRTR.")
+    parser.add_argument("--parallel", type=int, default=0,
+                        help="book N trips at once with scripted answers")
+    asyncio.run(main(parser.parse_args().parallel))
@@ -22,24 +22,28 @@
 # requestState
 #   An opaque server-owned blob. The client MUST echo it back untouched and
 #   MUST NOT parse it. FastMCP integrity-protects it for you when you pass
-#   RequestStateSecurity with a signing key. Every replica must share that key,
-#   or a retry that lands on a different replica is rejected.
-
-import os
+#   RequestStateSecurity a key ring. Every replica must share the ring, or a
+#   retry that lands on a different replica is rejected. state_keys.py reads
+#   it from REQUEST_STATE_KEYS, so keys can rotate without breaking retries.
+#   The client echoes it on every round, so keep it small: state_codec.py packs
+#   the tool's context into a compact, compressed, size-capped string.
 
 from mcp.server.request_state import RequestStateSecurity
 from mcp_types import ElicitRequest, ElicitRequestFormParams, InputRequiredResult
 
 from fastmcp import Context, FastMCP
 
-# A real deployment reads this from a secret manager and shares it across all
-# replicas. 32+ bytes.
-SIGNING_KEY = os.getenv("REQUEST_STATE_KEY", "lab-demo-key-not-for-production!!").encode()
+from state_codec import decode_state, encode_state
+from state_keys import state_keys
+
+# A real deployment reads these from a secret manager and shares them across
+# all replicas. 32+ bytes each; the first one seals, all of them verify.
+SIGNING_KEYS = state_keys()
 
 server = FastMCP(
     "TripBooker",
     instructions="Books a trip, asking follow-up questions across round trips.",
-    request_state_security=RequestStateSecurity(keys=[SIGNING_KEY]),
+    request_state_security=RequestStateSecurity(keys=SIGNING_KEYS),
 )
 
 FLIGHTS = {
@@ -69,12 +73,13 @@ async def book_trip(destination: str, ctx: Context) -> str | InputRequiredResult
     #       and two input_requests keyed "traveler" and "flight":
     #         - "traveler": an ElicitRequest asking for a name (string)
     #         - "flight":   an ElicitRequest asking to pick one of FLIGHTS[dest]
-    #       Pass request_state=ctx.request_state or "".
+    #       Pass request_state=encode_state({"dest": dest, "offered": FLIGHTS[dest]}).
 
     # ---- Round 2: the client re-sent the call with the answers -----------
     # TODO: read answers["traveler"] and answers["flight"], check that each has
-    #       action == "accept" AND non-empty content (a user may decline), then
-    #       return the confirmation string.
+    #       action == "accept" AND non-empty content (a user may decline), check
+    #       the chosen flight is in decode_state(ctx.request_state)["offered"],
+    #       then return the confirmation string.
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+# bench_lb.py - compare replica_lb.py balancing policies with one slow replica.
+#
+# Starts a few stand-in backends in this process (plain aiohttp apps that
+# answer any POST after a fixed delay - one of them much slower than the
+# rest), then runs replica_lb.py once per policy in front of them and fires
+# the same concurrent load through each. Prints p50/p95/p99 latency and how
+# many requests every backend ended up serving.
+#
+# No MCP server is needed: routing and balancing never look inside the body -
+# the balancer only parses cacheable list/read requests (server/discover,
+# */list, resources/read), and the load here is none of those - so a backend
+# that sleeps and echoes is all the benchmark requires.
+#
+# Usage:  python bench_lb.py [--requests N] [--concurrency C] [--slow-ms MS]
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession, web
+
+parser = argparse.ArgumentParser(description="Tail latency per balancing policy.")
+parser.add_argument("--requests", type=int, default=2000)
+parser.add_argument("--concurrency", type=int, default=32)
+parser.add_argument("--backends", type=int, default=3)
+parser.add_argument("--fast-ms", type=float, default=5.0)
+parser.add_argument("--slow-ms", type=float, default=100.0)
+parser.add_argument("--policies", nargs="+",
+                    default=["round-robin", "least-in-flight", "ewma", "peak-ewma", "p2c"])
+args = parser.parse_args()
+
+LB_PORT = 8900
+FIRST_BACKEND = 8901
+LB = Path(__file__).with_name("replica_lb.py")
+BODY = b'{"jsonrpc":"2.0","id":1,"method":"tools/call","params":{"name":"book_trip"}}'
+CYAN, YELLOW, RESET = "\033[96m", "\033[93m", "\033[0m"
+
+
+async def start_backend(port: int, delay: float) -> web.AppRunner:
+    async def handle(request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(delay)
+        return web.json_response({"jsonrpc": "2.0", "id": 1, "result": {}})
+
+    app = web.Application()
+    app.router.add_post("/{tail:.*}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def wait_for(url: str) -> None:
+    async with ClientSession() as s:
+        for _ in range(100):
+            try:
+                async with s.get(url) as r:
+                    if r.status == 200:
+                        return
+            except OSError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} never came up")
+
+
+async def run_policy(policy: str, urls: list[str]) -> None:
+    lb = await asyncio.create_subprocess_exec(
+        sys.executable, str(LB), str(LB_PORT), *urls, "--policy", policy, "--quiet",
+        stdout=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await wait_for(f"http://127.0.0.1:{LB_PORT}/lb/stats")
+        latencies: list[float] = []
+        remaining = iter(range(args.requests))
+
+        async def worker(s: ClientSession) -> None:
+            for _ in remaining:
+                started = time.perf_counter()
+                async with s.post(f"http://127.0.0.1:{LB_PORT}/mcp", data=BODY) as r:
+                    await r.read()
+                latencies.append(time.perf_counter() - started)
+
+        async with ClientSession() as s:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(s) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - t0
+            async with s.get(f"http://127.0.0.1:{LB_PORT}/lb/stats") as r:
+                stats = await r.json()
+
+        q = statistics.quantiles(latencies, n=100)
+        served = "  ".join(f"{url.rsplit(':', 1)[1]}={b['served']}"
+                           for url, b in stats["backends"].items())
+        print(f"{policy:<16} {len(latencies) / elapsed:8.0f} req/s   "
+              f"p50 {q[49] * 1000:6.1f}  p95 {q[94] * 1000:6.1f}  "
+              f"p99 {q[98] * 1000:6.1f} ms   served: {served}")
+    finally:
+        lb.terminate()
+        await lb.wait()
+
+
+async def main() -> None:
+    ports = [FIRST_BACKEND + i for i in range(args.backends)]
+    # The LAST backend is the slow one.
+    delays = [args.fast_ms / 1000] * (args.backends - 1) + [args.slow_ms / 1000]
+    runners = [await start_backend(p, d) for p, d in zip(ports, delays)]
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+
+    print(f"{CYAN}{args.requests} requests, concurrency {args.concurrency}; "
+          f"backends {', '.join(str(p) for p in ports)} answer in {args.fast_ms:g} ms, "
+          f"except {YELLOW}{ports[-1]} ({args.slow_ms:g} ms){RESET}\n")
+    try:
+        for policy in args.policies:
+            await run_policy(policy, urls)
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,227 @@
+# bench_mrtr.py - what a Multi Round-Trip Request costs, round by round.
+#
+# Starts replica_server.py replicas and replica_lb.py in front of them, all on
+# localhost, then runs N concurrent book_trip flows through the balancer. Each
+# flow is the full MRTR exchange trip_client.py performs: round 1 gets
+# input_required, the scripted answers are filled in by trip_client's own
+# handler (input_provider.py), round 2 echoes requestState and books.
+#
+# Per round it reports throughput and p50/p95/p99, and splits the mean time
+# into:
+#   seal / unseal   requestState crypto        (replica's Server-Timing header)
+#   server, rest    parsing, validation, the tool, serializing the result -
+#                   and, under load, waiting for the replica's event loop
+#   client JSON     encoding the request and decoding the reply, here
+#   network + lb    everything else: loopback TCP, HTTP, the balancer hop
+# and which replica served each round (the balancer's X-Backend header). With
+# round robin, round 2 lands on a different replica than round 1 every time at
+# --concurrency 1, and about half the time once flows interleave - the booking
+# has to work either way.
+#
+# For catching regressions, --max-p99-ms fails the run (exit 1) when either
+# round's p99 goes over it, and --json writes every round's numbers to a file.
+#
+# Usage:  python bench_mrtr.py [--flows 1000] [--concurrency 32] [--replicas 2]
+#                              [--policy round-robin] [--max-p99-ms MS] [--json FILE]
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from aiohttp import ClientSession
+from mcp_types import ElicitRequestFormParams
+
+from flight_catalog import SEED, create
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lab4"))
+from input_provider import ScriptedInput, make_handler  # noqa: E402
+
+parser = argparse.ArgumentParser(description="MRTR latency, round by round, through replica_lb.py.")
+parser.add_argument("--flows", type=int, default=1000)
+parser.add_argument("--concurrency", type=int, default=32)
+parser.add_argument("--replicas", type=int, default=2)
+parser.add_argument("--policy", default="round-robin")
+parser.add_argument("--max-p99-ms", type=float, default=None, help="fail if a round's p99 is over this")
+parser.add_argument("--json", default=None, help="write every round's numbers here")
+args = parser.parse_args()
+
+LB_PORT = 8970
+FIRST_REPLICA = 8971
+HERE = Path(__file__).parent
+CYAN, YELLOW, GREEN, RED, RESET = "\033[96m", "\033[93m", "\033[92m", "\033[91m", "\033[0m"
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream",
+           "MCP-Protocol-Version": "2026-07-28", "Mcp-Method": "tools/call", "Mcp-Name": "book_trip"}
+META = {"io.modelcontextprotocol/protocolVersion": "2026-07-28",
+        "io.modelcontextprotocol/clientCapabilities": {"elicitation": {"form": {}}}}
+DESTINATIONS = list(SEED)
+handler = make_handler(ScriptedInput({"name": "Ada", "choice": "1"}))
+
+
+def server_timing(header: str) -> dict[str, float]:
+    """'seal;dur=0.05, app;dur=2.9' -> {'seal': 5e-05, 'app': 0.0029} (seconds)."""
+    spans = {}
+    for part in filter(None, (p.strip() for p in header.split(","))):
+        name, _, dur = part.partition(";dur=")
+        spans[name] = float(dur or 0) / 1000
+    return spans
+
+
+async def rpc(s: ClientSession, rpc_id: int, params: dict, round_no: int,
+              records: list[dict]) -> dict:
+    started = time.perf_counter()
+    body = json.dumps({"jsonrpc": "2.0", "id": rpc_id, "method": "tools/call",
+                       "params": dict(params, _meta=META)})
+    encoded = time.perf_counter()
+    async with s.post(f"http://127.0.0.1:{LB_PORT}/mcp", data=body, headers=HEADERS) as r:
+        raw = await r.read()
+        received = time.perf_counter()
+        reply = json.loads(raw)
+        spans = server_timing(r.headers.get("Server-Timing", ""))
+        backend = r.headers.get("X-Backend", "?")
+    done = time.perf_counter()
+    if "result" not in reply:
+        raise RuntimeError(f"round {round_no} failed: {reply}")
+    app = spans.get("app", 0.0)
+    records.append({
+        "round": round_no, "total": done - started, "backend": backend.rsplit(":", 1)[-1],
+        "seal": spans.get("seal", 0.0), "unseal": spans.get("unseal", 0.0),
+        "server": app - spans.get("seal", 0.0) - spans.get("unseal", 0.0),
+        "client_json": (encoded - started) + (done - received),
+        "network": (received - encoded) - app,
+        "bytes_up": len(body), "bytes_down": len(raw),
+    })
+    return reply["result"]
+
+
+async def flow(s: ClientSession, i: int, records: list[dict]) -> float:
+    started = time.perf_counter()
+    params = {"name": "book_trip", "arguments": {"destination": DESTINATIONS[i % len(DESTINATIONS)]}}
+    first = await rpc(s, 2 * i, params, 1, records)
+    if first.get("resultType") != "input_required":
+        raise RuntimeError(f"round 1 did not ask for input: {first}")
+
+    # Answer exactly as trip_client.py would, through its elicitation handler.
+    responses = {}
+    for key, request in first["inputRequests"].items():
+        form = ElicitRequestFormParams.model_validate(request["params"])
+        answer = await handler(form.message, None, form, None)
+        responses[key] = ({"action": "accept", "content": answer} if isinstance(answer, dict)
+                          else answer.model_dump(mode="json", exclude_none=True))
+
+    second = await rpc(s, 2 * i + 1, dict(params, inputResponses=responses,
+                                          requestState=first["requestState"]), 2, records)
+    if not second["content"][0]["text"].startswith("Booked"):
+        raise RuntimeError(f"booking failed: {second}")
+    return time.perf_counter() - started
+
+
+async def wait_for(url: str) -> None:
+    async with ClientSession() as s:
+        for _ in range(300):
+            try:
+                async with s.post(url, data=b"{}", headers=HEADERS):
+                    return
+            except OSError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} never came up")
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:7.2f}"
+
+
+def report(records: list[dict], flows: list[float], elapsed: float) -> bool:
+    ok = True
+    print(f"{len(flows):,} flows in {elapsed:.1f}s  =  {GREEN}{len(flows) / elapsed:,.0f} flows/s"
+          f"{RESET}   flow p50 {ms(statistics.median(flows))} ms\n")
+    print(f"{'':8} {'rounds/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}   | mean ms: "
+          f"{'seal':>6} {'unseal':>6} {'server':>7} {'client':>7} {'net+lb':>7}   {'bytes up/down':>14}")
+    for round_no in (1, 2):
+        rows = [r for r in records if r["round"] == round_no]
+        q = statistics.quantiles([r["total"] for r in rows], n=100)
+        mean = {k: statistics.fmean(r[k] for r in rows)
+                for k in ("seal", "unseal", "server", "client_json", "network", "bytes_up", "bytes_down")}
+        over = args.max_p99_ms is not None and q[98] * 1000 > args.max_p99_ms
+        ok &= not over
+        print(f"round {round_no}  {len(rows) / elapsed:9,.0f} {ms(q[49])} {ms(q[94])} "
+              f"{RED if over else ''}{ms(q[98])}{RESET}   |          "
+              f"{mean['seal'] * 1000:6.3f} {mean['unseal'] * 1000:6.3f} {ms(mean['server'])} "
+              f"{ms(mean['client_json'])} {ms(mean['network'])}   "
+              f"{mean['bytes_up']:6,.0f}/{mean['bytes_down']:<6,.0f}")
+
+    # Which replica served each round, and did the flow change replica?
+    by_round = {n: Counter(r["backend"] for r in records if r["round"] == n) for n in (1, 2)}
+    served: dict[int, dict[int, str]] = {}
+    for r in records:
+        served.setdefault(r["flow"], {})[r["round"]] = r["backend"]
+    pairs = Counter((s[1], s[2]) for s in served.values())
+    print(f"\n{YELLOW}served by{RESET}   " + "   ".join(
+        f"round {n}: " + ", ".join(f":{port} {count}" for port, count in sorted(c.items()))
+        for n, c in by_round.items()))
+    crossed = sum(count for (a, b), count in pairs.items() if a != b)
+    print(f"{YELLOW}round 2 on a different replica than round 1{RESET}: "
+          f"{crossed:,} of {sum(pairs.values()):,} flows")
+    if args.max_p99_ms is not None:
+        print(f"\n{GREEN + 'PASS' if ok else RED + 'FAIL'}{RESET}: p99 limit {args.max_p99_ms:g} ms")
+    return ok
+
+
+async def main() -> int:
+    workdir = tempfile.TemporaryDirectory()
+    catalog = os.path.join(workdir.name, "flights.db")
+    create(catalog, SEED)
+    ports = [FIRST_REPLICA + i for i in range(args.replicas)]
+    replicas = [await asyncio.create_subprocess_exec(
+        sys.executable, str(HERE / "replica_server.py"), str(port),
+        env=dict(os.environ, FLIGHTS_DB=catalog),
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL) for port in ports]
+    lb = None
+    try:
+        for port in ports:
+            await wait_for(f"http://127.0.0.1:{port}/mcp")
+        lb = await asyncio.create_subprocess_exec(
+            sys.executable, str(HERE / "replica_lb.py"), str(LB_PORT),
+            *(f"http://127.0.0.1:{p}" for p in ports), "--policy", args.policy, "--quiet",
+            stdout=asyncio.subprocess.DEVNULL)
+        await wait_for(f"http://127.0.0.1:{LB_PORT}/mcp")
+
+        print(f"{CYAN}{args.flows:,} book_trip flows, concurrency {args.concurrency}, "
+              f"{args.replicas} replicas behind replica_lb.py ({args.policy}), "
+              f"{os.cpu_count()} CPUs{RESET}")
+        records: list[dict] = []
+        flows: list[float] = []
+        remaining = iter(range(args.flows))
+
+        async def worker(s: ClientSession) -> None:
+            for i in remaining:
+                mine: list[dict] = []
+                flows.append(await flow(s, i, mine))
+                records.extend(dict(r, flow=i) for r in mine)
+
+        async with ClientSession() as s:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(s) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - t0
+
+        ok = report(records, flows, elapsed)
+        if args.json:
+            with open(args.json, "w") as out:
+                json.dump({"args": vars(args), "elapsed": elapsed, "rounds": records}, out)
+            print(f"rounds written to {args.json}")
+        return 0 if ok else 1
+    finally:
+        for proc in filter(None, [lb, *replicas]):
+            proc.terminate()
+            await proc.wait()
+        workdir.cleanup()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
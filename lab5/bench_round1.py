@@ -0,0 +1,139 @@
+# bench_round1.py - what round 1 of book_trip costs, before and after
+# replica_server.py started prebuilding its answers.
+#
+# For catalogs of a few and of thousands of destinations:
+#
+#   in-process   building the InputRequiredResult per call (what round 1 used
+#                to do: schema dicts, model validation, state encoding) vs
+#                looking up the prebuilt one; plus what the catalog load costs
+#                at startup, and serializing the answer (paid either way)
+#   over HTTP    a real replica_server.py on that catalog: round-1 calls to
+#                random destinations, p50/p95/p99 and calls/s
+#
+# Usage:  python bench_round1.py [--destinations 3 5000] [--calls 2000] [--concurrency 16]
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession
+
+from flight_catalog import FlightCatalog, create
+
+parser = argparse.ArgumentParser(description="Round-1 latency of book_trip.")
+parser.add_argument("--destinations", type=int, nargs="+", default=[3, 5000])
+parser.add_argument("--calls", type=int, default=2000)
+parser.add_argument("--concurrency", type=int, default=16)
+parser.add_argument("--rounds", type=int, default=20000, help="in-process iterations")
+args = parser.parse_args()
+
+PORT = 8950
+SERVER = Path(__file__).with_name("replica_server.py")
+CYAN, YELLOW, RESET = "\033[96m", "\033[93m", "\033[0m"
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream",
+           "MCP-Protocol-Version": "2026-07-28", "Mcp-Method": "tools/call", "Mcp-Name": "book_trip"}
+META = {"io.modelcontextprotocol/protocolVersion": "2026-07-28",
+        "io.modelcontextprotocol/clientCapabilities": {"elicitation": {"form": {}}}}
+
+workdir = tempfile.TemporaryDirectory()
+os.environ["FLIGHTS_DB"] = os.path.join(workdir.name, "import.db")
+del sys.argv[1:]                    # replica_server.py reads its port from argv
+import replica_server  # noqa: E402
+
+
+def routes(n: int) -> dict[str, list[str]]:
+    rng = random.Random(n)
+    return {f"city{i:05d}": [f"{rng.choice(['AF', 'BA', 'DL', 'NH'])}{rng.randint(1, 999):03d} "
+                             f"{rng.randint(0, 23):02d}:{rng.choice(['05', '20', '40'])}"
+                             for _ in range(rng.randint(2, 6))] for i in range(n)}
+
+
+def per_call(fn, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def in_process(db: str, n: int) -> None:
+    catalog = FlightCatalog(db, build=replica_server.ask)
+    dests = list(catalog.routes)
+    pick = random.Random(1).choice
+    built = per_call(lambda: replica_server.ask(d := pick(dests), catalog.flights(d)), args.rounds)
+    looked_up = per_call(lambda: catalog.entry(pick(dests)), args.rounds)
+    template = catalog.entry(dests[0])
+    wire = per_call(lambda: template.model_dump(by_alias=True, mode="json", exclude_none=True),
+                    args.rounds)
+    print(f"  in-process   build per call {built:7.1f} µs   prebuilt {looked_up:5.2f} µs   "
+          f"({built / looked_up:,.0f}x)   serialize {wire:5.1f} µs   "
+          f"{YELLOW}startup: {catalog.stats['load_ms']:.1f} ms to prebuild {n:,}{RESET}")
+
+
+async def wait_for(url: str) -> None:
+    async with ClientSession() as s:
+        for _ in range(200):
+            try:
+                async with s.post(url, data=b"{}", headers=HEADERS):
+                    return
+            except OSError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} never came up")
+
+
+async def over_http(db: str, dests: list[str]) -> None:
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, str(SERVER), str(PORT), env=dict(os.environ, FLIGHTS_DB=db),
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{PORT}/mcp"
+    try:
+        await wait_for(url)
+        latencies: list[float] = []
+        remaining = iter(range(args.calls))
+        pick = random.Random(2).choice
+
+        async def worker(s: ClientSession) -> None:
+            for i in remaining:
+                body = json.dumps({"jsonrpc": "2.0", "id": i, "method": "tools/call", "params": {
+                    "name": "book_trip", "arguments": {"destination": pick(dests)}, "_meta": META}})
+                started = time.perf_counter()
+                async with s.post(url, data=body, headers=HEADERS) as r:
+                    reply = await r.json(content_type=None)
+                latencies.append(time.perf_counter() - started)
+                assert reply["result"]["resultType"] == "input_required", reply
+
+        async with ClientSession() as s:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(s) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - t0
+        q = statistics.quantiles(latencies, n=100)
+        print(f"  over HTTP    {len(latencies) / elapsed:7.0f} calls/s   p50 {q[49] * 1000:5.1f}  "
+              f"p95 {q[94] * 1000:5.1f}  p99 {q[98] * 1000:5.1f} ms")
+    finally:
+        server.terminate()
+        await server.wait()
+
+
+async def main() -> None:
+    print(f"{CYAN}round 1 of book_trip: {args.rounds:,} in-process iterations, "
+          f"{args.calls:,} HTTP calls at concurrency {args.concurrency}{RESET}")
+    for n in args.destinations:
+        db = os.path.join(workdir.name, f"flights-{n}.db")
+        create(db, routes(n))
+        print(f"{n:,} destinations")
+        in_process(db, n)
+        await over_http(db, list(routes(n)))
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        workdir.cleanup()
@@ -0,0 +1,136 @@
+"""
+flight_catalog.py - the routes replica_server.py sells, in a SQLite file.
+
+A dict literal is fine for three destinations. Thousands of routes want a
+real index, and a way to change them without restarting every replica. This
+keeps them in SQLite - one file, indexed by destination, shareable by every
+replica on the host - and loads them into memory, so a lookup on the request
+path is a dict hit, not a query:
+
+    catalog = FlightCatalog("flights.db", build=make_template)
+    catalog.flights("paris")    # ("AF017 08:15", "DL262 17:40")
+    catalog.entry("paris")      # whatever make_template("paris", flights) returned
+
+`build` runs ONCE per destination, and again only if its flights change.
+That is the point: anything derived from a route - replica_server.py builds
+its whole round-1 answer - is computed at startup and reused by every call
+after that.
+
+Edits are picked up while running. At most every `check_every` seconds a
+lookup asks SQLite whether the file has changed (PRAGMA data_version - one
+cheap query, no file scan); if so, the catalog re-reads it, rebuilds the
+entries of destinations whose flights changed, and swaps the new tables in
+whole. Edit it in place, with any SQLite client:
+
+    sqlite3 flights.db "INSERT INTO flights VALUES ('rome', 0, 'AZ319 07:05')"
+
+A missing file is created and seeded with SEED. A reload that fails keeps
+serving the tables it already has.
+
+It ships complete so replica_server.py can stay focused on the protocol.
+"""
+
+import logging
+import sqlite3
+import time
+from typing import Any, Callable
+
+log = logging.getLogger(__name__)
+
+SEED = {
+    "paris": ["AF017 08:15", "DL262 17:40"],
+    "tokyo": ["NH009 11:05", "JL005 13:20"],
+    "london": ["BA178 09:30", "VS004 18:55"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights (
+    destination TEXT    NOT NULL,
+    position    INTEGER NOT NULL,
+    flight      TEXT    NOT NULL,
+    PRIMARY KEY (destination, position)
+) WITHOUT ROWID
+"""
+
+
+def create(path: str, routes: dict[str, list[str]]) -> None:
+    """Write `routes` into the catalog at `path`, replacing what was there."""
+    with sqlite3.connect(path) as db:
+        db.execute(SCHEMA)
+        db.execute("DELETE FROM flights")
+        db.executemany("INSERT INTO flights VALUES (?, ?, ?)",
+                       [(dest, i, flight) for dest, flights in routes.items()
+                        for i, flight in enumerate(flights)])
+    db.close()
+
+
+class FlightCatalog:
+    """Destinations -> flights, plus one prebuilt entry per destination."""
+
+    def __init__(self, path: str, *, build: Callable[[str, tuple[str, ...]], Any] | None = None,
+                 check_every: float = 1.0):
+        self.path = path
+        self.build = build
+        self.check_every = check_every
+        self.routes: dict[str, tuple[str, ...]] = {}
+        self.entries: dict[str, Any] = {}
+        self.stats = {"loads": 0, "built": 0, "failed_reloads": 0, "load_ms": 0.0}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(SCHEMA)
+        if self._db.execute("SELECT 1 FROM flights LIMIT 1").fetchone() is None:
+            self._db.executemany("INSERT INTO flights VALUES (?, ?, ?)",
+                                 [(dest, i, flight) for dest, flights in SEED.items()
+                                  for i, flight in enumerate(flights)])
+            self._db.commit()
+        self._version = None
+        self._checked = 0.0
+        self.reload()
+
+    def flights(self, destination: str) -> tuple[str, ...] | None:
+        self._maybe_reload()
+        return self.routes.get(destination)
+
+    def entry(self, destination: str) -> Any:
+        self._maybe_reload()
+        return self.entries.get(destination)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def reload(self) -> bool:
+        """Re-read the file if it changed since the last load. True if it did."""
+        version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return False
+        started = time.perf_counter()
+        routes: dict[str, list[str]] = {}
+        for dest, flight in self._db.execute(
+                "SELECT destination, flight FROM flights ORDER BY destination, position"):
+            routes.setdefault(dest, []).append(flight)
+        frozen = {dest: tuple(flights) for dest, flights in routes.items()}
+        entries = {}
+        if self.build:
+            # Only destinations whose flights changed are rebuilt, so editing
+            # one route in a big catalog costs one build, not thousands.
+            for dest, flights in frozen.items():
+                same = self.routes.get(dest) == flights and dest in self.entries
+                entries[dest] = self.entries[dest] if same else self.build(dest, flights)
+                self.stats["built"] += not same
+        # Swap both tables at once: a lookup never sees half of a reload.
+        self.routes, self.entries, self._version = frozen, entries, version
+        self.stats["loads"] += 1
+        self.stats["load_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.check_every:
+            return
+        self._checked = now
+        try:
+            if self.reload():
+                log.info("flight catalog reloaded: %d destinations in %.1f ms",
+                         len(self.routes), self.stats["load_ms"])
+        except Exception as exc:          # keep serving what we have
+            self.stats["failed_reloads"] += 1
+            log.warning("flight catalog reload failed, keeping the old one: %s", exc)
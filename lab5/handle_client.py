@@ -5,7 +5,9 @@
 # call with the SAME handle works on one attempt and explodes on the next,
 # depending purely on which replica the load balancer happens to pick.
 #
-# Watch both server terminals while this runs.
+# Watch both server terminals while this runs. Then restart both replicas
+# with NOTEBOOK_STORE=redis://... (see memory_server.py) and run it again:
+# with the state in a shared store, every attempt succeeds.
 
 import asyncio
 
@@ -26,6 +28,7 @@ async def main():
 
         # Two IDENTICAL calls. With two replicas behind round-robin they land
         # on different ones - so exactly one of these will fail.
+        failures = 0
         for attempt in (1, 2):
             print(f"\nattempt {attempt}: save_note with handle {handle}")
             try:
@@ -36,10 +39,15 @@ async def main():
                 )
                 print(f"  OK      -> {r.data}")
             except ToolError as e:
+                failures += 1
                 print(f"  FAILED  -> {e}")
 
-        print("\nSame handle. Same call. Different replica, different outcome.")
-        print("That is what in-memory state does behind a load balancer.")
+        if failures:
+            print("\nSame handle. Same call. Different replica, different outcome.")
+            print("That is what in-memory state does behind a load balancer.")
+        else:
+            print("\nSame handle, different replicas, same outcome: the state")
+            print("lives in a store every replica can reach.")
 
 
 if __name__ == "__main__":
@@ -9,51 +9,119 @@
 # That failure is the lesson. Production servers fix it by putting the store
 # somewhere every replica can reach (Redis, a database), keyed user:handle.
 #
+# Then watch the fix: the same code, pointed at a shared store, works through
+# the load balancer. Lab 2's notebook_store.py includes a tiny Redis stand-in:
+#
+#   python ../lab2/notebook_store.py 6379
+#   NOTEBOOK_STORE=redis://127.0.0.1:6379 python memory_server.py 8001
+#   NOTEBOOK_STORE=redis://127.0.0.1:6379 python memory_server.py 8002
+#
 # Usage:  python memory_server.py <port>
 
+import os
 import secrets
 import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
 from fastmcp import FastMCP
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lab2"))
+from notebook_store import MemoryStore, bad_item, check_batch, open_store  # noqa: E402
+
 PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8001
 NAME = f"replica-{PORT}"
 GREEN, RED, RESET = "\033[92m", "\033[91m", "\033[0m"
 
 server = FastMCP("NotebookService")
 
-# In-memory = per-process = per-REPLICA. This dict is the bug.
-notebooks: dict[str, dict] = {}
+# By default the store is an in-memory dict: per-process = per-REPLICA.
+# That dict is the bug. Set NOTEBOOK_STORE=redis://... and it goes away.
+store = open_store()
+SHARED = not isinstance(store, MemoryStore)
+WHERE = os.getenv("NOTEBOOK_STORE") if SHARED else "THIS process's memory"
 
 
 @server.tool
 def open_notebook(name: str = "default") -> dict:
     """Create a notebook and return its handle."""
     handle = f"nb_{secrets.token_urlsafe(8)}"
-    notebooks[handle] = {"name": name, "notes": {}}
+    store.create(handle, name, datetime.now(timezone.utc) + timedelta(hours=1))
     print(f"{GREEN}[{NAME}] open_notebook -> {handle}   "
-          f"(stored in THIS process's memory){RESET}")
+          f"(stored in {WHERE}){RESET}")
     return {"handle": handle, "served_by": NAME}
 
 
-@server.tool
-def save_note(handle: str, title: str, content: str) -> dict:
-    """Save a note into the notebook identified by `handle`."""
-    nb = notebooks.get(handle)
+def _require(handle: str, tool: str) -> dict:
+    nb = store.get(handle)
+    if nb is None and SHARED:
+        # Every replica sees the same store, so this is not a routing problem.
+        print(f"{RED}[{NAME}] {tool}: UNKNOWN handle {handle} - "
+              f"not in {WHERE} (expired, or never opened){RESET}")
+        raise ValueError(
+            f"Unknown notebook handle {handle}. It has expired or was never "
+            "opened - open a new notebook."
+        )
     if nb is None:
-        print(f"{RED}[{NAME}] save_note: UNKNOWN handle {handle} - "
+        print(f"{RED}[{NAME}] {tool}: UNKNOWN handle {handle} - "
               f"it lives in a different replica's memory!{RESET}")
         raise ValueError(
             f"Unknown notebook handle {handle} on {NAME}. "
             "The handle is valid - but the state behind it lives in another "
             "replica's memory. In-memory state does not survive load balancing."
         )
-    nb["notes"][title] = content
+    return nb
+
+
+@server.tool
+def save_note(handle: str, title: str, content: str) -> dict:
+    """Save a note into the notebook identified by `handle`."""
+    _require(handle, "save_note")
+    total = store.save(handle, title, content)
     print(f"{GREEN}[{NAME}] save_note '{title}' -> {handle}{RESET}")
-    return {"saved": title, "served_by": NAME, "total_notes": len(nb["notes"])}
+    return {"saved": title, "served_by": NAME, "total_notes": total}
+
+
+# One call, many notes: each item gets its own status, and the store is
+# written once per batch rather than once per note. The limit and the
+# per-item check are notebook_store.py's, shared with Lab 2's note_server.py.
+
+@server.tool
+def save_notes(handle: str, notes: list[dict]) -> dict:
+    """Save many {"title", "content"} notes into the notebook in one call."""
+    nb = _require(handle, "save_notes")
+    check_batch(notes, "notes")
+    results, good = [], []
+    for item in notes:
+        problem = bad_item(item)
+        if problem:
+            results.append({"title": item.get("title"), "status": "error", "error": problem})
+        else:
+            results.append({"title": item["title"], "status": "saved"})
+            good.append((item["title"], item["content"]))
+    total = store.save_many(handle, good) if good else nb["count"]
+    print(f"{GREEN}[{NAME}] save_notes {len(good)}/{len(notes)} -> {handle}{RESET}")
+    return {"saved": len(good), "failed": len(notes) - len(good), "served_by": NAME,
+            "total_notes": total, "results": results}
+
+
+@server.tool
+def get_notes(handle: str, titles: list[str]) -> dict:
+    """Read many notes from the notebook in one call."""
+    _require(handle, "get_notes")
+    check_batch(titles, "titles")
+    contents = store.note_many(handle, titles) if titles else []
+    return {"served_by": NAME,
+            "notes": [{"title": t, "status": "found", "content": c} if c is not None
+                      else {"title": t, "status": "not_found"}
+                      for t, c in zip(titles, contents)]}
 
 
 if __name__ == "__main__":
-    print(f"{GREEN}[{NAME}] starting on port {PORT} - "
-          f"handles live ONLY in this process{RESET}")
+    if SHARED:
+        print(f"{GREEN}[{NAME}] starting on port {PORT} - "
+              f"handles live in the shared store at {WHERE}{RESET}")
+    else:
+        print(f"{GREEN}[{NAME}] starting on port {PORT} - "
+              f"handles live ONLY in this process{RESET}")
     server.run(transport="http", host="127.0.0.1", port=PORT)
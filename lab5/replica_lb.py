@@ -2,54 +2,653 @@
 #
 # This is the whole point of the 2026-07-28 stateless redesign: the thing in
 # front of your MCP replicas can be THIS dumb. No session table, no cookie
-# parsing, no JSON inspection - it forwards each request to the next backend
-# in rotation and prints which replica got it.
+# parsing - it forwards each request to the next backend in rotation and
+# prints which replica got it. Routing needs no JSON inspection either; the
+# only bodies it ever parses are the cacheable reads (server/discover, the
+# */list methods, resources/read), and only to cache and coalesce them - see
+# "Shared response cache" below.
 #
-# Usage:  python replica_lb.py [port] [backend...]
+# Usage:  python replica_lb.py [port] [backend...] [options]
 # Default: listen on 8000, round-robin to http://127.0.0.1:8001 and :8002
+#
+# Upstream connections are pooled: each backend gets ONE long-lived client
+# session whose keep-alive connections are reused by every request for the
+# life of the process, so a forwarded POST does not pay a fresh TCP connect.
+# The connection pools are opened at startup and closed on shutdown. Tune
+# them with --pool-size, --keepalive, --connect-timeout and --read-timeout.
+#
+# Bodies are streamed, not buffered: request chunks are piped upstream and
+# response chunks downstream as they arrive. That keeps SSE
+# (text/event-stream) responses live and memory flat per in-flight request,
+# whatever the payload size. --buffer restores read-it-all-then-forward.
+#
+# Round-robin is only the default. --policy picks how the next backend is
+# chosen when replicas are NOT equally fast (a long book_trip round, a GC
+# pause):
+#   round-robin      next in rotation, blind to load
+#   least-in-flight  fewest requests currently outstanding
+#   ewma             lowest smoothed latency x (in-flight + 1)
+#   peak-ewma        like ewma, but jumps straight to a latency spike and
+#                    only decays back over --decay seconds
+#   p2c              power of two choices: sample two, keep the less loaded
+# GET /lb/stats reports each backend's in-flight count and latency, and every
+# forwarded response names the replica that served it in an X-Backend header.
+# bench_lb.py compares the policies' tail latency with one slow backend.
+#
+# Dead replicas leave rotation on their own, two ways:
+#   * active  - every --health-interval seconds each backend gets a cheap
+#               server/discover POST; a backend that fails it is out until a
+#               probe succeeds again
+#   * passive - --eject-after consecutive 5xx answers or connection errors
+#               eject a backend for --eject-base seconds, doubling on each
+#               repeat ejection up to --eject-max
+# A request whose connection is refused never reached the backend, so it is
+# retried on another one instead of failing back to the client.
+#
+# Header-based routing. The Mcp-Method / Mcp-Name headers exist so that
+# infrastructure like this can route WITHOUT parsing the JSON body - the pool
+# is picked from the headers alone, for every request, before any body is
+# read. Group backends into named pools and map methods (optionally one name)
+# onto them:
+#
+#   python replica_lb.py 8000 http://127.0.0.1:8001 http://127.0.0.1:8002 \
+#       --pool trips=http://127.0.0.1:8003,http://127.0.0.1:8004 \
+#       --pool cheap=http://127.0.0.1:8005 \
+#       --route tools/call:book_trip=trips \
+#       --route tools/list=cheap --route server/discover=cheap
+#
+# An exact method:name route wins over a method-only route; anything
+# unmatched goes to the "default" pool - the positional backends. Each pool
+# balances with its own --policy state.
+#
+# Shared response cache. List and read results carry ttlMs / cacheScope
+# hints, and discovery storms from many agents ask the same questions. For
+# server/discover and the */list and resources/read methods the balancer
+# reads the request body, and keeps each cacheable result in an in-process
+# LRU bounded by --cache-bytes until its ttlMs runs out. An entry belongs to
+# one endpoint path and pool, method, protocol version and set of params:
+#   * public  entries are shared by every caller
+#   * private entries are keyed by (a hash of) the Authorization header
+# A hit is answered from memory with the caller's own JSON-RPC id, the
+# REMAINING ttlMs (so a downstream cache never holds it past the original
+# expiry) and the headers the backend originally sent - X-Backend,
+# Server-Timing and the rest - plus X-Cache: HIT. Hits, misses and
+# evictions show up in /lb/stats.
+#
+# Request coalescing (single flight). When dozens of agents start at once,
+# their identical server/discover and tools/list calls all miss the cache
+# together. Those same methods are therefore deduplicated in flight: the
+# first caller's request goes upstream, and every identical request that
+# arrives meanwhile (same endpoint path and pool, method, name, params,
+# protocol version and Authorization) waits for it and gets a copy rewritten
+# with its own JSON-RPC id. The replicas see one request instead of N.
+# --no-coalesce turns this off.
 
+import argparse
+import asyncio
+import hashlib
 import itertools
-import sys
+import json
+import math
+import random
+import time
+from collections import OrderedDict
+
+from aiohttp import (ClientConnectorError, ClientError, ClientSession, ClientTimeout,
+                     TCPConnector, web)
 
-from aiohttp import ClientSession, web
+parser = argparse.ArgumentParser(description="Load balancer for MCP replicas.")
+parser.add_argument("port", nargs="?", type=int, default=8000)
+parser.add_argument("backends", nargs="*", metavar="backend")
+parser.add_argument("--pool-size", type=int, default=100,
+                    help="max open connections per backend, 0 = unlimited (default 100)")
+parser.add_argument("--keepalive", type=float, default=30.0,
+                    help="seconds an idle pooled connection stays open (default 30)")
+parser.add_argument("--connect-timeout", type=float, default=2.0,
+                    help="seconds to wait for a new upstream connection (default 2)")
+parser.add_argument("--read-timeout", type=float, default=300.0,
+                    help="seconds to wait between upstream reads (default 300)")
+parser.add_argument("--buffer", action="store_true",
+                    help="read whole bodies before forwarding instead of streaming")
+parser.add_argument("--policy", default="round-robin",
+                    choices=["round-robin", "least-in-flight", "ewma", "peak-ewma", "p2c"],
+                    help="how to choose a backend (default round-robin)")
+parser.add_argument("--decay", type=float, default=10.0,
+                    help="seconds over which latency history fades (default 10)")
+parser.add_argument("--health-path", default="/mcp",
+                    help="path probed with server/discover (default /mcp)")
+parser.add_argument("--health-interval", type=float, default=2.0,
+                    help="seconds between active health probes, 0 = off (default 2)")
+parser.add_argument("--health-timeout", type=float, default=1.0,
+                    help="seconds before a health probe counts as failed (default 1)")
+parser.add_argument("--eject-after", type=int, default=3,
+                    help="consecutive failures that eject a backend (default 3)")
+parser.add_argument("--eject-base", type=float, default=5.0,
+                    help="seconds of the first ejection, doubled per repeat (default 5)")
+parser.add_argument("--eject-max", type=float, default=120.0,
+                    help="longest ejection in seconds (default 120)")
+parser.add_argument("--pool", action="append", default=[], metavar="NAME=URL[,URL...]",
+                    help="define a named pool of backends (repeatable)")
+parser.add_argument("--route", action="append", default=[], metavar="METHOD[:NAME]=POOL",
+                    help="send matching Mcp-Method[/Mcp-Name] requests to POOL (repeatable)")
+parser.add_argument("--cache-bytes", type=int, default=64 * 2**20,
+                    help="byte budget of the response cache, 0 = off (default 64 MiB)")
+parser.add_argument("--no-coalesce", dest="coalesce", action="store_false",
+                    help="send identical concurrent list/read requests upstream separately")
+parser.add_argument("--quiet", action="store_true",
+                    help="do not log every forwarded request")
+args = parser.parse_args()
 
-LISTEN = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
-BACKENDS = sys.argv[2:] or ["http://127.0.0.1:8001", "http://127.0.0.1:8002"]
-rr = itertools.cycle(BACKENDS)
+LISTEN = args.port
+BACKENDS = args.backends or ["http://127.0.0.1:8001", "http://127.0.0.1:8002"]
 
-CYAN, YELLOW, RESET = "\033[96m", "\033[93m", "\033[0m"
+CYAN, YELLOW, GREEN, RED, RESET = "\033[96m", "\033[93m", "\033[92m", "\033[91m", "\033[0m"
 
 # Hop-by-hop headers must not be forwarded (RFC 9110 §7.6.1).
 HOP = {"connection", "keep-alive", "transfer-encoding", "te", "upgrade",
        "proxy-authenticate", "proxy-authorization", "host", "content-length"}
 
 
-async def proxy(request: web.Request) -> web.Response:
-    backend = next(rr)
+# ─── Backends and balancing policies ────────────────────────────────
+
+class Backend:
+    """One replica: its pooled session plus the live numbers policies read."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session: ClientSession | None = None
+        self.in_flight = 0
+        self.served = 0
+        self.ewma = 0.0           # smoothed latency, seconds
+        self.peak = 0.0           # peak-EWMA latency, seconds
+        self._stamp = time.monotonic()
+        self.up = True            # last active probe succeeded
+        self.failures = 0         # consecutive passive failures
+        self.ejections = 0        # recent ejections; sets the next duration
+        self.ejected_until = 0.0
+
+    def available(self) -> bool:
+        return self.up and time.monotonic() >= self.ejected_until
+
+    def succeeded(self) -> None:
+        self.failures = 0
+
+    def failed(self, reason: str) -> None:
+        """Count a 5xx or connection error; eject on a consecutive run."""
+        self.failures += 1
+        if self.failures < args.eject_after or not self.available():
+            return
+        duration = min(args.eject_base * 2 ** self.ejections, args.eject_max)
+        self.ejections += 1
+        self.failures = 0
+        self.ejected_until = time.monotonic() + duration
+        print(f"{RED}[lb] ejecting {self.url} for {duration:g}s ({reason}){RESET}")
+
+    def probed(self, ok: bool, reason: str = "") -> None:
+        """Record one active health probe."""
+        if ok and not self.up:
+            print(f"{GREEN}[lb] {self.url} is answering probes again{RESET}")
+        elif not ok and self.up:
+            print(f"{RED}[lb] {self.url} failed its health probe ({reason}) - "
+                  f"out of rotation{RESET}")
+        self.up = ok
+        # A backend that stays healthy slowly earns back short ejections.
+        if ok and self.available() and self.ejections:
+            self.ejections -= 1
+
+    def observe(self, latency: float) -> None:
+        """Fold one completed request's latency into both averages."""
+        now = time.monotonic()
+        # Time-based weight: the longer since the last sample, the less the
+        # old average counts - so a backend that was slow a minute ago is
+        # not punished forever.
+        w = math.exp(-(now - self._stamp) / args.decay)
+        self._stamp = now
+        self.ewma = self.ewma * w + latency * (1 - w) if self.served else latency
+        self.peak = latency if latency > self.peak else self.peak * w + latency * (1 - w)
+        self.served += 1
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "served": self.served,
+                "ewma_ms": round(self.ewma * 1000, 2),
+                "peak_ewma_ms": round(self.peak * 1000, 2),
+                "up": self.up, "available": self.available(),
+                "ejected_for_s": round(max(0.0, self.ejected_until - time.monotonic()), 1),
+                "ejections": self.ejections}
+
+
+class RoundRobin:
+    def __init__(self):
+        self._n = itertools.count()
+
+    def pick(self, backends: list[Backend]) -> Backend:
+        return backends[next(self._n) % len(backends)]
+
+
+class LeastInFlight:
+    def pick(self, backends: list[Backend]) -> Backend:
+        # random() breaks ties so idle backends share the work evenly.
+        return min(backends, key=lambda b: (b.in_flight, random.random()))
+
+
+class Ewma:
+    attr = "ewma"
+
+    def cost(self, b: Backend) -> float:
+        # Latency alone ignores queueing; scaling by outstanding work does not.
+        return getattr(b, self.attr) * (b.in_flight + 1)
+
+    def pick(self, backends: list[Backend]) -> Backend:
+        return min(backends, key=lambda b: (self.cost(b), random.random()))
+
+
+class PeakEwma(Ewma):
+    attr = "peak"
+
+
+class PowerOfTwo:
+    def pick(self, backends: list[Backend]) -> Backend:
+        if len(backends) < 2:
+            return backends[0]
+        a, b = random.sample(backends, 2)
+        return a if (a.in_flight, a.peak) <= (b.in_flight, b.peak) else b
+
+
+POLICIES = {"round-robin": RoundRobin, "least-in-flight": LeastInFlight,
+            "ewma": Ewma, "peak-ewma": PeakEwma, "p2c": PowerOfTwo}
+
+class Pool:
+    """A named group of backends that balances with its own policy state."""
+
+    def __init__(self, name: str, members: list[Backend]):
+        self.name = name
+        self.backends = members
+        self.policy = POLICIES[args.policy]()
+
+
+# A backend listed in several pools is ONE Backend: one connection pool, one
+# set of health and latency numbers.
+by_url: dict[str, Backend] = {}
+
+
+def pool_of(name: str, urls: list[str]) -> Pool:
+    return Pool(name, [by_url.setdefault(u, Backend(u)) for u in urls])
+
+
+pools = {"default": pool_of("default", BACKENDS)}
+for spec in args.pool:
+    pool_name, _, urls = spec.partition("=")
+    if not pool_name or not urls:
+        parser.error(f"--pool {spec!r}: expected NAME=URL[,URL...]")
+    pools[pool_name] = pool_of(pool_name, urls.split(","))
+
+# (method, name) -> pool; a name of None matches every name for that method.
+routes: dict[tuple[str, str | None], Pool] = {}
+for spec in args.route:
+    match, _, pool_name = spec.rpartition("=")
+    if not match or pool_name not in pools:
+        parser.error(f"--route {spec!r}: expected METHOD[:NAME]=POOL with a defined POOL")
+    # Split on the FIRST colon only: a resources/read name is a URI.
+    route_method, _, route_name = match.partition(":")
+    routes[(route_method, route_name or None)] = pools[pool_name]
+
+backends = list(by_url.values())
+
+
+def route(method: str, name: str) -> Pool:
+    """Pick a pool from the Mcp-Method / Mcp-Name headers alone."""
+    return routes.get((method, name)) or routes.get((method, None)) or pools["default"]
+
+
+# ─── Response cache ─────────────────────────────────────────────────
+
+CACHEABLE = {"server/discover", "tools/list", "prompts/list", "resources/list",
+             "resources/templates/list", "resources/read"}
+
+
+class ResponseCache:
+    """Byte-bounded LRU of results, each kept until its own ttlMs expires.
+
+    A value is the serialized result WITHOUT ttlMs and without its opening
+    brace, so a hit is two byte concatenations away from a full response,
+    plus the response headers to replay with it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, tuple[float, bytes, dict, int]] = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.stores = self.evictions = 0
+
+    def get(self, key: tuple) -> tuple[int, bytes, dict] | None:
+        """Return (remaining ttlMs, result tail, headers), or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        remaining = int((entry[0] - time.monotonic()) * 1000)
+        if remaining <= 0:
+            self._drop(key)
+            return None
+        self.entries.move_to_end(key)
+        return remaining, entry[1], entry[2]
+
+    def put(self, key: tuple, ttl_ms: int, tail: bytes, headers: dict) -> None:
+        size = len(tail) + sum(len(k) + len(v) for k, v in headers.items())
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (time.monotonic() + ttl_ms / 1000, tail, headers, size)
+        self.bytes += size
+        self.stores += 1
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _drop(self, key: tuple) -> None:
+        self.bytes -= self.entries.pop(key)[3]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores,
+                "evictions": self.evictions, "entries": len(self.entries),
+                "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+cache = ResponseCache(args.cache_bytes)
+# Headers a cache hit must not repeat: recomputed per response, or per answer.
+NO_REPLAY = {"content-length", "date", "x-cache"}
+
+# In-flight upstream fetches, keyed like the cache plus Mcp-Name and auth.
+# The future resolves to the leader's buffered response, or None on failure.
+flights: dict[tuple, asyncio.Future] = {}
+coalesced = 0
+
+
+def envelope(rpc_id, ttl_ms: int, tail: bytes) -> bytes:
+    """Rebuild a full JSON-RPC response around a cached result tail."""
+    head = (b'{"jsonrpc":"2.0","id":' + json.dumps(rpc_id).encode()
+            + b',"result":{"ttlMs":' + str(ttl_ms).encode())
+    return head + (tail if tail == b"}" else b"," + tail) + b"}"
+
+
+async def upstream_sessions(app: web.Application):
+    """Open a keep-alive connection pool per backend; close them on shutdown."""
+    for backend in backends:
+        backend.session = ClientSession(
+            connector=TCPConnector(
+                limit=args.pool_size,
+                keepalive_timeout=args.keepalive,
+                ttl_dns_cache=300,
+            ),
+            timeout=ClientTimeout(total=None, connect=args.connect_timeout,
+                                  sock_read=args.read_timeout),
+            # Pass bytes through untouched: the client asked for the encoding
+            # the backend chose, and Content-Encoding is forwarded as-is.
+            auto_decompress=False,
+        )
+    yield
+    for backend in backends:
+        await backend.session.close()
+
+
+# ─── Health checking ────────────────────────────────────────────────
+
+# A server/discover call is the cheapest request every 2026-07-28 server must
+# answer, and it needs no session - so it makes an honest liveness probe.
+PROBE = {"jsonrpc": "2.0", "id": "lb-health", "method": "server/discover",
+         "params": {"_meta": {
+             "io.modelcontextprotocol/protocolVersion": "2026-07-28",
+             "io.modelcontextprotocol/clientInfo": {"name": "replica-lb", "version": "1.0"},
+             "io.modelcontextprotocol/clientCapabilities": {}}}}
+PROBE_HEADERS = {"Accept": "application/json, text/event-stream",
+                 "MCP-Protocol-Version": "2026-07-28",
+                 "Mcp-Method": "server/discover"}
+
+
+async def probe(backend: Backend) -> None:
+    try:
+        async with backend.session.post(backend.url + args.health_path, json=PROBE,
+                                        headers=PROBE_HEADERS,
+                                        timeout=ClientTimeout(total=args.health_timeout)) as r:
+            await r.read()
+            backend.probed(r.status == 200, f"HTTP {r.status}")
+    except (ClientError, asyncio.TimeoutError) as exc:
+        backend.probed(False, type(exc).__name__)
+
+
+async def health_checks(app: web.Application):
+    """Probe every backend in the background for the life of the app."""
+    async def loop():
+        while True:
+            await asyncio.gather(*(probe(b) for b in backends))
+            await asyncio.sleep(args.health_interval)
+
+    task = asyncio.create_task(loop()) if args.health_interval > 0 else None
+    yield
+    if task:
+        task.cancel()
+
+
+async def proxy(request: web.Request) -> web.StreamResponse:
+    # The Mcp-Method / Mcp-Name headers choose the pool - no body parsing.
+    # Only the cacheable reads are then parsed, in cached(), because their
+    # params are part of the cache and coalescing key; everything else
+    # (tools/call included) streams through untouched.
+    method = request.headers.get("Mcp-Method", "-")
+    pool = route(method, request.headers.get("Mcp-Name", ""))
+
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP}
+    if method in CACHEABLE and (cache.max_bytes > 0 or args.coalesce):
+        return await cached(request, pool, method, headers)
+
+    if args.buffer:
+        body = await request.read()
+    else:
+        # Hand the incoming stream straight to the upstream request. Keeping
+        # a known Content-Length avoids re-chunking a fixed-size body.
+        body = request.content if request.body_exists else None
+        if request.content_length is not None:
+            headers["Content-Length"] = str(request.content_length)
+    return await send(request, pool, body, headers, buffered=args.buffer)
+
+
+async def cached(request: web.Request, pool: Pool, method: str,
+                 headers: dict) -> web.StreamResponse:
+    """Answer a list/read request from the cache, or fetch and maybe store it."""
     body = await request.read()
+    try:
+        rpc = json.loads(body)
+        params = rpc.get("params") or {}
+        if rpc.get("method") != method or not isinstance(params, dict):
+            raise ValueError(method)
+    except (ValueError, AttributeError):
+        # Not one well-formed request: let the server produce the error.
+        return await send(request, pool, body, headers, buffered=False)
+
+    # _meta carries client identity, not the question being asked.
+    question = json.dumps({k: v for k, v in params.items() if k != "_meta"},
+                          sort_keys=True, separators=(",", ":"))
+    # Same question to a different endpoint or pool is a different question:
+    # /mcp and /notes/mcp behind one balancer must never share answers.
+    base = (method, request.path_qs, pool.name,
+            request.headers.get("MCP-Protocol-Version", ""), question)
+    auth = hashlib.sha256(request.headers.get("Authorization", "").encode()).hexdigest()
+
+    hit = cache.get(base + (None,)) or cache.get(base + (auth,))
+    if hit:
+        cache.hits += 1
+        if not args.quiet:
+            print(f"{CYAN}[lb] {request.method} {request.path}  Mcp-Method={method}  "
+                  f"->  {GREEN}cache hit (ttlMs {hit[0]}){RESET}")
+        ttl_ms, tail, replay = hit
+        return web.Response(body=envelope(rpc.get("id"), ttl_ms, tail),
+                            headers=dict(replay, **{"X-Cache": "HIT"}))
+
+    cache.misses += 1
+    # In flight, requests are identical only if everything the cache keys on
+    # matches - including path and pool - and so do Mcp-Name and the caller.
+    flight_key = base + (request.headers.get("Mcp-Name", ""), auth)
+    response = await single_flight(request, pool, body, headers, flight_key, rpc.get("id"))
+    if response.headers.get("X-Cache") == "COALESCED":
+        return response
+    if response.status == 200 and response.content_type == "application/json":
+        try:
+            result = json.loads(response.body)["result"]
+            ttl_ms = int(result.pop("ttlMs", 0))
+            scope = result.get("cacheScope")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            ttl_ms, scope = 0, None
+        if ttl_ms > 0 and scope in ("public", "private"):
+            tail = json.dumps(result, separators=(",", ":")).encode()[1:]
+            replay = {k: v for k, v in response.headers.items() if k.lower() not in NO_REPLAY}
+            cache.put(base + (None if scope == "public" else auth,), ttl_ms, tail, replay)
+    response.headers["X-Cache"] = "MISS"
+    return response
+
+
+async def single_flight(request: web.Request, pool: Pool, body: bytes, headers: dict,
+                        key: tuple, rpc_id) -> web.Response:
+    """Fetch upstream once for every identical request in flight right now.
+
+    `key` starts with the cache key (method, path, pool, protocol version,
+    params), so requests to different endpoints or pools never share a reply.
+    """
+    global coalesced
+    if args.coalesce and key in flights:
+        shared = await asyncio.shield(flights[key])
+        response = shared is not None and rebrand(shared, rpc_id)
+        if response:
+            coalesced += 1
+            if not args.quiet:
+                print(f"{CYAN}[lb] {request.method} {request.path}  "
+                      f"Mcp-Method={key[0]}  ->  {GREEN}coalesced{RESET}")
+            return response
+        # The leader failed or got a reply we cannot re-address: go alone.
+        return await send(request, pool, body, headers, buffered=True)
 
-    # The ONE piece of MCP awareness here is optional and read-only: we log
-    # the Mcp-Method / Mcp-Name headers to show what header-based routing
-    # would see - without ever parsing the JSON body.
+    if not args.coalesce:
+        return await send(request, pool, body, headers, buffered=True)
+
+    flight = flights[key] = asyncio.get_running_loop().create_future()
+    response = None
+    try:
+        response = await send(request, pool, body, headers, buffered=True)
+        return response
+    finally:
+        del flights[key]
+        flight.set_result(response)
+
+
+def rebrand(response: web.Response, rpc_id) -> web.Response | None:
+    """Copy a buffered JSON-RPC response, addressed to a different request id."""
+    if response.content_type != "application/json":
+        return None
+    try:
+        payload = json.loads(response.body)
+        payload["id"] = rpc_id
+    except (ValueError, TypeError):
+        return None
+    out = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    out["X-Cache"] = "COALESCED"
+    return web.Response(status=response.status, headers=out,
+                        body=json.dumps(payload, separators=(",", ":")).encode())
+
+
+async def send(request: web.Request, pool: Pool, body, headers: dict,
+               buffered: bool) -> web.StreamResponse:
+    """Forward to a healthy backend in `pool`, moving on if one refuses."""
     method = request.headers.get("Mcp-Method", "-")
     name = request.headers.get("Mcp-Name", "")
-    print(f"{CYAN}[lb] {request.method} {request.path}  "
-          f"Mcp-Method={method}{' Mcp-Name=' + name if name else ''}  "
-          f"->  {YELLOW}{backend}{RESET}")
+    tried: list[Backend] = []
+    while True:
+        # If every backend is out, fail open: trying one beats a certain 502.
+        candidates = [b for b in pool.backends if b.available() and b not in tried] or \
+                     [b for b in pool.backends if b not in tried]
+        if not candidates:
+            return web.Response(status=502, text="No backend could be reached.\n")
+        backend = pool.policy.pick(candidates)
 
-    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP}
-    async with ClientSession() as s:
-        async with s.request(request.method, backend + request.path_qs,
-                             data=body, headers=headers) as resp:
+        if not args.quiet:
+            print(f"{CYAN}[lb] {request.method} {request.path}  "
+                  f"Mcp-Method={method}{' Mcp-Name=' + name if name else ''}  "
+                  f"->  {YELLOW}{pool.name}: {backend.url}{RESET}  "
+                  f"(in-flight {backend.in_flight}, ewma {backend.ewma * 1000:.0f} ms)")
+
+        backend.in_flight += 1
+        started = time.monotonic()
+        try:
+            response = await forward(request, backend, body, headers, buffered)
+        except ClientConnectorError as exc:
+            # Refused before a byte was sent, so the body is untouched and
+            # the request can safely go to someone else.
+            backend.failed(f"connect error: {exc.os_error}")
+            tried.append(backend)
+            continue
+        except (ClientError, asyncio.TimeoutError) as exc:
+            backend.failed(type(exc).__name__)
+            raise web.HTTPBadGateway(text=f"Backend {backend.url} failed: {exc}\n")
+        finally:
+            backend.in_flight -= 1
+        backend.observe(time.monotonic() - started)
+        return response
+
+
+async def forward(request: web.Request, backend: Backend, body,
+                  headers: dict, buffered: bool) -> web.StreamResponse:
+    """Send one request to `backend` and relay its response."""
+    async with backend.session.request(request.method, backend.url + request.path_qs,
+                                       data=body, headers=headers) as resp:
+        out = {k: v for k, v in resp.headers.items() if k.lower() not in HOP}
+        out["X-Backend"] = backend.url
+        if resp.status >= 500:
+            backend.failed(f"HTTP {resp.status}")
+        else:
+            backend.succeeded()
+        if buffered:
             payload = await resp.read()
-            out = {k: v for k, v in resp.headers.items() if k.lower() not in HOP}
             return web.Response(status=resp.status, body=payload, headers=out)
 
+        downstream = web.StreamResponse(status=resp.status, headers=out)
+        if resp.content_length is not None:
+            downstream.content_length = resp.content_length
+        await downstream.prepare(request)
+        try:
+            async for chunk in resp.content.iter_any():
+                await downstream.write(chunk)
+        except (ClientError, asyncio.TimeoutError) as exc:
+            # The status line and headers are already out, so a 502 can no
+            # longer be sent. Cut the connection: the client sees a
+            # truncated response, not one that looks complete.
+            backend.failed(f"dropped mid-response: {type(exc).__name__}")
+            if request.transport is not None:
+                request.transport.close()
+            return downstream
+        await downstream.write_eof()
+        return downstream
+
+
+async def lb_stats(request: web.Request) -> web.Response:
+    """Per-backend in-flight count and latency, for humans and bench_lb.py."""
+    return web.json_response({
+        "policy": args.policy,
+        "pools": {p.name: [b.url for b in p.backends] for p in pools.values()},
+        "routes": {f"{m}:{n}" if n else m: p.name for (m, n), p in routes.items()},
+        "backends": {b.url: b.stats() for b in backends},
+        "cache": cache.stats(),
+        "coalesced": coalesced,
+    })
+
 
 app = web.Application()
+app.cleanup_ctx.append(upstream_sessions)
+app.cleanup_ctx.append(health_checks)
+app.router.add_get("/lb/stats", lb_stats)
 app.router.add_route("*", "/{tail:.*}", proxy)
 
 if __name__ == "__main__":
-    print(f"{CYAN}[lb] round-robin on http://127.0.0.1:{LISTEN}  ->  "
+    print(f"{CYAN}[lb] {args.policy} on http://127.0.0.1:{LISTEN}  ->  "
           f"{', '.join(BACKENDS)}{RESET}")
+    for (m, n), p in routes.items():
+        print(f"{CYAN}[lb]   route {m}{':' + n if n else ''}  ->  pool {p.name} "
+              f"({', '.join(b.url for b in p.backends)}){RESET}")
     web.run_app(app, host="127.0.0.1", port=LISTEN, print=None)
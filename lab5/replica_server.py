@@ -8,42 +8,106 @@
 # Why this works across replicas when memory_server.py does not: TripBooker
 # keeps NOTHING in process memory between the two rounds. Everything it needs
 # on the retry travels inside requestState - signed by the server, carried
-# (unread) by the client.
+# (unread) by the client, packed small by lab4's state_codec.py.
 #
-# The signing key comes from REQUEST_STATE_KEY, defaulting to a shared lab
-# value. Every replica MUST hold the same key: replica B can only accept a
-# requestState that replica A signed if they share it. Start one replica with
-# a different key to see exactly how that failure looks.
+# The signing keys come from REQUEST_STATE_KEYS (lab4's state_keys.py),
+# defaulting to a shared lab value. Every replica MUST hold a ring containing
+# the key that sealed a requestState: replica B can only accept what replica A
+# sealed if they share it. Start one replica with a different key to see
+# exactly how that failure looks - then give it "theirs,ours" to see rotation
+# keep working mid-flight.
 #
-# Usage:  python replica_server.py <port>
+# Round 1 is the hot path - every booking starts there - and its answer only
+# depends on the destination. So it is built ONCE per destination, when the
+# flight catalog (flights.db, see flight_catalog.py) loads, and returned as-is
+# after that: no schema dicts, no model validation, no state encoding per call.
+# Edit flights.db while replicas run and they pick the change up within a
+# second. bench_round1.py measures the difference.
+#
+# Every response carries a Server-Timing header (server_timing.py): time
+# spent sealing and unsealing requestState, and in the server overall.
+# bench_mrtr.py uses it to split each round's latency into server and network.
+#
+# Usage:  python replica_server.py <port>      (FLIGHTS_DB=path to use another catalog)
 
 import os
 import sys
+from pathlib import Path
 
-from mcp.server.request_state import RequestStateSecurity
+from mcp.server.request_state import AESGCMRequestStateCodec, RequestStateSecurity
 from mcp_types import ElicitRequest, ElicitRequestFormParams, InputRequiredResult
+from starlette.middleware import Middleware
 
 from fastmcp import Context, FastMCP
 
+from flight_catalog import FlightCatalog
+from server_timing import ServerTimingMiddleware, TimedCodec
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lab4"))
+from state_codec import decode_state, encode_state  # noqa: E402
+from state_keys import describe, state_keys  # noqa: E402
+
 PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8001
 NAME = f"replica-{PORT}"
 GREEN, BLUE, RESET = "\033[92m", "\033[94m", "\033[0m"
 
-SIGNING_KEY = os.getenv(
-    "REQUEST_STATE_KEY", "lab-demo-key-not-for-production!!"
-).encode()
+SIGNING_KEYS = state_keys()
 
 server = FastMCP(
     "TripBooker",
     instructions="Books a trip, asking follow-up questions across round trips.",
-    request_state_security=RequestStateSecurity(keys=[SIGNING_KEY]),
+    # The SDK's own AES-GCM codec over the key ring, with its work timed.
+    request_state_security=RequestStateSecurity(
+        codec=TimedCodec(AESGCMRequestStateCodec(SIGNING_KEYS))),
 )
 
-FLIGHTS = {
-    "paris": ["AF017 08:15", "DL262 17:40"],
-    "tokyo": ["NH009 11:05", "JL005 13:20"],
-    "london": ["BA178 09:30", "VS004 18:55"],
-}
+
+def ask(dest: str, flights: tuple[str, ...]) -> InputRequiredResult:
+    """Round 1's whole answer for one destination. Built once per catalog load.
+
+    Every caller gets this same object back, so it is never modified: the
+    framework copies it when it seals requestState on the way out.
+    """
+    return InputRequiredResult(
+        result_type="input_required",
+        input_requests={
+            "traveler": ElicitRequest(
+                method="elicitation/create",
+                params=ElicitRequestFormParams(
+                    message=f"Who is travelling to {dest.title()}?",
+                    requested_schema={
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string", "title": "Traveler name"}
+                        },
+                        "required": ["name"],
+                    },
+                ),
+            ),
+            "flight": ElicitRequest(
+                method="elicitation/create",
+                params=ElicitRequestFormParams(
+                    message=f"Which flight to {dest.title()}?",
+                    requested_schema={
+                        "type": "object",
+                        "properties": {
+                            "choice": {
+                                "type": "string",
+                                "title": "Flight",
+                                "enum": list(flights),
+                            }
+                        },
+                        "required": ["choice"],
+                    },
+                ),
+            ),
+        },
+        request_state=encode_state({"dest": dest, "offered": list(flights)}),
+    )
+
+
+CATALOG = FlightCatalog(os.getenv("FLIGHTS_DB", str(Path(__file__).with_name("flights.db"))),
+                        build=ask)
 
 
 @server.tool
@@ -52,49 +116,15 @@ async def book_trip(destination: str, ctx: Context) -> str | InputRequiredResult
     answers = ctx.input_responses
 
     dest = destination.strip().lower()
-    if dest not in FLIGHTS:
+    template = CATALOG.entry(dest)
+    if template is None:
         return f"Sorry, we do not fly to {destination}."
 
     # ---- Round 1: no answers yet -> ask, and hand back signed state -------
     if answers is None:
         print(f"{BLUE}[{NAME}] round 1: asking for inputs, "
               f"returning signed requestState{RESET}")
-        return InputRequiredResult(
-            result_type="input_required",
-            input_requests={
-                "traveler": ElicitRequest(
-                    method="elicitation/create",
-                    params=ElicitRequestFormParams(
-                        message=f"Who is travelling to {destination.title()}?",
-                        requested_schema={
-                            "type": "object",
-                            "properties": {
-                                "name": {"type": "string", "title": "Traveler name"}
-                            },
-                            "required": ["name"],
-                        },
-                    ),
-                ),
-                "flight": ElicitRequest(
-                    method="elicitation/create",
-                    params=ElicitRequestFormParams(
-                        message=f"Which flight to {destination.title()}?",
-                        requested_schema={
-                            "type": "object",
-                            "properties": {
-                                "choice": {
-                                    "type": "string",
-                                    "title": "Flight",
-                                    "enum": FLIGHTS[dest],
-                                }
-                            },
-                            "required": ["choice"],
-                        },
-                    ),
-                ),
-            },
-            request_state=ctx.request_state or "",
-        )
+        return template
 
     # ---- Round 2: this may be a DIFFERENT replica than round 1 ------------
     print(f"{GREEN}[{NAME}] round 2: verified requestState signature, "
@@ -107,10 +137,20 @@ async def book_trip(destination: str, ctx: Context) -> str | InputRequiredResult
 
     who = traveler.content["name"]
     which = flight.content["choice"]
+
+    # The flight must be one we actually offered - the enum in the schema is
+    # only a hint to the client. What we offered came back in requestState.
+    state = decode_state(ctx.request_state or "") or {}
+    offered = state.get("offered") or CATALOG.flights(dest) or ()
+    if which not in offered:
+        return f"Booking cancelled: {which} is not a flight we offered."
     return f"Booked {which} to {destination.title()} for {who}.  [finished on {NAME}]"
 
 
 if __name__ == "__main__":
     print(f"{GREEN}[{NAME}] starting on port {PORT}  "
-          f"(signing key: {'CUSTOM' if 'REQUEST_STATE_KEY' in os.environ else 'shared lab default'}){RESET}")
-    server.run(transport="http", host="127.0.0.1", port=PORT)
+          f"(requestState keys: {describe(SIGNING_KEYS)}){RESET}")
+    print(f"{GREEN}[{NAME}] {len(CATALOG)} destinations from {CATALOG.path}, "
+          f"round-1 answers prebuilt in {CATALOG.stats['load_ms']} ms{RESET}")
+    server.run(transport="http", host="127.0.0.1", port=PORT,
+               middleware=[Middleware(ServerTimingMiddleware)])
@@ -0,0 +1,88 @@
+"""
+server_timing.py - where replica_server.py's time goes, per request.
+
+Adds a standard Server-Timing response header (W3C) to every MCP response:
+
+    Server-Timing: unseal;dur=0.041, seal;dur=0.037, app;dur=2.913
+
+  unseal   verifying + decrypting the requestState the client echoed back
+  seal     encrypting + authenticating the requestState going out
+  app      everything from request in to response out, inside the server -
+           parsing, validation, the tool itself, serializing the result
+
+Durations are milliseconds, as the header defines them. Browsers' dev tools
+show it, and bench_mrtr.py subtracts it from what the client measured to get
+the time spent on the network and in the balancer.
+
+    codec = TimedCodec(AESGCMRequestStateCodec(keys))
+    FastMCP(..., request_state_security=RequestStateSecurity(codec=codec))
+    server.run(transport="http", middleware=[Middleware(ServerTimingMiddleware)])
+
+The numbers for one request are collected in a context variable, so
+concurrent requests never mix their timings.
+
+It ships complete so replica_server.py can stay focused on the protocol.
+"""
+
+import time
+from contextvars import ContextVar
+
+from mcp.server.request_state import RequestStateCodec
+
+_spans: ContextVar[dict[str, float] | None] = ContextVar("server_timing", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add `seconds` to span `name` of the request being handled, if any."""
+    spans = _spans.get()
+    if spans is not None:
+        spans[name] = spans.get(name, 0.0) + seconds
+
+
+class TimedCodec:
+    """A RequestStateCodec that times the one it wraps."""
+
+    def __init__(self, codec: RequestStateCodec):
+        self.codec = codec
+
+    def seal(self, payload: bytes) -> str:
+        started = time.perf_counter()
+        try:
+            return self.codec.seal(payload)
+        finally:
+            record("seal", time.perf_counter() - started)
+
+    def unseal(self, token: str) -> bytes:
+        started = time.perf_counter()
+        try:
+            return self.codec.unseal(token)
+        finally:
+            record("unseal", time.perf_counter() - started)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: open a timing record per request, report it as a header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        spans: dict[str, float] = {}
+        token = _spans.set(spans)
+        started = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                spans["app"] = time.perf_counter() - started
+                value = ", ".join(f"{name};dur={seconds * 1000:.3f}"
+                                  for name, seconds in spans.items())
+                message = dict(message, headers=[*message.get("headers", []),
+                                                 (b"server-timing", value.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _spans.reset(token)